@@ -0,0 +1,102 @@
+"""
+Adaptive Reduction Scale
+Coarse-to-fine scale ladder for the analysis histogram reductions
+
+An analysis first reduces its index histograms at the two coarsest scales of
+a ladder sized to the ROI (the coarsest about ADAPTIVE_COARSE_PIXELS pixels).
+Reducing at a coarse scale averages pixels, which smooths the index and biases
+mean + 0.5 * stdDev and the coverage above it. That bias is estimated from how
+much the coverage moved between the last two scales: it shrinks by about half
+with each halving of the scale, so the last change is about what the finer
+scales would still add. Only minerals whose coverage lands within sampling
+margin + bias of a classification boundary (3% / 10%, see classification.py)
+are reduced again, one halving of the scale at a time, down to the finest
+scale. The finest scale is 100m, coarser for very large ROIs so a reduction
+never reads more than MAX_REDUCTION_PIXELS pixels. Set ADAPTIVE_SCALE=0 to
+always reduce at the finest scale.
+
+Usage:
+    from adaptive_scale import reduction_scales, first_round_scales, refine_histograms
+
+    ladder = reduction_scales(radius_m)
+    levels = [reduce(mineral_types, scale) for scale in first_round_scales(ladder)]
+    histograms, scales, biases = refine_histograms(levels, ladder, reduce)
+"""
+
+import math
+import os
+
+from classification import MODERATE_POTENTIAL_COVERAGE, HIGH_POTENTIAL_COVERAGE
+
+ADAPTIVE_SCALE = os.getenv('ADAPTIVE_SCALE', '1') == '1'
+ADAPTIVE_COARSE_PIXELS = int(os.getenv('ADAPTIVE_COARSE_PIXELS', 2000))
+MAX_REDUCTION_PIXELS = int(os.getenv('MAX_REDUCTION_PIXELS', 1_000_000))
+FINEST_SCALE_M = 100
+
+COVERAGE_BOUNDARIES = (MODERATE_POTENTIAL_COVERAGE, HIGH_POTENTIAL_COVERAGE)
+
+
+def reduction_scales(radius_m, adaptive=ADAPTIVE_SCALE):
+    """Scales in meters to try for a circular ROI, coarsest first, each half the previous"""
+    area = math.pi * radius_m ** 2
+    finest = max(FINEST_SCALE_M, math.ceil(math.sqrt(area / MAX_REDUCTION_PIXELS)))
+    if not adaptive:
+        return [finest]
+
+    coarse = math.sqrt(area / ADAPTIVE_COARSE_PIXELS)
+    scales = [finest]
+    while scales[-1] < coarse:
+        scales.append(scales[-1] * 2)
+    return scales[::-1]
+
+
+def first_round_scales(ladder):
+    """Scales reduced together in the first round: the two coarsest, or the only one"""
+    return ladder[:2]
+
+
+def smoothing_bias(coarse, fine):
+    """Estimated smoothing bias, in percentage points, left in the default coverage of fine.
+
+    coarse was reduced at twice the scale of fine. With the bias about halving
+    per halving of the scale, the change between the two is about what is left.
+    """
+    return abs(fine.default_coverage() - coarse.default_coverage())
+
+
+def is_borderline(histogram, bias=0.0, boundaries=COVERAGE_BOUNDARIES):
+    """True when a boundary lies within sampling margin + bias of the default coverage"""
+    coverage = histogram.default_coverage()
+    margin = histogram.coverage_margin(coverage)
+    if margin is None:
+        return False
+    return any(abs(coverage - boundary) <= margin + bias for boundary in boundaries)
+
+
+def refine_histograms(levels, ladder, reduce_fn):
+    """Re-reduce borderline minerals at successively finer scales of the ladder.
+
+    levels holds the first round, one {mineral: IndexHistogram} per scale of
+    first_round_scales(ladder); reduce_fn(mineral_types, scale) returns new
+    histograms. Returns (histograms, scales, biases): each mineral's finest
+    histogram, the scale it was reduced at and its estimated smoothing bias.
+    """
+    histograms = dict(levels[-1])
+    scales = {mineral_type: ladder[len(levels) - 1] for mineral_type in histograms}
+    biases = {
+        mineral_type: smoothing_bias(levels[-2][mineral_type], histogram) if len(levels) > 1 else 0.0
+        for mineral_type, histogram in histograms.items()
+    }
+    for scale in ladder[len(levels):]:
+        borderline = [
+            mineral_type for mineral_type, histogram in histograms.items()
+            if is_borderline(histogram, biases[mineral_type])
+        ]
+        if not borderline:
+            break
+        finer = reduce_fn(borderline, scale)
+        for mineral_type in borderline:
+            biases[mineral_type] = smoothing_bias(histograms[mineral_type], finer[mineral_type])
+            histograms[mineral_type] = finer[mineral_type]
+            scales[mineral_type] = scale
+    return histograms, scales, biases
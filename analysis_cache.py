@@ -0,0 +1,94 @@
+"""
+Analysis Result Cache
+Thread-safe in-memory TTL + LRU cache shared by the analysis endpoints
+
+Usage:
+    from analysis_cache import TTLCache, make_analysis_key
+
+    cache = TTLCache(max_entries=256, ttl_seconds=7200)
+    key = make_analysis_key(18.63, 81.30, 10000, 'iron', '2025-10-18', '2026-10-18')
+    result = cache.get(key)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """LRU cache whose entries also expire after a time-to-live"""
+
+    def __init__(self, max_entries=256, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        """Store value under key, evicting least recently used entries past the size cap"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Remove key from the cache and return its value"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def snap_coordinates(lat, lon, decimals=3):
+    """Round a coordinate pair so nearby requests share one cache key (3 decimals ~ 110 m)"""
+    return round(float(lat), decimals), round(float(lon), decimals)
+
+
+def make_analysis_key(center_lat, center_lon, radius_m, mineral_type, start_date, end_date):
+    """Build the cache key for one snapped ROI, mineral and date window"""
+    return ('analysis', center_lat, center_lon, int(radius_m), mineral_type, start_date, end_date)
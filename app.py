@@ -3,21 +3,40 @@ SpectraMining AI - Backend API Server
 Flask API for satellite-based mineral detection
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import ee
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
+import os
+import json
+import time
 import warnings
 import logging
+import math
 from datetime import datetime, timedelta
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from ee_auth import initialize_earth_engine
+from analysis_cache import TTLCache, snap_coordinates, make_analysis_key
+from concurrency import SingleFlight
+from geocoding import GeocodingService, QueueFull, wait_for
+from persistent_cache import PersistentCache
+from basemap import BasemapStore, snap_bounds, GLOBAL_REGION
+from jobs import JobManager, JobQueueFull
+from tile_proxy import TileProxy, DiskTileCache, TileNotFound, TileUpstreamError, layer_key
+from compute_backend import create_backend, MINERAL_TYPES
+from index_histogram import IndexHistogram
+from time_series import monthly_windows, flag_changes, TIMESERIES_DEFAULT_MONTHS, TIMESERIES_MAX_MONTHS
+import metrics
+from metrics import timed
 
 warnings.filterwarnings('ignore')
 logging.basicConfig(level=logging.INFO)
 
-# Import legal mining sites database
-from legal_mining_sites import LEGAL_MINING_AREAS
+# Legal mining sites database, indexed
+from mine_index import mine_index
+from mine_catalog import mine_catalog, LEGAL_MINES_MAX_LIMIT
+from classification import classify_location, classify_locations_bulk
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -26,137 +45,356 @@ CORS(app)  # Enable CORS for all routes
 MY_PROJECT_ID = "spectramining"
 geolocator = Nominatim(user_agent="spectramining_ai_pro_v6")
 
+# Forward geocoding through an on-disk cache and a 1 req/s Nominatim queue
+geocoding_service = GeocodingService(geolocator)
+GEOCODE_TIMEOUT_S = float(os.getenv('GEOCODE_TIMEOUT', 30))
+
+# Analysis area and imagery window
+ANALYSIS_RADIUS_M = int(float(os.getenv('ANALYSIS_RADIUS_KM', 10)) * 1000)  # 10km radius
+ANALYSIS_WINDOW_DAYS = 365
+ROI_SNAP_DECIMALS = 3  # ~110m, analyses closer than this share one ROI
+POINT_SNAP_DECIMALS = 4  # ~11m, close to the 10m sampling scale
+MAX_BATCH_POINTS = int(os.getenv('MAX_BATCH_POINTS', 500))
+MAX_CLASSIFY_POINTS = int(os.getenv('MAX_CLASSIFY_POINTS', 10000))
+LEGAL_MINES_MAX_AGE_S = int(os.getenv('LEGAL_MINES_MAX_AGE', 3600))
+TILE_MAX_AGE_S = int(os.getenv('TILE_MAX_AGE', 30 * 24 * 3600))
+
+# Regional grid scans: cells per request
+MAX_SCAN_CELLS = int(os.getenv('MAX_SCAN_CELLS', 400))
+
+# Per-call timeout (seconds) for the concurrent reverse geocoding lookup
+NEARBY_TIMEOUT_S = float(os.getenv('NEARBY_TIMEOUT', 5))
+
+# Cached stats, thresholds and tile map IDs per snapped ROI / mineral / day window.
+# TTL stays below the lifetime of Earth Engine map IDs.
+analysis_cache = TTLCache(
+    max_entries=int(os.getenv('ANALYSIS_CACHE_SIZE', 256)),
+    ttl_seconds=int(os.getenv('ANALYSIS_CACHE_TTL', 7200))
+)
+point_value_cache = TTLCache(
+    max_entries=int(os.getenv('POINT_CACHE_SIZE', 4096)),
+    ttl_seconds=int(os.getenv('ANALYSIS_CACHE_TTL', 7200))
+)
+time_series_cache = TTLCache(
+    max_entries=int(os.getenv('TIMESERIES_CACHE_SIZE', 256)),
+    ttl_seconds=int(os.getenv('ANALYSIS_CACHE_TTL', 7200))
+)
+
+# Second tier shared by worker processes and kept across restarts; warm_cache.py fills it
+ANALYSIS_STORE_PATH = os.getenv('ANALYSIS_STORE_PATH', 'analysis_store.sqlite3')
+analysis_store = PersistentCache(
+    ANALYSIS_STORE_PATH, 'analysis', int(os.getenv('ANALYSIS_CACHE_TTL', 7200)),
+    max_entries=int(os.getenv('ANALYSIS_STORE_SIZE', 5000))
+)
+
+# Tile layers served through /api/tiles; tiles on disk outlive their map IDs
+tile_proxy = TileProxy(
+    PersistentCache(
+        ANALYSIS_STORE_PATH, 'tile_layers', int(os.getenv('TILE_LAYER_TTL', 24 * 3600)),
+        max_entries=int(os.getenv('TILE_LAYER_STORE_SIZE', 20000))
+    ),
+    DiskTileCache()
+)
+
+# Identical analyses requested while one is already running wait for it instead
+analysis_flights = SingleFlight()
+
+# Global basemap: 6 month composite, true color
+BASEMAP_WINDOW_DAYS = 180
+BASEMAP_VIS = {
+    'bands': ['B4', 'B3', 'B2'],
+    'min': 0,
+    'max': 3000,
+    'gamma': 1.4
+}
+
 # Initialize Google Earth Engine with proper authentication
 initialize_earth_engine()
 
+# Engine computing analyses and point samples (COMPUTE_BACKEND=earthengine|local)
+compute_backend = create_backend()
+
 
-def get_nearby_places(lat, lon, radius_km=5):
-    """Get nearby points of interest"""
+def start_nearby_places(lat, lon):
+    """Start a nearby points of interest lookup (cached per geohash cell); returns its future or None.
+
+    The lookup waits in the Nominatim queue, not on an io_executor worker, so
+    slow reverse geocoding cannot starve the map tile fan-out.
+    """
     try:
-        query = f"{lat},{lon}"
-        results = geolocator.reverse(query, exactly_one=False, language='en', addressdetails=True)
-        
-        nearby_places = []
-        if results:
-            for result in results[:10]:
-                if hasattr(result, 'raw') and 'address' in result.raw:
-                    address = result.raw['address']
-                    place_name = None
-                    place_type = None
-                    
-                    if 'mall' in address or 'shopping' in address.get('amenity', '').lower():
-                        place_name = address.get('mall', address.get('shop', address.get('amenity')))
-                        place_type = "Shopping"
-                    elif 'school' in address or 'college' in address or 'university' in address:
-                        place_name = address.get('school', address.get('college', address.get('university')))
-                        place_type = "Education"
-                    elif 'hospital' in address or 'clinic' in address:
-                        place_name = address.get('hospital', address.get('clinic'))
-                        place_type = "Healthcare"
-                    elif 'hotel' in address or 'restaurant' in address:
-                        place_name = address.get('hotel', address.get('restaurant'))
-                        place_type = "Hospitality"
-                    elif 'building' in address:
-                        place_name = address.get('building')
-                        place_type = "Landmark"
-                    
-                    if place_name and place_name not in [p['name'] for p in nearby_places]:
-                        nearby_places.append({
-                            'name': place_name,
-                            'type': place_type,
-                            'lat': result.latitude,
-                            'lon': result.longitude
-                        })
-        
-        return nearby_places[:5]
+        return geocoding_service.submit_nearby_places(lat, lon)
+    except Exception as e:
+        logging.error(f"Error getting nearby places: {e}")
+        return None
+
+
+def finish_nearby_places(future):
+    """Wait up to NEARBY_TIMEOUT_S for a lookup from start_nearby_places; [] if it fails"""
+    if future is None:
+        return []
+    try:
+        if future.done():
+            return future.result()
+        with timed('nominatim_reverse', service='nominatim'):
+            return wait_for(future, NEARBY_TIMEOUT_S)
+    except FutureTimeoutError:
+        logging.warning("Nearby places did not finish within its timeout")
+        return []
     except Exception as e:
         logging.error(f"Error getting nearby places: {e}")
         return []
 
 
-def calculate_mineral_index(image, mineral_type):
-    """Calculate mineral indices based on type"""
-    if mineral_type == 'iron':
-        return image.select('B4').divide(image.select('B2')).rename('iron_index')
-    elif mineral_type == 'aluminum':
-        return image.select('B11').divide(image.select('B12')).rename('aluminum_index')
-    elif mineral_type == 'copper':
-        red_green = image.select('B4').divide(image.select('B3'))
-        nir_red = image.select('B8').divide(image.select('B4'))
-        return red_green.multiply(nir_red).rename('copper_index')
-    return None
+def get_analysis_window(days=ANALYSIS_WINDOW_DAYS):
+    """Return (start_date, end_date) strings aligned to whole days"""
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=days)
+    return start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
 
 
-def get_mineral_index_at_point(mineral_index_ee, lat, lon, mineral_name):
-    """Get mineral index value at specific coordinates"""
-    try:
-        point = ee.Geometry.Point([lon, lat])
-        sample = mineral_index_ee.sample(region=point, scale=10, geometries=True).first()
-        if sample:
-            mineral_value = sample.get(f'{mineral_name}_index').getInfo()
-            return mineral_value
+def parse_points(raw_points):
+    """Parse [lat, lon] pairs or {latitude, longitude} objects into (lat, lon) tuples.
+
+    Raises ValueError naming the index of the first malformed point.
+    """
+    points = []
+    for i, raw_point in enumerate(raw_points):
+        try:
+            if isinstance(raw_point, dict):
+                points.append((float(raw_point['latitude']), float(raw_point['longitude'])))
+            else:
+                points.append((float(raw_point[0]), float(raw_point[1])))
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise ValueError(f'Invalid point at index {i}: expected [lat, lon] or {{latitude, longitude}}')
+    return points
+
+
+def parse_mineral_types(mineral_type):
+    """Normalize a mineral_type request value to a list, or None if unsupported.
+
+    Accepts a single mineral, 'all', a comma separated string or a list.
+    """
+    if mineral_type == 'all':
+        return list(MINERAL_TYPES)
+    if isinstance(mineral_type, str):
+        mineral_type = [m.strip() for m in mineral_type.split(',')]
+    if not isinstance(mineral_type, list) or not mineral_type:
         return None
-    except Exception as e:
-        logging.error(f"Error getting mineral index: {e}")
+    if any(m not in MINERAL_TYPES for m in mineral_type):
         return None
+    # Keep a canonical order so equivalent requests share a cache key
+    return [m for m in MINERAL_TYPES if m in mineral_type]
 
 
-def classify_location(lat, lon, mineral_coverage, mineral_name='iron'):
-    """AI Classification based on proximity to legal mining areas"""
-    search_point = (lat, lon)
-    nearby_mines = []
-    min_distance = float('inf')
-    nearest_mine = None
+def iter_analysis_stages(center_lat, center_lon, mineral_types, start_date, end_date):
+    """Run the configured compute backend for one ROI stage by stage.
+
+    Yields ('plan', plan) once the scalar outputs arrive, then ('tile', (layer, tile))
+    for each layer the backend renders. Stops after the plan when no imagery is found.
+    """
+    return compute_backend.iter_analysis_stages(
+        center_lat, center_lon, ANALYSIS_RADIUS_M, mineral_types, start_date, end_date
+    )
+
+
+def mineral_plan_results(plan, mineral_type):
+    """Statistics, threshold and coverage of one mineral from an evaluated plan"""
+    band = f'{mineral_type}_index'
+    return {
+        'statistics': {
+            key: value for key, value in plan['statistics'].items()
+            if key.startswith(f'{band}_')
+        },
+        'threshold': plan['thresholds'][mineral_type],
+        'coverage_percent': plan['coverage_percent'][mineral_type],
+        # Reduction scale the coverage was measured at and its 95% sampling margin
+        'scale_m': plan['scale_m'][mineral_type],
+        'coverage_error': plan['coverage_error'][mineral_type]
+    }
+
+
+def assemble_analysis(plan, tiles, mineral_types):
+    """Combine an evaluated plan and its tile layers into the cached analysis structure"""
+    minerals = {}
+    for mineral_type in mineral_types:
+        minerals[mineral_type] = mineral_plan_results(plan, mineral_type)
+        minerals[mineral_type]['map_tile'] = tiles.get(f'{mineral_type}_index')
+        # Kept for /api/rethreshold, never sent with the analysis itself
+        minerals[mineral_type]['histogram'] = plan['histograms'][mineral_type]
     
-    mineral_type_map = {
-        'iron': 'Iron Ore',
-        'aluminum': 'Bauxite/Aluminum',
-        'copper': 'Copper'
+    return {
+        'num_images': plan['num_images'],
+        'minerals': minerals,
+        'map_tiles': {
+            'true_color': tiles.get('true_color'),
+            'false_color': tiles.get('false_color')
+        }
     }
+
+
+def proxy_tile(cache_key, layer, tile):
+    """Register a tile layer with the tile proxy and add its proxy_url template"""
+    if not tile:
+        return tile
+    key = layer_key(['analysis', list(cache_key), layer])
+    tile_proxy.register(key, tile['url'])
+    return dict(tile, proxy_url=f'/api/tiles/{key}/{{z}}/{{x}}/{{y}}')
+
+
+def compute_analysis(center_lat, center_lon, mineral_types, start_date, end_date):
+    """Run the analysis pipeline for one ROI; returns None when no imagery is found.
+
+    Returns shared true/false color tiles plus per-mineral statistics, threshold,
+    coverage and index tile under 'minerals'.
+    """
+    cache_key = analysis_cache_key(center_lat, center_lon, mineral_types, start_date, end_date)
+    plan = None
+    tiles = {}
+    for stage, value in iter_analysis_stages(
+        center_lat, center_lon, mineral_types, start_date, end_date
+    ):
+        if stage == 'plan':
+            plan = value
+        else:
+            layer, tile = value
+            tiles[layer] = proxy_tile(cache_key, layer, tile)
     
-    target_mine_type = mineral_type_map.get(mineral_name, 'Iron Ore')
+    if plan['num_images'] == 0:
+        return None
     
-    for mine_name, (mine_lat, mine_lon, country, mine_type) in LEGAL_MINING_AREAS.items():
-        if mine_type != target_mine_type:
-            continue
-            
-        mine_point = (mine_lat, mine_lon)
-        distance = geodesic(search_point, mine_point).kilometers
-        
-        if distance <= 10:
-            nearby_mines.append({
-                'name': mine_name,
-                'distance': distance,
-                'country': country,
-                'type': mine_type
+    return assemble_analysis(plan, tiles, mineral_types)
+
+
+def is_complete_analysis(analysis):
+    """True when every tile layer of an analysis was generated"""
+    if not compute_backend.supports_tiles:
+        return True
+    return all(analysis['map_tiles'].values()) and all(
+        mineral['map_tile'] for mineral in analysis['minerals'].values()
+    )
+
+
+def analysis_cache_key(center_lat, center_lon, mineral_types, start_date, end_date):
+    """Cache key of a (possibly multi-mineral) analysis"""
+    return make_analysis_key(
+        center_lat, center_lon, ANALYSIS_RADIUS_M, ','.join(mineral_types), start_date, end_date
+    )
+
+
+def load_analysis(cache_key):
+    """Return an analysis from memory or the persistent store, or None"""
+    analysis = analysis_cache.get(cache_key)
+    if analysis is not None:
+        return analysis
+    
+    found, analysis = analysis_store.get(json.dumps(cache_key))
+    if found:
+        analysis_cache.set(cache_key, analysis)
+        return analysis
+    return None
+
+
+def save_analysis(cache_key, analysis):
+    """Store a complete analysis in memory and in the persistent store"""
+    analysis_cache.set(cache_key, analysis)
+    analysis_store.set(json.dumps(cache_key), analysis)
+
+
+def get_cached_analysis(center_lat, center_lon, mineral_types, start_date, end_date):
+    """Return (analysis, reused), computing and caching the analysis on a miss.
+
+    Concurrent misses for the same key share one computation; reused is True
+    for cache hits and for requests that joined an in-flight computation.
+    """
+    cache_key = analysis_cache_key(center_lat, center_lon, mineral_types, start_date, end_date)
+    analysis = load_analysis(cache_key)
+    if analysis is not None:
+        return analysis, True
+    
+    def compute():
+        analysis = compute_analysis(center_lat, center_lon, mineral_types, start_date, end_date)
+        # Only cache complete results, a timed-out tile layer is retried next time
+        if analysis is not None and is_complete_analysis(analysis):
+            save_analysis(cache_key, analysis)
+        return analysis
+    
+    return analysis_flights.do(cache_key, compute)
+
+
+def scan_grid_shape(south, west, north, east, cell_size_km):
+    """Return (lat_step, lon_step, n_rows, n_cols) for roughly square cells of cell_size_km"""
+    lat_step = cell_size_km / 111.32
+    mid_lat = math.radians((south + north) / 2)
+    lon_step = cell_size_km / (111.32 * max(math.cos(mid_lat), 0.01))
+    
+    n_rows = max(1, math.ceil((north - south) / lat_step))
+    n_cols = max(1, math.ceil((east - west) / lon_step))
+    return lat_step, lon_step, n_rows, n_cols
+
+
+def build_scan_grid(south, west, north, east, cell_size_km):
+    """Tile a bounding box into roughly square cells of cell_size_km"""
+    lat_step, lon_step, n_rows, n_cols = scan_grid_shape(south, west, north, east, cell_size_km)
+    
+    cells = []
+    for row in range(n_rows):
+        for col in range(n_cols):
+            cell_south = south + row * lat_step
+            cell_west = west + col * lon_step
+            cells.append({
+                'row': row,
+                'col': col,
+                'south': cell_south,
+                'west': cell_west,
+                'north': min(north, cell_south + lat_step),
+                'east': min(east, cell_west + lon_step)
             })
-        
-        if distance < min_distance:
-            min_distance = distance
-            nearest_mine = mine_name
+    return cells, n_rows, n_cols
+
+
+@app.before_request
+def start_request_timing():
+    """Collect per-stage timings of external calls made while serving this request"""
+    metrics.start_request()
+
+
+@app.after_request
+def record_request_timing(response):
+    """Attach the Server-Timing header and record request latency"""
+    request_timings = metrics.current_request()
+    if request_timings is None:
+        return response
     
-    if nearby_mines:
-        classification = "Legal Mining Area"
-        classification_type = "mining"
-    else:
-        mineral_display = mineral_name.capitalize()
-        if mineral_coverage > 10:
-            classification = f"Natural - High Potential {mineral_display} Deposits"
-            classification_type = "high_potential"
-        elif mineral_coverage > 3:
-            classification = f"Natural - Moderate Potential {mineral_display} Deposits"
-            classification_type = "moderate_potential"
-        else:
-            classification = f"Natural - Low {mineral_display} Signature"
-            classification_type = "low_potential"
+    endpoint = request.endpoint or 'unknown'
+    metrics.http_requests.inc(endpoint=endpoint, status=response.status_code)
+    request_timings.counted = True
+    metrics.http_request_seconds.observe(time.perf_counter() - request_timings.started, endpoint=endpoint)
     
-    return {
-        'classification': classification,
-        'classification_type': classification_type,
-        'nearby_mines': nearby_mines,
-        'min_distance': min_distance,
-        'nearest_mine': nearest_mine
-    }
+    # Streamed bodies run most of their stages after the headers are sent
+    if response.is_streamed:
+        request_timings.streamed = True
+    else:
+        response.headers['Server-Timing'] = request_timings.server_timing()
+    return response
+
+
+@app.teardown_request
+def finish_request_timing(exc):
+    """Record Earth Engine round trips once the response, streamed or not, is complete"""
+    request_timings = metrics.current_request()
+    if request_timings is None:
+        return
+    # stream_with_context tears down twice: after the view and after the last chunk
+    if request_timings.streamed and exc is None:
+        request_timings.streamed = False
+        return
+    # Error responses already went through after_request; count only those that did not
+    if exc is not None and not request_timings.counted:
+        metrics.http_requests.inc(endpoint=request.endpoint or 'unknown', status=500)
+    metrics.ee_round_trips.observe(
+        request_timings.round_trips.get('earthengine', 0), endpoint=request.endpoint or 'unknown'
+    )
+    metrics.end_request()
 
 
 @app.route('/')
@@ -176,54 +414,107 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'ee_initialized': True
+        'ee_initialized': True,
+        'compute_backend': compute_backend.name
+    })
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit rates of the analysis, analysis store, point, time series, geocoding and nearby places caches"""
+    return jsonify({
+        'analysis': analysis_cache.stats(),
+        'analysis_store': analysis_store.stats(),
+        'point_values': point_value_cache.stats(),
+        'time_series': time_series_cache.stats(),
+        'geocode': geocoding_service.cache.stats(),
+        'nearby_places': geocoding_service.nearby_cache.stats(),
+        'tiles': tile_proxy.tile_cache.stats(),
+        'analysis_in_flight': analysis_flights.stats(),
+        'nominatim_queue': geocoding_service.request_queue.stats()
     })
 
 
+def cache_metric_lines():
+    """Prometheus lines for cache hit rates and coalesced analyses"""
+    return metrics.cache_metric_lines({
+        'analysis': analysis_cache.stats(),
+        'analysis_store': analysis_store.stats(),
+        'point_values': point_value_cache.stats(),
+        'time_series': time_series_cache.stats(),
+        'geocode': geocoding_service.cache.stats(),
+        'nearby_places': geocoding_service.nearby_cache.stats(),
+        'tiles': tile_proxy.tile_cache.stats()
+    }) + metrics.single_flight_metric_lines('analysis', analysis_flights.stats())
+
+
+metrics.registry.register_collector(cache_metric_lines)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Latency histograms, round-trip counts, cache hit rates and errors in Prometheus text format"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def build_basemap(region):
+    """Generate the Sentinel-2 true color basemap map ID for a (south, west, north, east) region"""
+    south, west, north, east = region
+    
+    # Get recent Sentinel-2 imagery (last 6 months), day-aligned
+    start_date, end_date = get_analysis_window(BASEMAP_WINDOW_DAYS)
+    
+    # Load Sentinel-2 mosaic for the region
+    s2_collection = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
+        .filterDate(start_date, end_date) \
+        .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 30)) \
+        .select(['B4', 'B3', 'B2'])
+    
+    if region != GLOBAL_REGION:
+        s2_collection = s2_collection.filterBounds(
+            ee.Geometry.Rectangle([west, south, east, north])
+        )
+    
+    # Create median composite
+    s2_mosaic = s2_collection.median()
+    
+    # Generate map tiles
+    with timed('ee_basemap'):
+        map_id = s2_mosaic.visualize(**BASEMAP_VIS).getMapId()
+    
+    # Refreshes re-point the same proxy layer at the new map ID
+    key = layer_key(['basemap', list(region), start_date])
+    tile_proxy.register(key, map_id['tile_fetcher'].url_format)
+    
+    return {
+        'tile_url': map_id['tile_fetcher'].url_format,
+        'mapid': map_id['mapid'],
+        'proxy_url': f'/api/tiles/{key}/{{z}}/{{x}}/{{y}}'
+    }
+
+
+basemap_store = BasemapStore(build_basemap)
+if os.getenv('BASEMAP_PREWARM', '1') == '1':
+    basemap_store.start()
+
+
 @app.route('/api/basemap', methods=['POST'])
 def get_basemap():
-    """Generate Sentinel-2 base map for given bounds"""
+    """Serve the Sentinel-2 base map for given bounds from the pre-warmed store"""
     try:
-        data = request.json
+        data = request.json or {}
         bounds = data.get('bounds')  # [[south, west], [north, east]]
         
-        if not bounds:
-            # Default global view
-            bounds = [[-90, -180], [90, 180]]
-        
-        # Create geometry from bounds
-        geometry = ee.Geometry.Rectangle(
-            [bounds[0][1], bounds[0][0], bounds[1][1], bounds[1][0]]
-        )
-        
-        # Get recent Sentinel-2 imagery (last 6 months)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=180)
-        
-        # Load global Sentinel-2 mosaic
-        s2_collection = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
-            .filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')) \
-            .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 30)) \
-            .select(['B4', 'B3', 'B2'])
-        
-        # Create median composite
-        s2_mosaic = s2_collection.median()
-        
-        # Visualization parameters for true color
-        vis_params = {
-            'bands': ['B4', 'B3', 'B2'],
-            'min': 0,
-            'max': 3000,
-            'gamma': 1.4
-        }
-        
-        # Generate map tiles
-        map_id = s2_mosaic.visualize(**vis_params).getMapId()
+        # Bounds snap to a small set of cached regions (default: global view)
+        region = snap_bounds(bounds)
+        map_info = basemap_store.get(region)
         
         return jsonify({
             'success': True,
-            'tile_url': map_id['tile_fetcher'].url_format,
-            'mapid': map_id['mapid']
+            'tile_url': map_info['tile_url'],
+            'mapid': map_info['mapid'],
+            'proxy_url': map_info['proxy_url'],
+            'region': list(region)
         })
     
     except Exception as e:
@@ -231,133 +522,481 @@ def get_basemap():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/tiles/<key>/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_tile(key, z, x, y):
+    """Serve an analysis or basemap tile from the disk cache, fetching it from Earth Engine on a miss"""
+    try:
+        body, content_type, cache_hit = tile_proxy.get_tile(key, z, x, y)
+    except TileNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except TileUpstreamError as e:
+        return jsonify({'error': str(e)}), 502
+    
+    response = Response(body, mimetype=content_type)
+    # A layer key always names the same imagery, so tiles never change
+    response.cache_control.public = True
+    response.cache_control.max_age = TILE_MAX_AGE_S
+    response.cache_control.immutable = True
+    response.headers['X-Tile-Cache'] = 'hit' if cache_hit else 'miss'
+    return response
+
 
 @app.route('/api/geocode', methods=['POST'])
 def geocode():
-    """Geocode a location string to coordinates"""
+    """Geocode a location string to coordinates.
+
+    Pass "slim": true (or ?slim=1) to omit the raw Nominatim payload.
+    """
     try:
         data = request.json
         location_str = data.get('location')
+        slim = bool(data.get('slim')) or request.args.get('slim') in ('1', 'true')
         
         if not location_str:
             return jsonify({'error': 'Location parameter required'}), 400
         
-        location = geolocator.geocode(location_str)
+        location = geocoding_service.geocode(location_str, timeout=GEOCODE_TIMEOUT_S)
         
         if not location:
             return jsonify({'error': 'Location not found'}), 404
         
-        return jsonify({
-            'latitude': location.latitude,
-            'longitude': location.longitude,
-            'address': location.address,
-            'raw': location.raw
-        })
+        response = {
+            'latitude': location['latitude'],
+            'longitude': location['longitude'],
+            'address': location['address']
+        }
+        if not slim:
+            response['raw'] = location['raw']
+        
+        return jsonify(response)
+    
+    except FutureTimeoutError:
+        return jsonify({'error': 'Geocoding service busy, please retry shortly'}), 503
+    
+    except QueueFull:
+        return jsonify({'error': 'Geocoding queue is full, please retry shortly'}), 503
     
     except Exception as e:
         logging.error(f"Geocoding error: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+def format_analysis_response(lat, lon, mineral_type, mineral_types, analysis, classifications,
+                             start_date, end_date, nearby_places, cache_hit):
+    """Shape an analysis into the /api/analyze response body.
+
+    Single-mineral requests keep the flat statistics/threshold/coverage layout,
+    multi-mineral requests nest them per mineral under 'results'.
+    """
+    response = {
+        'success': True,
+        'location': {
+            'latitude': lat,
+            'longitude': lon
+        },
+        'mineral_type': mineral_type,
+        'num_images': analysis['num_images'],
+        'start_date': start_date,
+        'end_date': end_date,
+        'nearby_places': nearby_places,
+        'cached': cache_hit
+    }
+
+    if isinstance(mineral_type, str) and mineral_type in MINERAL_TYPES:
+        mineral = analysis['minerals'][mineral_type]
+        response.update({
+            'statistics': mineral['statistics'],
+            'threshold': mineral['threshold'],
+            'coverage_percent': mineral['coverage_percent'],
+            'scale_m': mineral.get('scale_m'),
+            'coverage_error': mineral.get('coverage_error'),
+            'classification': classifications[mineral_type],
+            'map_tiles': {
+                'true_color': analysis['map_tiles']['true_color'],
+                'mineral_index': mineral['map_tile'],
+                'false_color': analysis['map_tiles']['false_color']
+            }
+        })
+    else:
+        response.update({
+            'minerals': mineral_types,
+            'results': {
+                m: dict(
+                    {key: value for key, value in analysis['minerals'][m].items() if key != 'histogram'},
+                    classification=classifications[m]
+                )
+                for m in mineral_types
+            },
+            'map_tiles': analysis['map_tiles']
+        })
+    
+    return response
+
+
+def run_analysis(data):
+    """Run a full location analysis for a request payload; returns (response, status_code).
+
+    mineral_type may be a single mineral, 'all' or a list; multi-mineral
+    requests share one composite and one reduction pass.
+    """
+    try:
+        lat = float(data.get('latitude'))
+        lon = float(data.get('longitude'))
+        mineral_type = data.get('mineral_type', 'iron')
+        mineral_types = parse_mineral_types(mineral_type)
+        
+        if mineral_types is None:
+            return {'error': f'Unsupported mineral type: {mineral_type}'}, 400
+        
+        # Nearby places do not depend on the imagery, start the lookup right away
+        nearby_future = start_nearby_places(lat, lon)
+        
+        # Snap the area of interest and date window so repeat analyses hit the cache
+        center_lat, center_lon = snap_coordinates(lat, lon, ROI_SNAP_DECIMALS)
+        start_date, end_date = get_analysis_window()
+        
+        analysis, cache_hit = get_cached_analysis(
+            center_lat, center_lon, mineral_types, start_date, end_date
+        )
+        
+        if analysis is None:
+            return {'error': 'No clear satellite images found for this location'}, 404
+        
+        # Classify location per mineral
+        classifications = {
+            m: classify_location(lat, lon, analysis['minerals'][m]['coverage_percent'], m)
+            for m in mineral_types
+        }
+        
+        # A slow Nominatim response should not hold back the tiles
+        nearby_places = finish_nearby_places(nearby_future)
+        
+        response = format_analysis_response(
+            lat, lon, mineral_type, mineral_types, analysis, classifications,
+            start_date, end_date, nearby_places, cache_hit
+        )
+        
+        return response, 200
+    
+    except Exception as e:
+        logging.error(f"Analysis error: {e}")
+        return {'error': str(e)}, 500
+
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_location():
     """Main analysis endpoint - processes satellite imagery and detects minerals"""
+    response, status = run_analysis(request.json)
+    return jsonify(response), status
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/analyze/stream', methods=['GET', 'POST'])
+def analyze_location_stream():
+    """Streaming analysis - pushes each stage as a Server-Sent Event as soon as it is ready.
+
+    Events, in order: images, statistics, classification, one tile event per
+    layer, nearby_places, then done (the full /api/analyze response) or error.
+    Accepts a JSON body or query parameters (for EventSource clients).
+    """
+    data = request.get_json(silent=True) or request.args.to_dict()
+    try:
+        lat = float(data.get('latitude'))
+        lon = float(data.get('longitude'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'latitude and longitude parameters required'}), 400
+    
+    mineral_type = data.get('mineral_type', 'iron')
+    mineral_types = parse_mineral_types(mineral_type)
+    
+    if mineral_types is None:
+        return jsonify({'error': f'Unsupported mineral type: {mineral_type}'}), 400
+    
+    def generate():
+        try:
+            nearby_future = start_nearby_places(lat, lon)
+            
+            center_lat, center_lon = snap_coordinates(lat, lon, ROI_SNAP_DECIMALS)
+            start_date, end_date = get_analysis_window()
+            cache_key = analysis_cache_key(
+                center_lat, center_lon, mineral_types, start_date, end_date
+            )
+            analysis = load_analysis(cache_key)
+            cache_hit = analysis is not None
+            
+            if not cache_hit:
+                flight, leader = analysis_flights.acquire(cache_key)
+                if not leader:
+                    # The same analysis is already running, replay its result when it lands
+                    analysis = flight.result()
+                    if analysis is None:
+                        yield sse_event('error', {
+                            'error': 'No clear satellite images found for this location'
+                        })
+                        return
+                    cache_hit = True
+            
+            if cache_hit:
+                yield sse_event('images', {
+                    'num_images': analysis['num_images'],
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'cached': True
+                })
+                yield sse_event('statistics', {
+                    m: {
+                        key: value for key, value in analysis['minerals'][m].items()
+                        if key not in ('map_tile', 'histogram')
+                    }
+                    for m in mineral_types
+                })
+                classifications = {
+                    m: classify_location(lat, lon, analysis['minerals'][m]['coverage_percent'], m)
+                    for m in mineral_types
+                }
+                yield sse_event('classification', classifications)
+                
+                for layer, tile in analysis['map_tiles'].items():
+                    yield sse_event('tile', {'layer': layer, 'tile': tile})
+                for m in mineral_types:
+                    yield sse_event('tile', {
+                        'layer': f'{m}_index',
+                        'tile': analysis['minerals'][m]['map_tile']
+                    })
+            else:
+                # Waiting requests get this error if the client disconnects mid-stream
+                flight_error = RuntimeError('Analysis was interrupted before it finished')
+                try:
+                    plan = None
+                    tiles = {}
+                    for stage, value in iter_analysis_stages(
+                        center_lat, center_lon, mineral_types, start_date, end_date
+                    ):
+                        if stage == 'plan':
+                            plan = value
+                            yield sse_event('images', {
+                                'num_images': plan['num_images'],
+                                'start_date': start_date,
+                                'end_date': end_date,
+                                'cached': False
+                            })
+                            
+                            if plan['num_images'] == 0:
+                                flight_error = None
+                                yield sse_event('error', {
+                                    'error': 'No clear satellite images found for this location'
+                                })
+                                return
+                            
+                            yield sse_event('statistics', {
+                                m: mineral_plan_results(plan, m) for m in mineral_types
+                            })
+                            classifications = {
+                                m: classify_location(lat, lon, plan['coverage_percent'][m], m)
+                                for m in mineral_types
+                            }
+                            yield sse_event('classification', classifications)
+                        else:
+                            layer, tile = value
+                            tile = proxy_tile(cache_key, layer, tile)
+                            tiles[layer] = tile
+                            yield sse_event('tile', {'layer': layer, 'tile': tile})
+                    
+                    analysis = assemble_analysis(plan, tiles, mineral_types)
+                    if is_complete_analysis(analysis):
+                        save_analysis(cache_key, analysis)
+                    flight_error = None
+                except Exception as e:
+                    flight_error = e
+                    raise
+                finally:
+                    analysis_flights.release(cache_key, flight, analysis, flight_error)
+            
+            nearby_places = finish_nearby_places(nearby_future)
+            yield sse_event('nearby_places', nearby_places)
+            
+            yield sse_event('done', format_analysis_response(
+                lat, lon, mineral_type, mineral_types, analysis, classifications,
+                start_date, end_date, nearby_places, cache_hit
+            ))
+        
+        except Exception as e:
+            logging.error(f"Streaming analysis error: {e}")
+            yield sse_event('error', {'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Background analyses for clients that should not hold a request open
+analysis_jobs = JobManager(run_analysis)
+
+
+@app.route('/api/jobs/analyze', methods=['POST'])
+def submit_analysis_job():
+    """Queue an analysis and return a job ID immediately"""
+    data = request.json
+    if not data or data.get('latitude') is None or data.get('longitude') is None:
+        return jsonify({'error': 'latitude and longitude parameters required'}), 400
+    
+    try:
+        job = analysis_jobs.submit(data)
+    except JobQueueFull:
+        return jsonify({'error': 'Too many analyses in progress, please retry shortly'}), 503
+    
+    job['status_url'] = f"/api/jobs/{job['job_id']}"
+    return jsonify(job), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Get the status, and once finished the result, of an analysis job"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job)
+
+
+def per_mineral_option(value, mineral_type):
+    """A request option given once for every mineral or as {mineral: value}.
+
+    Raises ValueError or TypeError when the value is not a finite number.
+    """
+    if isinstance(value, dict):
+        value = value.get(mineral_type)
+    if value is None:
+        return None
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f'Not a finite number: {value}')
+    return value
+
+
+@app.route('/api/rethreshold', methods=['POST'])
+def rethreshold():
+    """Coverage and classification of a cached analysis at another threshold.
+
+    Pass "threshold" (index value) or "percentile" (0-100), either a number or
+    {mineral: value}; neither gives the default threshold. Answered from the
+    index histogram cached with the analysis, with no compute backend work.
+    """
     try:
         data = request.json
         lat = float(data.get('latitude'))
         lon = float(data.get('longitude'))
         mineral_type = data.get('mineral_type', 'iron')
+        mineral_types = parse_mineral_types(mineral_type)
         
-        # Define area of interest
-        point = ee.Geometry.Point([lon, lat])
-        roi = point.buffer(10000)  # 10km radius
+        if mineral_types is None:
+            return jsonify({'error': f'Unsupported mineral type: {mineral_type}'}), 400
         
-        # Date range - last 1 year (Faster)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365)
+        try:
+            thresholds = {m: per_mineral_option(data.get('threshold'), m) for m in mineral_types}
+            percentiles = {m: per_mineral_option(data.get('percentile'), m) for m in mineral_types}
+        except (TypeError, ValueError):
+            return jsonify({'error': 'threshold and percentile must be numbers or {mineral: number}'}), 400
+        if any(p is not None and not 0 <= p <= 100 for p in percentiles.values()):
+            return jsonify({'error': 'percentile must be between 0 and 100'}), 400
         
-        # Load Sentinel-2 imagery
-        collection = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
-            .filterBounds(roi) \
-            .filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')) \
-            .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20)) \
-            .sort('CLOUDY_PIXEL_PERCENTAGE') \
-            .limit(50)
+        # Same snapped ROI and window as /api/analyze
+        center_lat, center_lon = snap_coordinates(lat, lon, ROI_SNAP_DECIMALS)
+        start_date, end_date = get_analysis_window()
+        analysis = load_analysis(
+            analysis_cache_key(center_lat, center_lon, mineral_types, start_date, end_date)
+        )
         
-        num_images = collection.size().getInfo()
+        if analysis is None or not all(
+            analysis['minerals'][m].get('histogram') for m in mineral_types
+        ):
+            return jsonify({'error': 'No cached analysis for this location, run /api/analyze first'}), 404
         
-        if num_images == 0:
-            return jsonify({'error': 'No clear satellite images found for this location'}), 404
+        results = {}
+        for m in mineral_types:
+            histogram = IndexHistogram.from_dict(analysis['minerals'][m]['histogram'])
+            threshold = thresholds[m]
+            if threshold is None and percentiles[m] is not None:
+                threshold = histogram.percentile(percentiles[m])
+            if threshold is None:
+                threshold = analysis['minerals'][m]['threshold']
+            
+            coverage = histogram.coverage_above(threshold)
+            results[m] = {
+                'threshold': threshold,
+                'default_threshold': analysis['minerals'][m]['threshold'],
+                'coverage_percent': coverage,
+                'percentiles': histogram.percentiles(),
+                'classification': classify_location(lat, lon, coverage, m)
+            }
         
-        # Create median composite
-        median_image = collection.median().clip(roi)
-        
-        # Calculate mineral index
-        mineral_index = calculate_mineral_index(median_image, mineral_type)
-        
-        # Calculate statistics (Optimized scale)
-        stats = mineral_index.reduceRegion(
-            reducer=ee.Reducer.mean().combine(
-                ee.Reducer.stdDev(), '', True
-            ),
-            geometry=roi,
-            scale=100,  # Optimized scale
-            maxPixels=1e9
-        ).getInfo()
-        
-        # Dynamic threshold
-        mean_val = stats.get(f'{mineral_type}_index_mean', 1.5)
-        std_val = stats.get(f'{mineral_type}_index_stdDev', 0.3)
-        threshold = mean_val + (0.5 * std_val)
-        
-        # Calculate coverage percentage (Optimized scale)
-        threshold_mask = mineral_index.gt(threshold)
-        coverage_stats = threshold_mask.reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=roi,
-            scale=100,  # Optimized scale
-            maxPixels=1e9
-        ).getInfo()
-        
-        coverage_percent = coverage_stats.get(f'{mineral_type}_index', 0) * 100
-        
-        # Classify location
-        classification_result = classify_location(lat, lon, coverage_percent, mineral_type)
-        
-        # Get nearby places
-        nearby_places = get_nearby_places(lat, lon)
-        
-        # Generate map tile URLs with mineral-specific palettes
-        vis_params_true_color = {
-            'bands': ['B4', 'B3', 'B2'],
-            'min': 0,
-            'max': 3000,
-            'gamma': 1.4
+        response = {
+            'success': True,
+            'location': {
+                'latitude': lat,
+                'longitude': lon
+            },
+            'mineral_type': mineral_type,
+            'start_date': start_date,
+            'end_date': end_date
         }
+        if isinstance(mineral_type, str) and mineral_type in MINERAL_TYPES:
+            response.update(results[mineral_type])
+        else:
+            response.update({'minerals': mineral_types, 'results': results})
+        return jsonify(response)
+    
+    except Exception as e:
+        logging.error(f"Rethreshold error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/time-series', methods=['POST'])
+def time_series_analysis():
+    """Monthly mineral index mean and coverage with change flags against the baseline.
+
+    The whole series comes from one backend evaluation; pass "months" (default 12).
+    """
+    try:
+        data = request.json
+        lat = float(data.get('latitude'))
+        lon = float(data.get('longitude'))
+        mineral_type = data.get('mineral_type', 'iron')
+        months = int(data.get('months', TIMESERIES_DEFAULT_MONTHS))
         
-        # Mineral-specific color palettes
-        mineral_palettes = {
-            'iron': ['#ffb3b3', '#ff9999', '#ff6b6b', '#ee5a6f', '#d63447', '#8b0000'],
-            'aluminum': ['#b8f3ef', '#6ee7df', '#4ecdc4', '#44a3a0', '#2d8b85', '#1a5653'],
-            'copper': ['#ffd8a8', '#ffb86c', '#ffa94d', '#ff8c42', '#e67700', '#b35900']
-        }
+        if mineral_type not in MINERAL_TYPES:
+            return jsonify({'error': f'Unsupported mineral type: {mineral_type}'}), 400
+        if not 1 <= months <= TIMESERIES_MAX_MONTHS:
+            return jsonify({'error': f'months must be between 1 and {TIMESERIES_MAX_MONTHS}'}), 400
         
-        vis_params_mineral = {
-            'min': threshold - 0.5,
-            'max': threshold + 2.0,
-            'palette': mineral_palettes.get(mineral_type, mineral_palettes['iron'])
-        }
+        center_lat, center_lon = snap_coordinates(lat, lon, ROI_SNAP_DECIMALS)
+        _, end_date = get_analysis_window()
+        windows = monthly_windows(end_date, months)
+        start_date = windows[0][1]
         
-        vis_params_false_color = {
-            'bands': ['B8', 'B4', 'B3'],
-            'min': 0,
-            'max': 3000,
-            'gamma': 1.4
-        }
+        cache_key = ('time_series',) + make_analysis_key(
+            center_lat, center_lon, ANALYSIS_RADIUS_M, mineral_type, start_date, end_date
+        )
+        series = time_series_cache.get(cache_key)
+        cache_hit = series is not None
         
-        true_color_tile = median_image.visualize(**vis_params_true_color).getMapId()
-        mineral_tile = mineral_index.visualize(**vis_params_mineral).getMapId()
-        false_color_tile = median_image.visualize(**vis_params_false_color).getMapId()
+        if not cache_hit:
+            def compute():
+                result = flag_changes(compute_backend.time_series(
+                    center_lat, center_lon, ANALYSIS_RADIUS_M, mineral_type, windows
+                ))
+                time_series_cache.set(cache_key, result)
+                return result
+            
+            series, _ = analysis_flights.do(cache_key, compute)
+        
+        if series['baseline']['num_images'] == 0:
+            return jsonify({'error': 'No clear satellite images found for this location'}), 404
         
         return jsonify({
             'success': True,
@@ -366,32 +1005,17 @@ def analyze_location():
                 'longitude': lon
             },
             'mineral_type': mineral_type,
-            'num_images': num_images,
-            'start_date': start_date.strftime('%Y-%m-%d'),
-            'end_date': end_date.strftime('%Y-%m-%d'),
-            'statistics': stats,
-            'threshold': threshold,
-            'coverage_percent': coverage_percent,
-            'classification': classification_result,
-            'nearby_places': nearby_places,
-            'map_tiles': {
-                'true_color': {
-                    'url': true_color_tile['tile_fetcher'].url_format,
-                    'mapid': true_color_tile['mapid']
-                },
-                'mineral_index': {
-                    'url': mineral_tile['tile_fetcher'].url_format,
-                    'mapid': mineral_tile['mapid']
-                },
-                'false_color': {
-                    'url': false_color_tile['tile_fetcher'].url_format,
-                    'mapid': false_color_tile['mapid']
-                }
-            }
+            'start_date': start_date,
+            'end_date': end_date,
+            'baseline': series['baseline'],
+            'months': series['months'],
+            'changed_months': series['changed_months'],
+            'change_threshold_points': series['change_threshold_points'],
+            'cached': cache_hit
         })
     
     except Exception as e:
-        logging.error(f"Analysis error: {e}")
+        logging.error(f"Time series error: {e}")
         return jsonify({'error': str(e)}), 500
 
 
@@ -406,35 +1030,37 @@ def point_analysis():
         center_lon = float(data.get('center_longitude'))
         mineral_type = data.get('mineral_type', 'iron')
         
+        if mineral_type not in MINERAL_TYPES:
+            return jsonify({'error': f'Unsupported mineral type: {mineral_type}'}), 400
+        
         # Calculate distance from center
         distance = geodesic((lat, lon), (center_lat, center_lon)).kilometers
         
-        if distance > 10:
-            return jsonify({'error': 'Point outside analysis radius (10km)'}), 400
-        
-        # Define area of interest around center
-        center_point = ee.Geometry.Point([center_lon, center_lat])
-        roi = center_point.buffer(10000)
-        
-        # Load and process imagery (Optimized)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365)
+        if distance > ANALYSIS_RADIUS_M / 1000:
+            return jsonify({'error': f'Point outside analysis radius ({ANALYSIS_RADIUS_M / 1000:g}km)'}), 400
         
-        collection = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
-            .filterBounds(roi) \
-            .filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')) \
-            .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20)) \
-            .sort('CLOUDY_PIXEL_PERCENTAGE') \
-            .limit(50)
-        
-        median_image = collection.median().clip(roi)
-        mineral_index = calculate_mineral_index(median_image, mineral_type)
+        # Same snapped ROI and window as /api/analyze
+        snapped_lat, snapped_lon = snap_coordinates(center_lat, center_lon, ROI_SNAP_DECIMALS)
+        start_date, end_date = get_analysis_window()
+        analysis_key = make_analysis_key(
+            snapped_lat, snapped_lon, ANALYSIS_RADIUS_M, mineral_type, start_date, end_date
+        )
+        point_key = (analysis_key, snap_coordinates(lat, lon, POINT_SNAP_DECIMALS))
         
-        # Get value at point (Optimized scale)
-        mineral_value = get_mineral_index_at_point(mineral_index, lat, lon, mineral_type)
+        mineral_value = point_value_cache.get(point_key)
+        cache_hit = mineral_value is not None
         
-        if mineral_value is None:
-            return jsonify({'error': 'Could not retrieve mineral index'}), 500
+        if not cache_hit:
+            values = compute_backend.sample_points(
+                snapped_lat, snapped_lon, ANALYSIS_RADIUS_M, mineral_type,
+                start_date, end_date, [(lat, lon)]
+            )
+            mineral_value = values[0] if values else None
+            
+            if mineral_value is None:
+                return jsonify({'error': 'Could not retrieve mineral index'}), 500
+            
+            point_value_cache.set(point_key, mineral_value)
         
         return jsonify({
             'success': True,
@@ -442,7 +1068,8 @@ def point_analysis():
             'longitude': lon,
             'distance_from_center': distance,
             'mineral_value': mineral_value,
-            'mineral_type': mineral_type
+            'mineral_type': mineral_type,
+            'cached': cache_hit
         })
     
     except Exception as e:
@@ -450,26 +1077,274 @@ def point_analysis():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/point-analysis/batch', methods=['POST'])
+def batch_point_analysis():
+    """Analyze mineral content at many points around one center in a single backend call"""
+    try:
+        data = request.json
+        center_lat = float(data.get('center_latitude'))
+        center_lon = float(data.get('center_longitude'))
+        mineral_type = data.get('mineral_type', 'iron')
+        raw_points = data.get('points') or []
+        
+        if mineral_type not in MINERAL_TYPES:
+            return jsonify({'error': f'Unsupported mineral type: {mineral_type}'}), 400
+        if not raw_points:
+            return jsonify({'error': 'points parameter required'}), 400
+        if len(raw_points) > MAX_BATCH_POINTS:
+            return jsonify({'error': f'At most {MAX_BATCH_POINTS} points per request'}), 400
+        
+        try:
+            points = parse_points(raw_points)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        snapped_lat, snapped_lon = snap_coordinates(center_lat, center_lon, ROI_SNAP_DECIMALS)
+        start_date, end_date = get_analysis_window()
+        analysis_key = make_analysis_key(
+            snapped_lat, snapped_lon, ANALYSIS_RADIUS_M, mineral_type, start_date, end_date
+        )
+        
+        results = []
+        to_sample = []  # indexes of in-radius points missing from the cache
+        for i, (lat, lon) in enumerate(points):
+            distance = geodesic((lat, lon), (center_lat, center_lon)).kilometers
+            result = {
+                'latitude': lat,
+                'longitude': lon,
+                'distance_from_center': distance,
+                'mineral_value': None
+            }
+            if distance > ANALYSIS_RADIUS_M / 1000:
+                result['error'] = f'Point outside analysis radius ({ANALYSIS_RADIUS_M / 1000:g}km)'
+            else:
+                point_key = (analysis_key, snap_coordinates(lat, lon, POINT_SNAP_DECIMALS))
+                result['mineral_value'] = point_value_cache.get(point_key)
+                if result['mineral_value'] is None:
+                    to_sample.append(i)
+            results.append(result)
+        
+        if to_sample:
+            values = compute_backend.sample_points(
+                snapped_lat, snapped_lon, ANALYSIS_RADIUS_M, mineral_type,
+                start_date, end_date, [points[i] for i in to_sample]
+            )
+            
+            if values is None:
+                return jsonify({'error': 'Could not retrieve mineral index'}), 500
+            
+            for i, value in zip(to_sample, values):
+                results[i]['mineral_value'] = value
+                if value is not None:
+                    point_key = (analysis_key, snap_coordinates(*points[i], POINT_SNAP_DECIMALS))
+                    point_value_cache.set(point_key, value)
+        
+        return jsonify({
+            'success': True,
+            'center': {
+                'latitude': center_lat,
+                'longitude': center_lon
+            },
+            'mineral_type': mineral_type,
+            'count': len(results),
+            'sampled': len(to_sample),
+            'results': results
+        })
+    
+    except Exception as e:
+        logging.error(f"Batch point analysis error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/scan', methods=['POST'])
+def scan_region():
+    """Regional grid scan - per-cell mineral mean and coverage streamed as NDJSON.
+
+    Body: bounds [[south, west], [north, east]], cell_size_km (default 10) and
+    mineral_type. Lines are a 'scan' header, one 'cell' per grid cell as its
+    batch completes, and a final 'done' (or 'error').
+    """
+    try:
+        data = request.json
+        (south, west), (north, east) = data.get('bounds')
+        south, west, north, east = float(south), float(west), float(north), float(east)
+        cell_size_km = float(data.get('cell_size_km', 10))
+        mineral_type = data.get('mineral_type', 'iron')
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'bounds [[south, west], [north, east]] required'}), 400
+    
+    if mineral_type not in MINERAL_TYPES:
+        return jsonify({'error': f'Unsupported mineral type: {mineral_type}'}), 400
+    if north <= south or east <= west or cell_size_km < 1:
+        return jsonify({'error': 'Invalid bounds or cell size (minimum 1km)'}), 400
+    
+    _, _, n_rows, n_cols = scan_grid_shape(south, west, north, east, cell_size_km)
+    if n_rows * n_cols > MAX_SCAN_CELLS:
+        return jsonify({
+            'error': f'Scan would need {n_rows * n_cols} cells, at most {MAX_SCAN_CELLS} allowed'
+        }), 400
+    
+    if not compute_backend.supports_scan:
+        return jsonify({
+            'error': f'Regional scans are not supported by the {compute_backend.name} compute backend'
+        }), 501
+    
+    cells, _, _ = build_scan_grid(south, west, north, east, cell_size_km)
+    
+    def generate():
+        try:
+            start_date, end_date = get_analysis_window()
+            scale = max(100, cell_size_km * 10)  # ~100x100 samples per cell
+            
+            yield json.dumps({
+                'type': 'scan',
+                'mineral_type': mineral_type,
+                'bounds': [[south, west], [north, east]],
+                'cell_size_km': cell_size_km,
+                'rows': n_rows,
+                'cols': n_cols,
+                'cells': len(cells),
+                'start_date': start_date,
+                'end_date': end_date
+            }) + '\n'
+            
+            # Batches stream as they finish
+            failed = 0
+            batches = compute_backend.scan_cells(
+                (south, west, north, east), cells, mineral_type, start_date, end_date, scale
+            )
+            for batch, values in batches:
+                if values is None:
+                    failed += len(batch)
+                    for cell in batch:
+                        yield json.dumps({
+                            'type': 'cell', 'row': cell['row'], 'col': cell['col'],
+                            'error': 'Reduction failed or timed out'
+                        }) + '\n'
+                    continue
+                
+                centers = [
+                    ((cell['south'] + cell['north']) / 2, (cell['west'] + cell['east']) / 2)
+                    for cell in batch
+                ]
+                coverages = [coverage or 0 for _, coverage in values]
+                verdicts = classify_locations_bulk(
+                    [lat for lat, _ in centers], [lon for _, lon in centers], coverages, mineral_type
+                )
+                
+                for i, cell in enumerate(batch):
+                    yield json.dumps({
+                        'type': 'cell',
+                        'row': cell['row'],
+                        'col': cell['col'],
+                        'center': {'latitude': centers[i][0], 'longitude': centers[i][1]},
+                        'bounds': [[cell['south'], cell['west']], [cell['north'], cell['east']]],
+                        'mean_index': values[i][0],
+                        'coverage_percent': coverages[i],
+                        'classification': verdicts[i]['classification'],
+                        'classification_type': verdicts[i]['classification_type'],
+                        'nearest_mine': verdicts[i]['nearest_mine'],
+                        'nearest_mine_distance': verdicts[i]['distance']
+                    }) + '\n'
+            
+            yield json.dumps({'type': 'done', 'cells': len(cells), 'failed': failed}) + '\n'
+        
+        except Exception as e:
+            logging.error(f"Scan error: {e}")
+            yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/classify-batch', methods=['POST'])
+def classify_batch():
+    """Classify many locations by proximity to legal mining areas in one call"""
+    try:
+        data = request.json
+        mineral_type = data.get('mineral_type', 'iron')
+        raw_points = data.get('points') or []
+        coverage = data.get('coverage_percent', 0.0)
+        
+        if not raw_points:
+            return jsonify({'error': 'points parameter required'}), 400
+        if len(raw_points) > MAX_CLASSIFY_POINTS:
+            return jsonify({'error': f'At most {MAX_CLASSIFY_POINTS} points per request'}), 400
+        if isinstance(coverage, list) and len(coverage) != len(raw_points):
+            return jsonify({'error': 'coverage_percent must be a number or one value per point'}), 400
+        
+        try:
+            points = parse_points(raw_points)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        results = classify_locations_bulk(
+            [lat for lat, _ in points],
+            [lon for _, lon in points],
+            coverage,
+            mineral_type
+        )
+        
+        return jsonify({
+            'success': True,
+            'mineral_type': mineral_type,
+            'count': len(results),
+            'results': results
+        })
+    
+    except Exception as e:
+        logging.error(f"Batch classification error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def parse_bbox(raw_bbox):
+    """Parse 'south,west,north,east' into a tuple, or raise ValueError"""
+    south, west, north, east = (float(value) for value in raw_bbox.split(','))
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError(raw_bbox)
+    return south, west, north, east
+
+
 @app.route('/api/legal-mines', methods=['GET'])
 def get_legal_mines():
-    """Get all legal mining areas"""
+    """Get legal mining areas from pre-serialized, ETag-validated bodies.
+
+    Optional filters: mineral_type, country, bbox=south,west,north,east (west > east
+    crosses the antimeridian); offset and limit paginate the result.
+    """
     mineral_type = request.args.get('mineral_type')
     country = request.args.get('country')
     
-    mines = []
-    for name, (lat, lon, mine_country, mine_type) in LEGAL_MINING_AREAS.items():
-        if mineral_type and mine_type != mineral_type:
-            continue
-        if country and mine_country != country:
-            continue
-        
-        mines.append({
-            'name': name,
-            'latitude': lat,
-            'longitude': lon,
-            'country': mine_country,
-            'type': mine_type
-        })
+    try:
+        bbox = parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+    except ValueError:
+        return jsonify({'error': 'bbox must be south,west,north,east; offset and limit integers'}), 400
+    
+    if offset < 0 or (limit is not None and not 0 < limit <= LEGAL_MINES_MAX_LIMIT):
+        return jsonify({'error': f'offset must be >= 0 and limit between 1 and {LEGAL_MINES_MAX_LIMIT}'}), 400
+    
+    body, etag = mine_catalog.body(mineral_type, country, bbox, offset, limit)
+    
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = LEGAL_MINES_MAX_AGE_S
+    # Answers If-None-Match with an empty 304
+    return response.make_conditional(request)
+
+
+@app.route('/api/legal-mines/nearest', methods=['GET'])
+def get_nearest_legal_mines():
+    """Get the k legal mining areas closest to a point"""
+    try:
+        lat = float(request.args.get('lat'))
+        lon = float(request.args.get('lon'))
+        k = min(int(request.args.get('k', 5)), 50)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'lat and lon parameters required'}), 400
+    
+    mineral_type = request.args.get('mineral_type')
+    mines = mine_index.nearest(lat, lon, k, mineral_type)
     
     return jsonify({
         'total': len(mines),
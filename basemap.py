@@ -0,0 +1,136 @@
+"""
+Basemap Map ID Store
+Pre-warmed, background-refreshed Earth Engine map IDs for the Sentinel-2 basemap
+
+The basemap composite is identical for every user, so map IDs are computed once
+per snapped region, served from memory and refreshed by a background thread
+before they go stale. Regions that stop being requested are dropped.
+
+Usage:
+    from basemap import BasemapStore, snap_bounds
+
+    store = BasemapStore(build_fn)
+    store.start()
+    map_info = store.get(snap_bounds(bounds))
+"""
+
+import logging
+import os
+import threading
+import time
+
+GLOBAL_REGION = (-90, -180, 90, 180)
+
+BASEMAP_REGION_STEP_DEG = int(os.getenv('BASEMAP_REGION_STEP', 30))
+BASEMAP_REFRESH_S = int(os.getenv('BASEMAP_REFRESH', 3600))
+BASEMAP_IDLE_S = int(os.getenv('BASEMAP_IDLE', 6 * 3600))
+BASEMAP_MAX_REGIONS = int(os.getenv('BASEMAP_MAX_REGIONS', 32))
+
+
+def snap_bounds(bounds, step=BASEMAP_REGION_STEP_DEG):
+    """Snap [[south, west], [north, east]] outward to a coarse grid region.
+
+    Returns a (south, west, north, east) tuple; missing or very large bounds
+    map to the single global region.
+    """
+    if not bounds:
+        return GLOBAL_REGION
+
+    (south, west), (north, east) = bounds
+    south = max(-90, int(south // step) * step)
+    west = max(-180, int(west // step) * step)
+    north = min(90, -int(-north // step) * step)
+    east = min(180, -int(-east // step) * step)
+
+    # Anything spanning half the globe is served by the global map
+    if (north - south) * (east - west) >= 180 * 360 / 2 or east <= west or north <= south:
+        return GLOBAL_REGION
+    return south, west, north, east
+
+
+class BasemapStore:
+    """In-memory map IDs per region with on-demand build and background refresh"""
+
+    def __init__(self, build_fn, refresh_seconds=BASEMAP_REFRESH_S,
+                 idle_seconds=BASEMAP_IDLE_S, max_regions=BASEMAP_MAX_REGIONS):
+        self.build_fn = build_fn
+        self.refresh_seconds = refresh_seconds
+        self.idle_seconds = idle_seconds
+        self.max_regions = max_regions
+        self._entries = {}
+        self._region_locks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _region_lock(self, region):
+        with self._lock:
+            return self._region_locks.setdefault(region, threading.Lock())
+
+    def _build(self, region):
+        map_info = self.build_fn(region)
+        now = time.time()
+        with self._lock:
+            last_used = self._entries.get(region, {}).get('last_used', now)
+            self._entries[region] = {'map': map_info, 'updated_at': now, 'last_used': last_used}
+        return map_info
+
+    def get(self, region):
+        """Return map info for a region, building it once on first use"""
+        with self._lock:
+            entry = self._entries.get(region)
+            if entry is not None:
+                entry['last_used'] = time.time()
+                return entry['map']
+
+        # One build per region even when many requests arrive at once
+        with self._region_lock(region):
+            with self._lock:
+                entry = self._entries.get(region)
+                if entry is not None:
+                    entry['last_used'] = time.time()
+                    return entry['map']
+            self._evict_if_full()
+            return self._build(region)
+
+    def _evict_if_full(self):
+        with self._lock:
+            regional = [r for r in self._entries if r != GLOBAL_REGION]
+            if len(regional) < self.max_regions:
+                return
+            oldest = min(regional, key=lambda r: self._entries[r]['last_used'])
+            del self._entries[oldest]
+
+    def refresh(self):
+        """Rebuild stale map IDs and drop regions idle for longer than idle_seconds"""
+        now = time.time()
+        with self._lock:
+            for region in [r for r, e in self._entries.items()
+                           if r != GLOBAL_REGION and now - e['last_used'] > self.idle_seconds]:
+                del self._entries[region]
+            stale = [r for r, e in self._entries.items()
+                     if now - e['updated_at'] >= self.refresh_seconds]
+            if GLOBAL_REGION not in self._entries:
+                stale.append(GLOBAL_REGION)
+
+        for region in stale:
+            try:
+                with self._region_lock(region):
+                    self._build(region)
+            except Exception as e:
+                logging.error(f"Basemap refresh failed for {region}: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            # Wake often enough to refresh entries before they pass the refresh age
+            self._stop.wait(max(60, self.refresh_seconds / 4))
+
+    def start(self):
+        """Warm the global map and keep refreshing in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='basemap-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,361 @@
+"""
+Micro-benchmarks
+CPU-bound hot paths timed in-process, with ops/s and allocations per call
+
+Benchmarks:
+    classify_location[<n> mines]   proximity classification against mine databases of n entries
+    legal_mines[<filter>]          GET /api/legal-mines through the Flask test client
+    analyze_json[<minerals>]       JSON serialization of a full /api/analyze response
+    extract_nearby_places          post-processing of sample Nominatim reverse payloads
+
+Allocations are measured with tracemalloc on separate calls: allocs_per_call
+counts the memory blocks a call allocates that are still alive when it returns
+(its result and whatever it built), from snapshots taken around each call;
+peak_kib is the peak extra memory traced during one call, which also covers
+temporaries freed before the call returns; retained_blocks the memory blocks
+still allocated per call after the result is dropped (a leak indicator).
+
+Results are compared against benchmarks/baseline.json; a benchmark whose
+ops/s drops more than --tolerance below its baseline is a regression and the
+run exits with status 1. Baselines are machine specific, save them again on
+the machine you compare on.
+
+Usage:
+    python benchmarks/bench.py              # run and compare against the baseline
+    python benchmarks/bench.py --save       # run and overwrite the baseline
+    python benchmarks/bench.py -k classify  # only benchmarks whose name contains 'classify'
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+# Importing app must not start the basemap refresh thread
+os.environ.setdefault('BASEMAP_PREWARM', '0')
+
+from geopy.location import Location  # noqa: E402
+
+import app as app_module  # noqa: E402
+import classification  # noqa: E402
+from geocoding import extract_nearby_places  # noqa: E402
+from legal_mining_sites import LEGAL_MINING_AREAS  # noqa: E402
+from mine_index import MineSpatialIndex  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+NOMINATIM_PAYLOADS_PATH = os.path.join(BENCH_DIR, 'data', 'nominatim_reverse.json')
+
+MINE_DB_SIZES = [len(LEGAL_MINING_AREAS), 1000, 10000, 100000]
+MIN_TIME_S = 0.2  # per timing repeat
+REPEATS = 5
+ALLOC_CALLS = 20
+DEFAULT_TOLERANCE = 0.3
+
+
+def synthetic_mines(n, seed=0):
+    """LEGAL_MINING_AREAS padded to n entries with jittered copies of real mines"""
+    rng = random.Random(seed)
+    mines = dict(LEGAL_MINING_AREAS)
+    originals = list(LEGAL_MINING_AREAS.items())
+    while len(mines) < n:
+        name, (lat, lon, country, mine_type) = rng.choice(originals)
+        lat = max(-89.9, min(89.9, lat + rng.uniform(-2, 2)))
+        lon = (lon + rng.uniform(-2, 2) + 180) % 360 - 180
+        mines[f'{name} #{len(mines)}'] = (lat, lon, country, mine_type)
+    return mines
+
+
+def query_points(seed=1, n=50):
+    """Half the points near real mines, half anywhere on land-ish latitudes"""
+    rng = random.Random(seed)
+    coords = [(lat, lon) for lat, lon, _, _ in LEGAL_MINING_AREAS.values()]
+    points = []
+    for i in range(n):
+        if i % 2 == 0:
+            lat, lon = rng.choice(coords)
+            points.append((lat + rng.uniform(-0.1, 0.1), lon + rng.uniform(-0.1, 0.1)))
+        else:
+            points.append((rng.uniform(-55, 70), rng.uniform(-180, 180)))
+    return points
+
+
+@contextmanager
+def mine_database(mines):
+    """Point classify_location at a different mine database"""
+    original = classification.mine_index
+    classification.mine_index = MineSpatialIndex(mines)
+    try:
+        yield
+    finally:
+        classification.mine_index = original
+
+
+def cycling(fn, args_list):
+    """Zero-argument callable applying fn to the next arguments of args_list on every call"""
+    args_iter = itertools.cycle(args_list)
+    return lambda: fn(*next(args_iter))
+
+
+def sample_analysis(mineral_types):
+    """Analysis structure shaped like a computed /api/analyze result"""
+    tile = {
+        'url': 'https://earthengine.googleapis.com/v1/projects/spectramining/maps/'
+               '0123456789abcdef0123456789abcdef-fedcba9876543210fedcba9876543210/tiles/{z}/{x}/{y}',
+        'mapid': 'projects/spectramining/maps/0123456789abcdef0123456789abcdef-fedcba9876543210'
+    }
+    return {
+        'num_images': 37,
+        'minerals': {
+            m: {
+                'statistics': {f'{m}_index_mean': 1.3421337, f'{m}_index_stdDev': 0.1873402},
+                'threshold': 1.4358038,
+                'coverage_percent': 12.6542,
+                'scale_m': 400,
+                'coverage_error': 1.4571,
+                'map_tile': tile,
+                'histogram': {'min': 0.0, 'max': 8.0, 'counts': [i % 97 for i in range(500)]}
+            }
+            for m in mineral_types
+        },
+        'map_tiles': {'true_color': tile, 'false_color': tile}
+    }
+
+
+def analyze_response(mineral_type):
+    """Full /api/analyze response body for a request's mineral_type"""
+    lat, lon = 18.6297, 81.2578
+    mineral_types = app_module.parse_mineral_types(mineral_type)
+    analysis = sample_analysis(mineral_types)
+    classifications = {
+        m: classification.classify_location(lat, lon, analysis['minerals'][m]['coverage_percent'], m)
+        for m in mineral_types
+    }
+    nearby_places = [
+        {'name': f'Place {i}', 'type': 'Landmark', 'lat': lat + i * 1e-3, 'lon': lon - i * 1e-3}
+        for i in range(5)
+    ]
+    return app_module.format_analysis_response(
+        lat, lon, mineral_type, mineral_types, analysis, classifications,
+        '2025-10-18', '2026-10-18', nearby_places, False
+    )
+
+
+def nominatim_results():
+    """Sample reverse payloads as the geopy Location lists Nominatim returns"""
+    with open(NOMINATIM_PAYLOADS_PATH) as f:
+        payloads = json.load(f)
+    return [
+        [
+            Location(raw['display_name'], (float(raw['lat']), float(raw['lon'])), raw)
+            for raw in payload['results']
+        ]
+        for payload in payloads
+    ]
+
+
+def build_benchmarks():
+    """Return [(name, setup)] where setup() returns (fn, context manager or None)"""
+    benchmarks = []
+    points = query_points()
+
+    for size in MINE_DB_SIZES:
+        mines = synthetic_mines(size)
+        benchmarks.append((
+            f'classify_location[{size} mines]',
+            lambda mines=mines: (
+                cycling(classification.classify_location,
+                        [(lat, lon, 5.0, m) for (lat, lon), m in
+                         zip(points, itertools.cycle(['iron', 'aluminum', 'copper']))]),
+                mine_database(mines)
+            )
+        ))
+
+    client = app_module.app.test_client()
+    for label, query in [('all', ''), ('type', '?mineral_type=Iron%20Ore'), ('country', '?country=India')]:
+        benchmarks.append((
+            f'legal_mines[{label}]',
+            lambda query=query: (lambda: client.get(f'/api/legal-mines{query}').data, None)
+        ))
+
+    json_provider = app_module.app.json
+    for mineral_type in ['iron', 'all']:
+        response = analyze_response(mineral_type)
+        benchmarks.append((
+            f'analyze_json[{mineral_type}]',
+            lambda response=response: (lambda: json_provider.dumps(response), None)
+        ))
+
+    results = nominatim_results()
+    benchmarks.append((
+        'extract_nearby_places',
+        lambda: (cycling(extract_nearby_places, [(r,) for r in results]), None)
+    ))
+    return benchmarks
+
+
+def time_ops(fn):
+    """Best ops/s over REPEATS runs of at least MIN_TIME_S each"""
+    # Calibrate a loop count that runs for about MIN_TIME_S
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME_S:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(MIN_TIME_S / elapsed) + 1))
+
+    best = elapsed / loops
+    for _ in range(REPEATS - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return 1 / best
+
+
+# Ignore the measurement loop's own bookkeeping
+OWN_FRAMES = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+
+def allocated_blocks(before, after):
+    """Memory blocks allocated between two snapshots, per source line, ignoring frees"""
+    stats = after.filter_traces(OWN_FRAMES).compare_to(before.filter_traces(OWN_FRAMES), 'lineno')
+    return sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+
+
+def measure_allocations(fn):
+    """(blocks allocated per call, peak KiB during one call, memory blocks retained per call)"""
+    fn()  # warm lazily built state outside the measurement
+    gc.collect()
+    tracemalloc.start()
+    try:
+        # Snapshots allocate too, so they are kept out of the peak loop below
+        allocs = 0
+        for _ in range(ALLOC_CALLS):
+            before = tracemalloc.take_snapshot()
+            result = fn()
+            allocs += allocated_blocks(before, tracemalloc.take_snapshot())
+            del result
+        gc.collect()
+
+        before = tracemalloc.take_snapshot()
+        peak = 0
+        for _ in range(ALLOC_CALLS):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    retained = sum(
+        stat.count_diff for stat in
+        after.filter_traces(OWN_FRAMES).compare_to(before.filter_traces(OWN_FRAMES), 'filename')
+    )
+    return allocs / ALLOC_CALLS, peak / 1024, retained / ALLOC_CALLS
+
+
+def run(name_filter=None):
+    results = {}
+    for name, setup in build_benchmarks():
+        if name_filter and name_filter not in name:
+            continue
+        fn, context = setup()
+        with context or nullcontext():
+            ops_per_sec = time_ops(fn)
+            allocs_per_call, peak_kib, retained_blocks = measure_allocations(fn)
+        results[name] = {
+            'ops_per_sec': round(ops_per_sec, 1),
+            'allocs_per_call': round(allocs_per_call, 1),
+            'peak_kib': round(peak_kib, 2),
+            'retained_blocks': round(retained_blocks, 2)
+        }
+        print(f'  {name:<36} {ops_per_sec:>12,.1f} ops/s', flush=True)
+    return results
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return None
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def save_baseline(results):
+    baseline = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results
+    }
+    with open(BASELINE_PATH, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def report(results, baseline, tolerance):
+    """Print the comparison table; return the names of regressed benchmarks"""
+    baseline_results = (baseline or {}).get('results', {})
+    regressions = []
+
+    print()
+    print(f"{'benchmark':<36} {'ops/s':>12} {'vs base':>9} {'allocs':>9} {'peak KiB':>10} {'retained':>9}")
+    for name, result in results.items():
+        base = baseline_results.get(name)
+        change = ''
+        if base:
+            ratio = result['ops_per_sec'] / base['ops_per_sec'] - 1
+            change = f'{ratio:+.1%}'
+            if ratio < -tolerance:
+                regressions.append(name)
+                change += ' !'
+        print(f"{name:<36} {result['ops_per_sec']:>12,.1f} {change:>9} {result['allocs_per_call']:>9.1f} "
+              f"{result['peak_kib']:>10.2f} {result['retained_blocks']:>9.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the CPU hot path micro-benchmarks')
+    parser.add_argument('--save', action='store_true', help='overwrite the baseline with this run')
+    parser.add_argument('-k', dest='name_filter', help='only run benchmarks whose name contains this')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed ops/s drop versus the baseline (default 0.3 = 30%%)')
+    args = parser.parse_args()
+
+    print('Running benchmarks...')
+    results = run(args.name_filter)
+    baseline = load_baseline()
+    regressions = report(results, baseline, args.tolerance)
+
+    if args.save:
+        if args.name_filter and baseline:
+            # Partial runs only replace the benchmarks they ran
+            results = dict(baseline.get('results', {}), **results)
+        save_baseline(results)
+        print(f'\nBaseline saved to {BASELINE_PATH}')
+        return 0
+
+    if baseline is None:
+        print('\nNo baseline yet, run with --save to create one')
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
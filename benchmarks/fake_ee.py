@@ -0,0 +1,305 @@
+"""
+Fake Earth Engine Module
+Drop-in stand-in for the `ee` package used by the load-replay harness
+
+Covers the part of the Earth Engine client API the app uses. Objects build a
+lazy graph like the real client and nothing leaves the process: getInfo() and
+getMapId() are the round trips, so they sleep for a latency drawn from the
+configured profile and fail at its error rate before evaluating the graph to
+plausible values (index means around the app's defaults, coverage fractions,
+sampled pixel values).
+
+Usage:
+    import sys
+    import fake_ee
+    from fake_services import LatencyProfile
+
+    fake_ee.configure(LatencyProfile(median_s=1.5, sigma=0.5, error_rate=0.01))
+    sys.modules['ee'] = fake_ee  # before anything imports ee
+"""
+
+import itertools
+import math
+import random
+import threading
+
+# Bands of a Sentinel-2 surface reflectance composite the app reads
+S2_BANDS = ['B2', 'B3', 'B4', 'B8', 'B11', 'B12']
+IMAGES_PER_COLLECTION = 12
+
+_profile = None
+_rng = random.Random(0)
+_rng_lock = threading.Lock()
+_map_ids = itertools.count(1)
+
+
+class EEException(Exception):
+    """Error raised by a failed round trip, like ee.EEException"""
+
+
+def configure(profile, seed=0):
+    """Set the latency profile of getInfo()/getMapId() round trips"""
+    global _profile, _rng
+    _profile = profile
+    _rng = random.Random(seed)
+
+
+def _uniform(low, high):
+    with _rng_lock:
+        return _rng.uniform(low, high)
+
+
+def _round_trip(call):
+    if _profile is not None:
+        _profile.wait(EEException, f'Earth Engine {call} failed (injected)')
+
+
+def _evaluate(value):
+    if isinstance(value, ComputedObject):
+        return value._compute()
+    if isinstance(value, dict):
+        return {key: _evaluate(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_evaluate(item) for item in value]
+    return value
+
+
+class ComputedObject:
+    """Lazy value; unknown chained methods (filterDate, clip, buffer...) return self"""
+
+    def __init__(self, compute=None):
+        self._compute_fn = compute
+
+    def _compute(self):
+        return self._compute_fn() if self._compute_fn else None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self
+
+    def getInfo(self):
+        _round_trip('getInfo')
+        return self._compute()
+
+
+class Number(ComputedObject):
+    def __init__(self, value):
+        super().__init__(lambda: _evaluate(value))
+
+    def _binary(self, other, op):
+        return Number(ComputedObject(lambda: op(self._compute(), _evaluate(other))))
+
+    def add(self, other):
+        return self._binary(other, lambda a, b: a + b)
+
+    def multiply(self, other):
+        return self._binary(other, lambda a, b: a * b)
+
+    def gt(self, other):
+        return self._binary(other, lambda a, b: int(a > b))
+
+
+class Dictionary(ComputedObject):
+    def __init__(self, value=None):
+        super().__init__(lambda: _evaluate(value or {}))
+
+    def get(self, key, default=None):
+        return ComputedObject(lambda: self._compute().get(key, _evaluate(default)))
+
+
+class List(ComputedObject):
+    def __init__(self, value):
+        super().__init__(lambda: _evaluate(value))
+
+    def map(self, fn):
+        return List(ComputedObject(lambda: [_evaluate(fn(ComputedObject(lambda item=item: item)))
+                                            for item in self._compute()]))
+
+
+class Algorithms:
+    @staticmethod
+    def If(condition, true_case, false_case):
+        return ComputedObject(
+            lambda: _evaluate(true_case) if _evaluate(condition) else _evaluate(false_case)
+        )
+
+
+class Filter:
+    @staticmethod
+    def lt(name, value):
+        return ComputedObject()
+
+
+class Reducer:
+    """Names and samplers of reducer outputs; a single output keeps the band name"""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    @staticmethod
+    def mean():
+        return Reducer([('mean', 'mean')])
+
+    @staticmethod
+    def stdDev():
+        return Reducer([('stdDev', 'stdDev')])
+
+    @staticmethod
+    def fixedHistogram(min, max, steps):
+        return Reducer([('histogram', ('histogram', min, max, steps))])
+
+    def combine(self, reducer2, outputPrefix='', sharedInputs=False):
+        return Reducer(self.outputs + reducer2.outputs)
+
+    def reduce(self, band, is_mask):
+        if len(self.outputs) == 1:
+            return {band: _band_statistic(self.outputs[0][1], is_mask)}
+        return {f'{band}_{name}': _band_statistic(stat, is_mask) for name, stat in self.outputs}
+
+
+def _band_statistic(stat, is_mask):
+    if isinstance(stat, tuple):
+        # Bell-shaped counts around an index of about 1.5 on the normalized axis
+        _, low, high, steps = stat
+        width = (high - low) / steps
+        center, spread = _uniform(0.17, 0.21), _uniform(0.02, 0.05)
+        return [
+            [low + i * width, round(1000 * math.exp(-((low + (i + 0.5) * width - center) / spread) ** 2 / 2))]
+            for i in range(steps)
+        ]
+    if is_mask:
+        return _uniform(0.02, 0.25) if stat == 'mean' else _uniform(0.1, 0.4)
+    return _uniform(1.3, 1.7) if stat == 'mean' else _uniform(0.2, 0.4)
+
+
+class Geometry(ComputedObject):
+    @staticmethod
+    def Point(coords):
+        return Geometry()
+
+    @staticmethod
+    def Rectangle(coords):
+        return Geometry()
+
+
+class Feature(ComputedObject):
+    def __init__(self, geometry, properties=None):
+        super().__init__()
+        self.properties = dict(properties or {})
+
+    def get(self, prop):
+        return ComputedObject(lambda: self.properties.get(prop))
+
+    def set(self, prop, value):
+        return Feature(None, dict(self.properties, **{prop: value}))
+
+
+class FeatureCollection(ComputedObject):
+    def __init__(self, features):
+        super().__init__()
+        self.features = list(features)
+
+    def map(self, fn):
+        return FeatureCollection([fn(feature) for feature in self.features])
+
+    def aggregate_array(self, prop):
+        """Like Earth Engine, features whose property is null are skipped"""
+        return List(ComputedObject(lambda: [
+            value for value in (_evaluate(feature.properties.get(prop)) for feature in self.features)
+            if value is not None
+        ]))
+
+    def first(self):
+        return self.features[0] if self.features else None
+
+
+class Image(ComputedObject):
+    """Image tracking its band names and which of them are 0/1 masks"""
+
+    def __init__(self, bands=S2_BANDS, mask_bands=()):
+        super().__init__()
+        self.bands = list(bands)
+        self.mask_bands = set(mask_bands) & set(self.bands)
+
+    @staticmethod
+    def cat(images):
+        return Image([band for image in images for band in image.bands],
+                     set().union(*(image.mask_bands for image in images)))
+
+    def select(self, band):
+        return Image([band], self.mask_bands)
+
+    def rename(self, name):
+        return Image([name], [name] if self.mask_bands else ())
+
+    def divide(self, other):
+        return Image(self.bands[:1])
+
+    def multiply(self, other):
+        return Image(self.bands[:1])
+
+    def gt(self, other):
+        return Image(self.bands, self.bands)
+
+    def reduceRegion(self, reducer, **kwargs):
+        return Dictionary(ComputedObject(lambda: {
+            key: value
+            for band in self.bands
+            for key, value in reducer.reduce(band, band in self.mask_bands).items()
+        }))
+
+    def _sampled(self, feature, reducer=None):
+        values = {}
+        for band in self.bands:
+            is_mask = band in self.mask_bands
+            if reducer is not None:
+                values.update(reducer.reduce(band, is_mask))
+            else:
+                values[band] = _band_statistic('mean', is_mask)
+        return Feature(None, dict(feature.properties, **values))
+
+    def reduceRegions(self, collection, reducer, **kwargs):
+        return FeatureCollection([self._sampled(feature, reducer) for feature in collection.features])
+
+    def sampleRegions(self, collection, **kwargs):
+        return FeatureCollection([self._sampled(feature) for feature in collection.features])
+
+    def sample(self, region=None, **kwargs):
+        return FeatureCollection([self._sampled(Feature(region))])
+
+    def visualize(self, **vis_params):
+        return Image(self.bands, self.mask_bands)
+
+    def getMapId(self, vis_params=None):
+        _round_trip('getMapId')
+        map_id = f'projects/fake/maps/{next(_map_ids)}'
+        return {'mapid': map_id, 'tile_fetcher': TileFetcher(map_id)}
+
+
+class TileFetcher:
+    def __init__(self, map_id):
+        self.url_format = f'https://earthengine.invalid/v1/{map_id}/tiles/{{z}}/{{x}}/{{y}}'
+
+
+class ImageCollection(ComputedObject):
+    def __init__(self, collection_id=None):
+        super().__init__()
+
+    def size(self):
+        return Number(IMAGES_PER_COLLECTION)
+
+    def median(self):
+        return Image()
+
+
+def Initialize(*args, **kwargs):
+    pass
+
+
+def Authenticate(*args, **kwargs):
+    pass
+
+
+def ServiceAccountCredentials(*args, **kwargs):
+    return None
@@ -0,0 +1,155 @@
+"""
+Fake External Services
+Latency-injecting Earth Engine and Nominatim stand-ins for load testing
+
+install() swaps the `ee` package for benchmarks/fake_ee.py and geopy's
+Nominatim geocoder for FakeNominatim, so the whole app runs unchanged without
+Earth Engine quota or Nominatim traffic. Each service gets a LatencyProfile:
+a log-normal latency (median and sigma) plus an error rate. create_app()
+installs the fakes and imports the app with its caches pointed at a scratch
+directory; it is also the entry point for running the fake-backed app under
+gunicorn, configured through the environment:
+
+    FAKE_EE_LATENCY          median getInfo()/getMapId() latency in seconds (default 1.5)
+    FAKE_EE_SIGMA            log-normal sigma of that latency (default 0.5)
+    FAKE_EE_ERROR_RATE       share of round trips that raise (default 0)
+    FAKE_NOMINATIM_LATENCY   median geocode/reverse latency in seconds (default 0.3)
+    FAKE_NOMINATIM_SIGMA     (default 0.4)
+    FAKE_NOMINATIM_ERROR_RATE  (default 0)
+
+Usage:
+    gunicorn --pythonpath .,benchmarks -w 2 --threads 8 'fake_services:create_app()'
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+NOMINATIM_PAYLOADS_PATH = os.path.join(BENCH_DIR, 'data', 'nominatim_reverse.json')
+
+
+class LatencyProfile:
+    """Log-normal latency around a median, with an error rate"""
+
+    def __init__(self, median_s, sigma=0.5, error_rate=0.0, seed=None):
+        self.median_s = median_s
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix, median_s, sigma):
+        return cls(
+            float(os.getenv(f'{prefix}_LATENCY', median_s)),
+            float(os.getenv(f'{prefix}_SIGMA', sigma)),
+            float(os.getenv(f'{prefix}_ERROR_RATE', 0))
+        )
+
+    def sample(self):
+        """(latency in seconds, whether the call fails)"""
+        with self._lock:
+            latency = self.median_s * math.exp(self.sigma * self._rng.gauss(0, 1))
+            return latency, self._rng.random() < self.error_rate
+
+    def wait(self, error_type, message):
+        """Sleep for one sampled latency, then raise error_type if the call fails"""
+        latency, failed = self.sample()
+        time.sleep(latency)
+        if failed:
+            raise error_type(message)
+
+    def describe(self):
+        return f'median {self.median_s * 1000:.0f}ms, sigma {self.sigma}, errors {self.error_rate:.1%}'
+
+
+class FakeNominatim:
+    """geopy Nominatim stand-in answering from the mine database and sample reverse payloads"""
+
+    def __init__(self, user_agent=None, profile=None, **kwargs):
+        from geopy.location import Location
+
+        from legal_mining_sites import LEGAL_MINING_AREAS
+
+        self.profile = profile or LatencyProfile(0.3, 0.4)
+        self._location = Location
+        self._places = {
+            ' '.join(name.lower().split()): (lat, lon, f'{name}, {country}')
+            for name, (lat, lon, country, _) in LEGAL_MINING_AREAS.items()
+        }
+        with open(NOMINATIM_PAYLOADS_PATH) as f:
+            self._reverse_payloads = [payload['results'] for payload in json.load(f)]
+
+    def _wait(self):
+        from geopy.exc import GeocoderServiceError
+
+        self.profile.wait(GeocoderServiceError, 'Nominatim request failed (injected)')
+
+    def geocode(self, query, **kwargs):
+        """Mine names resolve to their coordinates, anything else to a stable pseudo-random point"""
+        self._wait()
+        key = ' '.join(query.lower().split())
+        if key.startswith('nowhere'):
+            return None
+        place = self._places.get(key)
+        if place is None:
+            digest = int(hashlib.sha1(key.encode('utf-8')).hexdigest(), 16)
+            lat = (digest % 12000) / 100 - 60
+            lon = (digest // 12000 % 36000) / 100 - 180
+            place = (lat, lon, query)
+        lat, lon, address = place
+        raw = {'lat': str(lat), 'lon': str(lon), 'display_name': address, 'class': 'place'}
+        return self._location(address, (lat, lon), raw)
+
+    def reverse(self, query, exactly_one=True, **kwargs):
+        """One of the recorded reverse payloads, picked by the queried coordinate"""
+        self._wait()
+        index = int(hashlib.sha1(str(query).encode('utf-8')).hexdigest(), 16)
+        results = [
+            self._location(raw['display_name'], (float(raw['lat']), float(raw['lon'])), raw)
+            for raw in self._reverse_payloads[index % len(self._reverse_payloads)]
+        ]
+        if exactly_one:
+            return results[0] if results else None
+        return results
+
+
+def install(ee_profile, nominatim_profile, seed=0):
+    """Replace ee and geopy's Nominatim; must run before the app is imported"""
+    if 'app' in sys.modules:
+        raise RuntimeError('install() must run before the app is imported')
+    sys.path.insert(0, REPO_DIR)
+    sys.path.insert(0, BENCH_DIR)
+
+    import fake_ee
+    import geopy.geocoders
+
+    fake_ee.configure(ee_profile, seed)
+    sys.modules['ee'] = fake_ee
+    geopy.geocoders.Nominatim = lambda user_agent=None, **kwargs: FakeNominatim(
+        user_agent, nominatim_profile
+    )
+
+
+def create_app(ee_profile=None, nominatim_profile=None, state_dir=None):
+    """Install the fakes and import the app with caches in a scratch directory"""
+    ee_profile = ee_profile or LatencyProfile.from_env('FAKE_EE', 1.5, 0.5)
+    nominatim_profile = nominatim_profile or LatencyProfile.from_env('FAKE_NOMINATIM', 0.3, 0.4)
+    install(ee_profile, nominatim_profile)
+
+    # Fresh caches per run, so results do not depend on earlier runs
+    state_dir = state_dir or tempfile.mkdtemp(prefix='spectramining-load-')
+    os.environ.setdefault('ANALYSIS_STORE_PATH', os.path.join(state_dir, 'analysis_store.sqlite3'))
+    os.environ.setdefault('GEOCODE_CACHE_PATH', os.path.join(state_dir, 'geocode_cache.sqlite3'))
+    os.environ.setdefault('TILE_CACHE_DIR', os.path.join(state_dir, 'tile_cache'))
+
+    import app
+    return app.app
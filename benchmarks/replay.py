@@ -0,0 +1,283 @@
+"""
+Load Replay
+Replays request traces against the API and reports throughput and latency percentiles
+
+A trace is a JSON lines file, one request per line:
+
+    {"t": 0.42, "method": "POST", "path": "/api/analyze", "body": {"latitude": 18.63, ...}}
+
+where t is the send time in seconds from the start of the run. `generate`
+writes a synthetic trace mixing /api/analyze, /api/point-analysis,
+/api/geocode and /api/basemap around the legal mining sites, with popular
+sites repeating the way real traffic does. `run` sends a trace open loop at
+its recorded times (scaled by --speed) or at a fixed --rate, and reports per
+endpoint throughput and p50/p95/p99 latency. Latency is measured from each
+request's scheduled send time, so a saturated server shows up as latency
+instead of silently slowing the sender down.
+
+Without --url the app is served in-process on a local port with the fake
+Earth Engine and Nominatim services (benchmarks/fake_services.py) and fresh
+caches, so runs cost no quota; --ee-latency, --nominatim-latency and the
+error rate flags shape those fakes. With --url the trace goes to a running
+server, e.g. the fake-backed app under gunicorn to size workers.
+
+Usage:
+    python benchmarks/replay.py generate --requests 600 --rate 4 > trace.jsonl
+    python benchmarks/replay.py run trace.jsonl
+    python benchmarks/replay.py run trace.jsonl --rate 20 --ee-latency 2 --ee-error-rate 0.02
+    python benchmarks/replay.py run trace.jsonl --url http://localhost:8000 --json run.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import requests  # noqa: E402
+
+from fake_services import LatencyProfile  # noqa: E402
+
+# Share of each endpoint in generated traces
+ENDPOINT_MIX = {
+    '/api/analyze': 0.4,
+    '/api/point-analysis': 0.3,
+    '/api/geocode': 0.15,
+    '/api/basemap': 0.15
+}
+MINERALS = ['iron', 'aluminum', 'copper']
+REQUEST_TIMEOUT_S = 120
+PERCENTILES = (50, 95, 99)
+
+
+def generate_trace(n_requests, rate, seed=0):
+    """Poisson arrivals at rate req/s; site popularity follows a Zipf-like curve"""
+    from legal_mining_sites import LEGAL_MINING_AREAS
+
+    rng = random.Random(seed)
+    sites = list(LEGAL_MINING_AREAS.items())
+    rng.shuffle(sites)
+    weights = [1 / (rank + 1) for rank in range(len(sites))]
+    paths = list(ENDPOINT_MIX)
+
+    t = 0.0
+    trace = []
+    for _ in range(n_requests):
+        t += rng.expovariate(rate)
+        name, (lat, lon, _, _) = rng.choices(sites, weights)[0]
+        mineral_type = rng.choice(MINERALS)
+        path = rng.choices(paths, [ENDPOINT_MIX[p] for p in paths])[0]
+
+        if path == '/api/analyze':
+            if rng.random() < 0.2:  # a fresh spot near the site, a new ROI
+                lat, lon = lat + rng.uniform(-0.2, 0.2), lon + rng.uniform(-0.2, 0.2)
+            body = {'latitude': lat, 'longitude': lon, 'mineral_type': mineral_type}
+        elif path == '/api/point-analysis':
+            body = {
+                'latitude': lat + rng.uniform(-0.05, 0.05),
+                'longitude': lon + rng.uniform(-0.05, 0.05),
+                'center_latitude': lat,
+                'center_longitude': lon,
+                'mineral_type': mineral_type
+            }
+        elif path == '/api/geocode':
+            body = {'location': name if rng.random() < 0.8 else f'{name} town', 'slim': True}
+        else:
+            body = {}
+        trace.append({'t': round(t, 3), 'method': 'POST', 'path': path, 'body': body})
+    return trace
+
+
+def load_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def schedule(trace, rate=None, speed=1.0):
+    """Send offsets in seconds: evenly spaced at rate, or the recorded times divided by speed"""
+    if rate:
+        return [i / rate for i in range(len(trace))]
+    return [entry.get('t', 0) / speed for entry in trace]
+
+
+def start_local_server(ee_profile, nominatim_profile):
+    """Serve the fake-backed app on a free local port; returns its base URL"""
+    from werkzeug.serving import make_server
+
+    os.environ.setdefault('BASEMAP_PREWARM', '0')
+    from fake_services import create_app
+
+    server = make_server('127.0.0.1', 0, create_app(ee_profile, nominatim_profile), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def replay(base_url, trace, offsets, concurrency):
+    """Send every request at its offset; returns (records, wall seconds)"""
+    local = threading.local()
+    records = []
+    records_lock = threading.Lock()
+
+    def send(entry, scheduled):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        status = None
+        try:
+            response = session.request(
+                entry.get('method', 'POST'), base_url + entry['path'],
+                json=entry.get('body'), timeout=REQUEST_TIMEOUT_S
+            )
+            status = response.status_code
+        except requests.RequestException:
+            pass
+        finished = time.perf_counter()
+        with records_lock:
+            records.append({
+                'path': entry['path'],
+                'status': status,
+                'latency': finished - scheduled,
+                'finished': finished
+            })
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for entry, offset in zip(trace, offsets):
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, entry, started + offset)
+    return records, time.perf_counter() - started
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(records, wall_s):
+    """Per endpoint (plus 'all') request counts, errors, throughput and latency percentiles"""
+    groups = {}
+    for record in records:
+        groups.setdefault(record['path'], []).append(record)
+    groups['all'] = records
+
+    summary = {}
+    for path, group in groups.items():
+        latencies = sorted(record['latency'] for record in group)
+        statuses = {}
+        for record in group:
+            statuses[str(record['status'])] = statuses.get(str(record['status']), 0) + 1
+        errors = sum(1 for record in group if record['status'] is None or record['status'] >= 500)
+        summary[path] = {
+            'requests': len(group),
+            'errors': errors,
+            'statuses': statuses,
+            'throughput_rps': len(group) / wall_s if wall_s else 0.0,
+            'max_s': latencies[-1] if latencies else 0.0,
+            **{f'p{pct}_s': percentile(latencies, pct) for pct in PERCENTILES}
+        }
+    return summary
+
+
+def report(summary, wall_s):
+    print(f"\n{'endpoint':<22} {'reqs':>6} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for path, row in summary.items():
+        print(f"{path:<22} {row['requests']:>6} {row['errors']:>7} {row['throughput_rps']:>8.2f} "
+              f"{row['p50_s'] * 1000:>9.1f} {row['p95_s'] * 1000:>9.1f} "
+              f"{row['p99_s'] * 1000:>9.1f} {row['max_s'] * 1000:>9.1f}")
+    print(f'\nWall time {wall_s:.1f}s')
+
+
+def server_cache_stats(base_url):
+    """The server's /api/cache/stats, or None if it cannot be fetched"""
+    try:
+        return requests.get(base_url + '/api/cache/stats', timeout=10).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def report_cache_stats(stats):
+    print('\nServer caches:')
+    for name, cache in stats.items():
+        if isinstance(cache, dict) and 'hit_rate' in cache:
+            print(f"  {name:<20} hits {cache['hits']:>6}  misses {cache['misses']:>6}  "
+                  f"hit rate {cache['hit_rate']:.1%}")
+    flights = stats.get('analysis_in_flight')
+    if flights:
+        print(f"  {'analysis_in_flight':<20} executions {flights['executions']}  "
+              f"deduplicated {flights['deduplicated']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay request traces against the API')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='write a synthetic trace to stdout')
+    generate.add_argument('--requests', type=int, default=600)
+    generate.add_argument('--rate', type=float, default=4.0, help='mean arrivals per second')
+    generate.add_argument('--seed', type=int, default=0)
+
+    run = commands.add_parser('run', help='replay a trace and report latency percentiles')
+    run.add_argument('trace', help='JSON lines trace file')
+    run.add_argument('--url', help='server to target; default: in-process app on fake services')
+    run.add_argument('--rate', type=float, help='send at this many req/s instead of the recorded times')
+    run.add_argument('--speed', type=float, default=1.0, help='replay recorded times this many times faster')
+    run.add_argument('--concurrency', type=int, default=64, help='max requests in flight')
+    run.add_argument('--ee-latency', type=float, default=1.5, help='median seconds per EE round trip')
+    run.add_argument('--ee-sigma', type=float, default=0.5)
+    run.add_argument('--ee-error-rate', type=float, default=0.0)
+    run.add_argument('--nominatim-latency', type=float, default=0.3)
+    run.add_argument('--nominatim-sigma', type=float, default=0.4)
+    run.add_argument('--nominatim-error-rate', type=float, default=0.0)
+    run.add_argument('--json', dest='json_path', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        for entry in generate_trace(args.requests, args.rate, args.seed):
+            print(json.dumps(entry))
+        return 0
+
+    trace = load_trace(args.trace)
+    offsets = schedule(trace, args.rate, args.speed)
+
+    base_url = args.url
+    if base_url is None:
+        ee_profile = LatencyProfile(args.ee_latency, args.ee_sigma, args.ee_error_rate, seed=1)
+        nominatim_profile = LatencyProfile(
+            args.nominatim_latency, args.nominatim_sigma, args.nominatim_error_rate, seed=2
+        )
+        print(f'Fake Earth Engine: {ee_profile.describe()}')
+        print(f'Fake Nominatim:    {nominatim_profile.describe()}')
+        base_url = start_local_server(ee_profile, nominatim_profile)
+    base_url = base_url.rstrip('/')
+
+    print(f'Replaying {len(trace)} requests over {offsets[-1] if offsets else 0:.1f}s against {base_url}')
+    records, wall_s = replay(base_url, trace, offsets, args.concurrency)
+    summary = summarize(records, wall_s)
+    report(summary, wall_s)
+
+    cache_stats = server_cache_stats(base_url)
+    if cache_stats:
+        report_cache_stats(cache_stats)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'wall_s': wall_s, 'endpoints': summary, 'cache_stats': cache_stats}, f, indent=2)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
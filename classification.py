@@ -0,0 +1,162 @@
+"""
+Location Classification
+Proximity-to-legal-mine classification for single points and vectorized bulk batches
+
+Usage:
+    from classification import classify_location, classify_locations_bulk
+
+    result = classify_location(18.63, 81.30, 4.2, 'iron')
+    results = classify_locations_bulk([18.63, 22.12], [81.30, 85.38], mineral_name='iron')
+"""
+
+import functools
+
+import numpy as np
+from geopy.distance import geodesic
+
+from legal_mining_sites import get_mines_by_type
+from mine_index import mine_index, EARTH_RADIUS_KM, HAVERSINE_MARGIN
+
+# Points within this distance of a legal mine of the same type are "Legal Mining Area"
+LEGAL_AREA_RADIUS_KM = 10
+
+MINERAL_MINE_TYPES = {
+    'iron': 'Iron Ore',
+    'aluminum': 'Bauxite/Aluminum',
+    'copper': 'Copper'
+}
+
+# Coverage percentages separating low, moderate and high potential deposits
+MODERATE_POTENTIAL_COVERAGE = 3
+HIGH_POTENTIAL_COVERAGE = 10
+
+# Upper bound on distance matrix cells per chunk (~8 MB of float64)
+MAX_MATRIX_CELLS = 1_000_000
+
+
+def classify_coverage(mineral_coverage, mineral_name='iron'):
+    """Return (classification, classification_type) for a location away from legal mines"""
+    mineral_display = mineral_name.capitalize()
+    if mineral_coverage > HIGH_POTENTIAL_COVERAGE:
+        return f"Natural - High Potential {mineral_display} Deposits", "high_potential"
+    elif mineral_coverage > MODERATE_POTENTIAL_COVERAGE:
+        return f"Natural - Moderate Potential {mineral_display} Deposits", "moderate_potential"
+    return f"Natural - Low {mineral_display} Signature", "low_potential"
+
+
+def classify_location(lat, lon, mineral_coverage, mineral_name='iron'):
+    """AI Classification based on proximity to legal mining areas"""
+    nearby_mines = []
+    min_distance = float('inf')
+    nearest_mine = None
+
+    target_mine_type = MINERAL_MINE_TYPES.get(mineral_name, 'Iron Ore')
+
+    # Spatial index: haversine prefilter, exact geodesic only for nearby candidates
+    for mine in mine_index.query_radius(lat, lon, LEGAL_AREA_RADIUS_KM, target_mine_type):
+        nearby_mines.append({
+            'name': mine['name'],
+            'distance': mine['distance'],
+            'country': mine['country'],
+            'type': mine['type']
+        })
+
+    nearest = mine_index.nearest(lat, lon, 1, target_mine_type)
+    if nearest:
+        min_distance = nearest[0]['distance']
+        nearest_mine = nearest[0]['name']
+
+    if nearby_mines:
+        classification = "Legal Mining Area"
+        classification_type = "mining"
+    else:
+        classification, classification_type = classify_coverage(mineral_coverage, mineral_name)
+
+    return {
+        'classification': classification,
+        'classification_type': classification_type,
+        'nearby_mines': nearby_mines,
+        'min_distance': min_distance,
+        'nearest_mine': nearest_mine
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _mine_arrays(mine_type):
+    """Names and coordinate arrays for one mine type, built once per type"""
+    mines = get_mines_by_type(mine_type)
+    return list(mines), np.ascontiguousarray(mines.lats), np.ascontiguousarray(mines.lons)
+
+
+def haversine_matrix_km(lats, lons, mine_lats, mine_lons):
+    """Pairwise haversine distances, shape (len(lats), len(mine_lats))"""
+    phi1 = np.radians(lats)[:, None]
+    phi2 = np.radians(mine_lats)[None, :]
+    dphi = phi2 - phi1
+    dlambda = np.radians(mine_lons)[None, :] - np.radians(lons)[:, None]
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def classify_locations_bulk(lats, lons, mineral_coverage=0.0, mineral_name='iron'):
+    """Classify many locations at once with a chunked NumPy distance matrix.
+
+    Applies the same 10km legal-area rule and coverage buckets as
+    classify_location. Distances and nearest-mine ranking are haversine
+    (within ~0.5% of geodesic); pairs close to the 10km boundary are
+    re-checked with exact geodesic so verdicts match.
+    mineral_coverage may be a scalar or one value per location.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    coverage = np.broadcast_to(np.asarray(mineral_coverage, dtype=np.float64), lats.shape)
+
+    target_mine_type = MINERAL_MINE_TYPES.get(mineral_name, 'Iron Ore')
+    names, mine_lats, mine_lons = _mine_arrays(target_mine_type)
+
+    n_points = len(lats)
+    nearest_idx = np.full(n_points, -1, dtype=np.int64)
+    nearest_km = np.full(n_points, np.inf)
+    nearby_count = np.zeros(n_points, dtype=np.int64)
+
+    if len(names):
+        radius_low = LEGAL_AREA_RADIUS_KM * (1 - HAVERSINE_MARGIN)
+        radius_high = LEGAL_AREA_RADIUS_KM * (1 + HAVERSINE_MARGIN)
+        chunk_rows = max(1, MAX_MATRIX_CELLS // len(names))
+
+        for start in range(0, n_points, chunk_rows):
+            stop = min(start + chunk_rows, n_points)
+            distances = haversine_matrix_km(
+                lats[start:stop], lons[start:stop], mine_lats, mine_lons
+            )
+
+            nearest_idx[start:stop] = distances.argmin(axis=1)
+            nearest_km[start:stop] = distances.min(axis=1)
+
+            within = distances <= radius_low
+            # Exact geodesic only for the rare pairs near the boundary
+            for row, col in zip(*np.nonzero((distances > radius_low) & (distances <= radius_high))):
+                point = (lats[start + row], lons[start + row])
+                mine = (mine_lats[col], mine_lons[col])
+                within[row, col] = geodesic(point, mine).kilometers <= LEGAL_AREA_RADIUS_KM
+            nearby_count[start:stop] = within.sum(axis=1)
+
+    results = []
+    for i in range(n_points):
+        if nearby_count[i]:
+            classification, classification_type = "Legal Mining Area", "mining"
+        else:
+            classification, classification_type = classify_coverage(coverage[i], mineral_name)
+
+        has_mine = nearest_idx[i] >= 0
+        results.append({
+            'latitude': float(lats[i]),
+            'longitude': float(lons[i]),
+            'nearest_mine': names[nearest_idx[i]] if has_mine else None,
+            'distance': float(nearest_km[i]) if has_mine else None,
+            'mines_within_radius': int(nearby_count[i]),
+            'classification': classification,
+            'classification_type': classification_type
+        })
+
+    return results
@@ -0,0 +1,106 @@
+"""
+Compute Backends
+Interface shared by the analysis engines and the factory that selects one
+
+A backend turns an ROI, a list of minerals and a date window into the
+analysis "plan" consumed by app.py:
+
+    {
+        'num_images': int,
+        'statistics': {'<mineral>_index_mean': float, '<mineral>_index_stdDev': float, ...},
+        'thresholds': {mineral: float},
+        'coverage_percent': {mineral: float},
+        'histograms': {mineral: {'min': float, 'max': float, 'counts': [...]}}
+    }
+
+Statistics, thresholds and coverage are derived from the fixed-bin index
+histograms (index_histogram.py), which are cached with the analysis.
+
+A regional scan (scan_cells) yields per-cell mean index and coverage in
+batches; backends without one leave supports_scan False.
+
+For the time-series mode a backend returns one mineral's monthly series from
+a single evaluation:
+
+    {
+        'baseline': {'num_images', 'mean', 'stdDev', 'threshold', 'coverage_percent'},
+        'months': [{'month': 'YYYY-MM', 'num_images', 'mean', 'coverage_percent'}, ...]
+    }
+
+Available backends (COMPUTE_BACKEND environment variable):
+    earthengine - Google Earth Engine, the default (ee_backend.py)
+    local       - memory-mapped Sentinel-2 rasters processed with NumPy (local_backend.py)
+
+Usage:
+    from compute_backend import create_backend
+
+    backend = create_backend('local')
+    for stage, value in backend.iter_analysis_stages(18.63, 81.30, 10000, ['iron'], start, end):
+        ...
+"""
+
+import os
+
+# Minerals supported by every backend, in multi-mineral output order
+MINERAL_TYPES = ['iron', 'aluminum', 'copper']
+
+# Default mean/stdDev used for the threshold when an ROI has no valid pixels
+DEFAULT_INDEX_MEAN = 1.5
+DEFAULT_INDEX_STD = 0.3
+
+COMPUTE_BACKEND = os.getenv('COMPUTE_BACKEND', 'earthengine')
+
+
+class ComputeBackend:
+    """Base class for analysis engines"""
+
+    name = None
+    # Whether the backend can produce XYZ map tile layers
+    supports_tiles = False
+    # Whether the backend can run regional grid scans (scan_cells)
+    supports_scan = False
+
+    def iter_analysis_stages(self, center_lat, center_lon, radius_m, mineral_types,
+                             start_date, end_date):
+        """Yield ('plan', plan), then ('tile', (layer, tile)) for each map layer.
+
+        Stops after the plan when num_images is 0.
+        """
+        raise NotImplementedError
+
+    def sample_points(self, center_lat, center_lon, radius_m, mineral_type,
+                      start_date, end_date, points):
+        """Return mineral index values for (lat, lon) points.
+
+        The list is aligned with points (None where no valid pixel), or None on error.
+        """
+        raise NotImplementedError
+
+    def time_series(self, center_lat, center_lon, radius_m, mineral_type, windows):
+        """Baseline and per-month index mean and coverage for [(month, start_date, end_date)].
+
+        The baseline composite spans every window and its threshold is applied to
+        each month. Months without imagery have num_images 0 and no values.
+        """
+        raise NotImplementedError
+
+    def scan_cells(self, bounds, cells, mineral_type, start_date, end_date, scale):
+        """Yield (batch, values) as batches of grid cells are reduced, in completion order.
+
+        bounds is (south, west, north, east) and cells are dicts with south, west,
+        north and east. values is aligned with batch as (mean_index,
+        coverage_percent) pairs, measured against one regional threshold so cells
+        are comparable, or None when the batch failed or timed out.
+        """
+        raise NotImplementedError(f'Regional scans are not supported by the {self.name} backend')
+
+
+def create_backend(name=COMPUTE_BACKEND):
+    """Instantiate a backend by name; implementations are imported lazily"""
+    if name == 'earthengine':
+        from ee_backend import EarthEngineBackend
+        return EarthEngineBackend()
+    if name == 'local':
+        from local_backend import LocalRasterBackend
+        return LocalRasterBackend()
+    raise ValueError(f'Unknown compute backend: {name}')
@@ -0,0 +1,150 @@
+"""
+Concurrent I/O Helpers
+Bounded thread pools for fanning out independent Earth Engine and Nominatim calls,
+and single-flight coalescing of identical in-flight computations
+
+Usage:
+    from concurrency import fan_out, submit_io, collect, SingleFlight, scan_executor
+
+    tiles = fan_out({'true_color': make_true_color, 'false_color': make_false_color}, timeout=20)
+    cells = fan_out(batches, timeout=120, executor=scan_executor)
+
+    flights = SingleFlight()
+    result, shared = flights.do(key, compute)
+"""
+
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+
+# Shared pool for blocking network calls; bounded so slow upstreams cannot pile up threads
+io_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('IO_WORKERS', 8)),
+    thread_name_prefix='spectramining-io'
+)
+
+# Regional scan batches hold a worker for the whole reduction, so they get
+# their own pool and can never starve analyses of io_executor workers
+scan_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('SCAN_WORKERS', 4)),
+    thread_name_prefix='spectramining-scan'
+)
+
+
+def submit_io(fn, *args, **kwargs):
+    """Schedule a blocking call on the shared I/O pool and return its future.
+
+    The call runs in a copy of the caller's context, so per-request state such
+    as stage timings follows it onto the pool thread.
+    """
+    return submit_to(io_executor, fn, *args, **kwargs)
+
+
+def submit_to(executor, fn, *args, **kwargs):
+    """Like submit_io, on a given executor"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def collect(future, timeout, default=None, label='task'):
+    """Wait for a future; return default if it fails or exceeds the timeout"""
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        logging.warning(f"{label} did not finish within its timeout")
+        return default
+    except Exception as e:
+        logging.error(f"{label} failed: {e}")
+        return default
+
+
+def fan_out_iter(tasks, timeout, default=None, executor=None):
+    """Run independent callables concurrently, yielding (name, result) as each finishes.
+
+    Tasks still running when the shared deadline passes, or that fail, are
+    yielded last with default. Tasks run on io_executor unless another
+    executor is given.
+    """
+    executor = executor or io_executor
+    futures = {submit_to(executor, fn): name for name, fn in tasks.items()}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            pending.discard(future)
+            yield futures[future], collect(future, 0, default, futures[future])
+    except FutureTimeoutError:
+        for future in pending:
+            logging.warning(f"{futures[future]} did not finish within its timeout")
+            yield futures[future], default
+
+
+def fan_out(tasks, timeout, default=None, executor=None):
+    """Run independent callables concurrently and return {name: result}.
+
+    All tasks share one deadline measured from submission, so total latency is
+    bounded by the slowest call (or the timeout). Failed or timed-out tasks map
+    to default instead of failing the whole batch.
+    """
+    return dict(fan_out_iter(tasks, timeout, default, executor))
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller (the leader) runs the computation; callers arriving while
+    it is in flight wait for it and receive the same result or exception.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.deduplicated = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """Return (future, leader); the leader must call release() with the outcome"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.executions += 1
+            return future, True
+
+    def release(self, key, future, result=None, error=None):
+        """Publish the leader's outcome to every waiting caller"""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, timeout=None):
+        """Run fn once per in-flight key; returns (result, shared)"""
+        future, leader = self.acquire(key)
+        if not leader:
+            return future.result(timeout=timeout), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.release(key, future, error=e)
+            raise
+        self.release(key, future, result)
+        return result, False
+
+    def stats(self):
+        """Executions, deduplicated callers and computations currently in flight"""
+        with self._lock:
+            calls = self.executions + self.deduplicated
+            return {
+                'executions': self.executions,
+                'deduplicated': self.deduplicated,
+                'in_flight': len(self._inflight),
+                'dedup_rate': self.deduplicated / calls if calls else 0.0
+            }
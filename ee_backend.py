@@ -0,0 +1,459 @@
+"""
+Earth Engine Compute Backend
+Sentinel-2 composites, mineral indices and map tiles computed on Google Earth Engine
+
+Every scalar output of an analysis is chained into one server-side
+ee.Dictionary and fetched with a single getInfo() round trip; the map tile
+layers are requested concurrently afterwards. Analyses reduce the index to a
+fixed-bin histogram and derive their statistics locally (index_histogram.py),
+starting at a coarse scale and refining only borderline coverage
+(adaptive_scale.py).
+
+Usage:
+    from ee_backend import EarthEngineBackend
+
+    backend = EarthEngineBackend()
+    values = backend.sample_points(18.63, 81.30, 10000, 'iron', start, end, [(18.64, 81.31)])
+"""
+
+import logging
+import os
+
+import ee
+
+from compute_backend import ComputeBackend, DEFAULT_INDEX_MEAN, DEFAULT_INDEX_STD
+from adaptive_scale import reduction_scales, first_round_scales, refine_histograms
+from concurrency import fan_out_iter, scan_executor
+from index_histogram import IndexHistogram, HISTOGRAM_BINS, HISTOGRAM_RANGES, plan_from_histograms
+from metrics import timed
+
+# Per-call timeout (seconds) for the concurrent tile fan-out
+TILE_TIMEOUT_S = float(os.getenv('TILE_TIMEOUT', 20))
+
+# Regional grid scans: cells per reduceRegions batch and the deadline of a whole scan
+SCAN_BATCH_SIZE = int(os.getenv('SCAN_BATCH_SIZE', 50))
+SCAN_TIMEOUT_S = float(os.getenv('SCAN_TIMEOUT', 120))
+
+# Visualization parameters shared by the analysis tiles
+TRUE_COLOR_VIS = {
+    'bands': ['B4', 'B3', 'B2'],
+    'min': 0,
+    'max': 3000,
+    'gamma': 1.4
+}
+
+FALSE_COLOR_VIS = {
+    'bands': ['B8', 'B4', 'B3'],
+    'min': 0,
+    'max': 3000,
+    'gamma': 1.4
+}
+
+# Mineral-specific color palettes
+MINERAL_PALETTES = {
+    'iron': ['#ffb3b3', '#ff9999', '#ff6b6b', '#ee5a6f', '#d63447', '#8b0000'],
+    'aluminum': ['#b8f3ef', '#6ee7df', '#4ecdc4', '#44a3a0', '#2d8b85', '#1a5653'],
+    'copper': ['#ffd8a8', '#ffb86c', '#ffa94d', '#ff8c42', '#e67700', '#b35900']
+}
+
+
+def calculate_mineral_index(image, mineral_type):
+    """Calculate mineral indices based on type"""
+    if mineral_type == 'iron':
+        return image.select('B4').divide(image.select('B2')).rename('iron_index')
+    elif mineral_type == 'aluminum':
+        return image.select('B11').divide(image.select('B12')).rename('aluminum_index')
+    elif mineral_type == 'copper':
+        red_green = image.select('B4').divide(image.select('B3'))
+        nir_red = image.select('B8').divide(image.select('B4'))
+        return red_green.multiply(nir_red).rename('copper_index')
+    return None
+
+
+def calculate_mineral_indices(image, mineral_types):
+    """Stack several mineral indices as '<mineral>_index' bands of one image"""
+    if len(mineral_types) == 1:
+        return calculate_mineral_index(image, mineral_types[0])
+    return ee.Image.cat([calculate_mineral_index(image, m) for m in mineral_types])
+
+
+def get_mineral_index_at_point(mineral_index_ee, lat, lon, mineral_name):
+    """Get mineral index value at specific coordinates"""
+    try:
+        point = ee.Geometry.Point([lon, lat])
+        sample = mineral_index_ee.sample(region=point, scale=10, geometries=True).first()
+        if sample:
+            with timed('ee_sample'):
+                mineral_value = sample.get(f'{mineral_name}_index').getInfo()
+            return mineral_value
+        return None
+    except Exception as e:
+        logging.error(f"Error getting mineral index: {e}")
+        return None
+
+
+def get_mineral_index_at_points(mineral_index_ee, points, mineral_name):
+    """Get mineral index values for many (lat, lon) points with one sampleRegions call.
+
+    Returns a list aligned with points (None where the pixel is masked), or None on error.
+    """
+    try:
+        band = f'{mineral_name}_index'
+        features = ee.FeatureCollection([
+            ee.Feature(ee.Geometry.Point([lon, lat]), {'point_id': i})
+            for i, (lat, lon) in enumerate(points)
+        ])
+        samples = mineral_index_ee.sampleRegions(
+            collection=features, properties=['point_id'], scale=10, geometries=False
+        )
+        # Masked pixels are dropped by sampleRegions, so match values back by id
+        with timed('ee_sample'):
+            sampled = ee.Dictionary({
+                'ids': samples.aggregate_array('point_id'),
+                'values': samples.aggregate_array(band)
+            }).getInfo()
+
+        values = [None] * len(points)
+        for point_id, value in zip(sampled['ids'], sampled['values']):
+            values[int(point_id)] = value
+        return values
+    except Exception as e:
+        logging.error(f"Error getting mineral index batch: {e}")
+        return None
+
+
+def build_sentinel_collection(roi, start_date, end_date):
+    """Load the clearest Sentinel-2 scenes over the ROI for the date window"""
+    return ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
+        .filterBounds(roi) \
+        .filterDate(start_date, end_date) \
+        .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20)) \
+        .sort('CLOUDY_PIXEL_PERCENTAGE') \
+        .limit(50)
+
+
+def build_mineral_composite(center_lat, center_lon, radius_m, mineral_types, start_date, end_date):
+    """Build ROI, collection, median composite and stacked index image for a snapped center.
+
+    Snapped centers and day-aligned windows also make the computation graph
+    identical across requests, so Earth Engine can reuse its own server-side cache.
+    """
+    roi = ee.Geometry.Point([center_lon, center_lat]).buffer(radius_m)
+    collection = build_sentinel_collection(roi, start_date, end_date)
+    median_image = collection.median().clip(roi)
+    index_image = calculate_mineral_indices(median_image, mineral_types)
+    return roi, collection, median_image, index_image
+
+
+def mineral_vis_params(mineral_type, threshold):
+    """Visualization parameters for a mineral index layer around its threshold"""
+    return {
+        'min': threshold - 0.5,
+        'max': threshold + 2.0,
+        'palette': MINERAL_PALETTES.get(mineral_type, MINERAL_PALETTES['iron'])
+    }
+
+
+def map_tile_info(map_id):
+    """Extract the serializable tile URL and map ID from a getMapId() result"""
+    return {
+        'url': map_id['tile_fetcher'].url_format,
+        'mapid': map_id['mapid']
+    }
+
+
+def request_map_tile(image, vis_params, layer):
+    """getMapId() of one visualized layer, timed as its own stage"""
+    with timed(f'ee_tile_{layer}'):
+        return map_tile_info(image.visualize(**vis_params).getMapId())
+
+
+def normalized_index(index_image, mineral_type):
+    """Index band scaled from its histogram range to [0, 1), out-of-range values clamped"""
+    low, high = HISTOGRAM_RANGES[mineral_type]
+    return index_image.subtract(low).divide(high - low).clamp(0, 1 - 0.5 / HISTOGRAM_BINS)
+
+
+def build_histograms(roi, index_image, mineral_types, scale):
+    """One fixed-bin histogram per index band from a single reduceRegion at scale meters"""
+    # Every band shares one [0, 1) reducer once normalized to its own range
+    histogram_image = ee.Image.cat([
+        normalized_index(index_image.select(f'{m}_index'), m) for m in mineral_types
+    ])
+    return histogram_image.reduceRegion(
+        reducer=ee.Reducer.fixedHistogram(0, 1, HISTOGRAM_BINS),
+        geometry=roi,
+        scale=scale,
+        maxPixels=1e9
+    )
+
+
+def parse_histograms(histograms, mineral_types):
+    """{mineral: IndexHistogram} from fetched fixedHistogram outputs"""
+    return {
+        mineral_type: IndexHistogram.from_fixed_histogram(
+            mineral_type, (histograms or {}).get(f'{mineral_type}_index') or []
+        )
+        for mineral_type in mineral_types
+    }
+
+
+def build_analysis_plan(collection, roi, index_image, mineral_types, scales):
+    """Build every scalar analysis output as one server-side ee.Dictionary.
+
+    The image count and one fixed-bin histogram per index band at each of
+    scales (one reduceRegion per scale) are fetched with a single getInfo()
+    round trip. Mean, stdDev, threshold and coverage are derived locally from
+    the histograms.
+    """
+    num_images = collection.size()
+    plan = ee.Dictionary({
+        'num_images': num_images,
+        'histograms': ee.List([
+            build_histograms(roi, index_image, mineral_types, scale) for scale in scales
+        ])
+    })
+
+    # Skip the reduction entirely when the collection is empty
+    return ee.Dictionary(ee.Algorithms.If(
+        num_images.gt(0), plan, ee.Dictionary({'num_images': 0})
+    ))
+
+
+def build_time_series_plan(roi, mineral_type, windows):
+    """Build a baseline and a monthly series of index mean and coverage as one ee.Dictionary.
+
+    The monthly sub-composites are a server-side ee.List.map over the windows,
+    thresholded at the baseline threshold, so the whole series is fetched with
+    a single getInfo() round trip. Coverage is returned as a 0-1 fraction.
+    """
+    band = f'{mineral_type}_index'
+    start_date, end_date = windows[0][1], windows[-1][2]
+
+    baseline_collection = build_sentinel_collection(roi, start_date, end_date)
+    baseline_index = calculate_mineral_index(baseline_collection.median().clip(roi), mineral_type)
+    stats = baseline_index.reduceRegion(
+        reducer=ee.Reducer.mean().combine(ee.Reducer.stdDev(), '', True),
+        geometry=roi,
+        scale=100,
+        maxPixels=1e9
+    )
+    mean_val = ee.Number(stats.get(f'{band}_mean', DEFAULT_INDEX_MEAN))
+    std_val = ee.Number(stats.get(f'{band}_stdDev', DEFAULT_INDEX_STD))
+    threshold = mean_val.add(std_val.multiply(0.5))
+    baseline_coverage = baseline_index.gt(threshold).reduceRegion(
+        reducer=ee.Reducer.mean(),
+        geometry=roi,
+        scale=100,
+        maxPixels=1e9
+    )
+
+    # Every cloud-filtered scene of the window, the 50-scene limit is per baseline only
+    monthly_source = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
+        .filterBounds(roi) \
+        .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
+
+    def month_stats(window):
+        window = ee.Dictionary(window)
+        monthly = monthly_source.filterDate(window.get('start'), window.get('end'))
+        index = calculate_mineral_index(monthly.median().clip(roi), mineral_type)
+        reduced = ee.Image.cat([index, index.gt(threshold).rename('coverage')]).reduceRegion(
+            reducer=ee.Reducer.mean(),
+            geometry=roi,
+            scale=100,
+            maxPixels=1e9
+        )
+        stats = ee.Dictionary({
+            'month': window.get('month'),
+            'num_images': monthly.size(),
+            'mean': reduced.get(band),
+            'coverage': reduced.get('coverage')
+        })
+        # Empty months have no bands to reduce
+        return ee.Algorithms.If(
+            monthly.size().gt(0), stats,
+            ee.Dictionary({'month': window.get('month'), 'num_images': 0})
+        )
+
+    months = ee.List([
+        ee.Dictionary({'month': month, 'start': start, 'end': end})
+        for month, start, end in windows
+    ]).map(month_stats)
+
+    baseline = ee.Dictionary({
+        'num_images': baseline_collection.size(),
+        'mean': stats.get(f'{band}_mean'),
+        'stdDev': stats.get(f'{band}_stdDev'),
+        'threshold': threshold,
+        'coverage': baseline_coverage.get(band)
+    })
+    return ee.Dictionary({
+        'baseline': ee.Algorithms.If(
+            baseline_collection.size().gt(0), baseline, ee.Dictionary({'num_images': 0})
+        ),
+        'months': months
+    })
+
+
+def build_scan_plan(index_image, threshold, cells, mineral_type, scale):
+    """Per-cell mean index and coverage for a batch of cells with one reduceRegions call"""
+    band = f'{mineral_type}_index'
+    grid = ee.FeatureCollection([
+        ee.Feature(
+            ee.Geometry.Rectangle([cell['west'], cell['south'], cell['east'], cell['north']]),
+            {'cell_id': i}
+        )
+        for i, cell in enumerate(cells)
+    ])
+    
+    # Index mean and above-threshold share reduced together per cell
+    cell_image = ee.Image.cat([
+        index_image.select(band).rename('mean_index'),
+        index_image.select(band).gt(threshold).rename('coverage')
+    ])
+    reduced = cell_image.reduceRegions(
+        collection=grid,
+        reducer=ee.Reducer.mean(),
+        scale=scale
+    )
+    
+    # One [cell_id, mean_index, coverage] row per cell instead of GeoJSON keeps
+    # the payload small; separate aggregate_array() columns would skip the
+    # null means of fully masked cells and misalign every cell after them
+    return reduced.map(
+        lambda feature: feature.set('row', ee.List([
+            feature.get('cell_id'), feature.get('mean_index'), feature.get('coverage')
+        ]))
+    ).aggregate_array('row')
+
+
+def parse_scan_rows(rows, n_cells):
+    """(mean_index, coverage_percent) per cell of a batch from build_scan_plan rows"""
+    values = {
+        int(cell_id): (mean_index, coverage * 100 if coverage is not None else None)
+        for cell_id, mean_index, coverage in rows
+    }
+    return [values.get(i, (None, None)) for i in range(n_cells)]
+
+
+def coverage_percent(stats):
+    """Replace a reduced 0-1 'coverage' fraction with 'coverage_percent'"""
+    coverage = stats.pop('coverage', None)
+    stats['coverage_percent'] = coverage * 100 if coverage is not None else None
+    return stats
+
+
+class EarthEngineBackend(ComputeBackend):
+    """Analysis engine running on Google Earth Engine"""
+
+    name = 'earthengine'
+    supports_tiles = True
+    supports_scan = True
+
+    def iter_analysis_stages(self, center_lat, center_lon, radius_m, mineral_types,
+                             start_date, end_date):
+        """Run the Earth Engine pipeline for one ROI stage by stage.
+
+        Yields ('plan', plan) once the scalar outputs arrive, then ('tile', (layer, tile))
+        for each layer as its getMapId() finishes. Stops after the plan when no imagery is found.
+        """
+        roi, collection, median_image, index_image = build_mineral_composite(
+            center_lat, center_lon, radius_m, mineral_types, start_date, end_date
+        )
+
+        # Single round trip for every scalar output, at the two coarsest scales of the ladder
+        ladder = reduction_scales(radius_m)
+        with timed('ee_plan'):
+            raw_plan = build_analysis_plan(
+                collection, roi, index_image, mineral_types, first_round_scales(ladder)
+            ).getInfo()
+        if raw_plan['num_images'] == 0:
+            yield 'plan', raw_plan
+            return
+
+        def reduce_finer(borderline, scale):
+            with timed('ee_refine'):
+                histograms = build_histograms(roi, index_image, borderline, scale).getInfo()
+            return parse_histograms(histograms, borderline)
+
+        # Borderline coverage only: one more round trip per finer scale
+        levels = [parse_histograms(level, mineral_types) for level in raw_plan['histograms']]
+        histograms, scales, biases = refine_histograms(levels, ladder, reduce_finer)
+        plan = plan_from_histograms(raw_plan['num_images'], histograms, mineral_types, scales, biases)
+        yield 'plan', plan
+
+        # The getMapId() calls are independent, request them concurrently
+        tile_tasks = {
+            'true_color': lambda: request_map_tile(median_image, TRUE_COLOR_VIS, 'true_color'),
+            'false_color': lambda: request_map_tile(median_image, FALSE_COLOR_VIS, 'false_color')
+        }
+        for mineral_type in mineral_types:
+            band = f'{mineral_type}_index'
+            vis_params = mineral_vis_params(mineral_type, plan['thresholds'][mineral_type])
+            tile_tasks[band] = lambda band=band, vis_params=vis_params: request_map_tile(
+                index_image.select(band), vis_params, band
+            )
+
+        for layer, tile in fan_out_iter(tile_tasks, timeout=TILE_TIMEOUT_S):
+            yield 'tile', (layer, tile)
+
+    def sample_points(self, center_lat, center_lon, radius_m, mineral_type,
+                      start_date, end_date, points):
+        """Sample the clipped index image at every point with one sampleRegions call"""
+        _, _, _, mineral_index = build_mineral_composite(
+            center_lat, center_lon, radius_m, [mineral_type], start_date, end_date
+        )
+        if len(points) == 1:
+            value = get_mineral_index_at_point(mineral_index, *points[0], mineral_type)
+            return [value]
+        return get_mineral_index_at_points(mineral_index, points, mineral_type)
+
+    def time_series(self, center_lat, center_lon, radius_m, mineral_type, windows):
+        """Evaluate the baseline and every monthly reduction with one getInfo()"""
+        roi = ee.Geometry.Point([center_lon, center_lat]).buffer(radius_m)
+        with timed('ee_time_series'):
+            series = build_time_series_plan(roi, mineral_type, windows).getInfo()
+        return {
+            'baseline': coverage_percent(series['baseline']),
+            'months': [coverage_percent(month) for month in series['months']]
+        }
+
+    def scan_cells(self, bounds, cells, mineral_type, start_date, end_date, scale):
+        """Reduce SCAN_BATCH_SIZE cells per reduceRegions call, batches in parallel on scan_executor"""
+        south, west, north, east = bounds
+        region = ee.Geometry.Rectangle([west, south, east, north])
+        collection = build_sentinel_collection(region, start_date, end_date)
+        index_image = calculate_mineral_index(collection.median(), mineral_type)
+
+        # Regional threshold so cells are comparable across the scan
+        band = f'{mineral_type}_index'
+        region_stats = index_image.reduceRegion(
+            reducer=ee.Reducer.mean().combine(ee.Reducer.stdDev(), '', True),
+            geometry=region,
+            scale=scale,
+            maxPixels=1e9,
+            bestEffort=True
+        )
+        threshold = ee.Number(region_stats.get(f'{band}_mean', DEFAULT_INDEX_MEAN)).add(
+            ee.Number(region_stats.get(f'{band}_stdDev', DEFAULT_INDEX_STD)).multiply(0.5)
+        )
+
+        batches = {
+            start: cells[start:start + SCAN_BATCH_SIZE]
+            for start in range(0, len(cells), SCAN_BATCH_SIZE)
+        }
+
+        def reduce_batch(batch):
+            with timed('ee_scan_batch'):
+                return build_scan_plan(index_image, threshold, batch, mineral_type, scale).getInfo()
+
+        tasks = {
+            start: (lambda batch=batch: reduce_batch(batch))
+            for start, batch in batches.items()
+        }
+        for start, result in fan_out_iter(tasks, timeout=SCAN_TIMEOUT_S, executor=scan_executor):
+            batch = batches[start]
+            if result is None:
+                yield batch, None
+                continue
+            yield batch, parse_scan_rows(result, len(batch))
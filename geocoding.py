@@ -0,0 +1,285 @@
+"""
+Geocoding Service
+Persistent SQLite cache and rate-limited request queue in front of Nominatim
+
+Nominatim's usage policy allows about one request per second. All outbound
+calls go through a single worker thread paced by a token bucket, and
+concurrent callers asking for the same key share one outbound call. The queue
+holds at most NOMINATIM_QUEUE_SIZE distinct keys, and calls whose callers all
+gave up waiting are dropped before they spend a token.
+
+Usage:
+    from geocoding import GeocodingService
+
+    service = GeocodingService(geolocator)
+    result = service.geocode('Bailadila, India')
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import geohash
+from metrics import timed
+from persistent_cache import PersistentCache
+
+GEOCODE_CACHE_PATH = os.getenv('GEOCODE_CACHE_PATH', 'geocode_cache.sqlite3')
+GEOCODE_CACHE_TTL = int(os.getenv('GEOCODE_CACHE_TTL', 30 * 24 * 3600))  # 30 days
+GEOCODE_NEGATIVE_TTL = int(os.getenv('GEOCODE_NEGATIVE_TTL', 24 * 3600))  # not-found results
+NOMINATIM_RATE = float(os.getenv('NOMINATIM_RATE', 1.0))  # requests per second
+NOMINATIM_QUEUE_SIZE = int(os.getenv('NOMINATIM_QUEUE_SIZE', 30))  # distinct queued keys
+
+# Reverse lookups are cached per geohash cell (7 ~ 153m x 153m)
+NEARBY_GEOHASH_PRECISION = int(os.getenv('NEARBY_GEOHASH_PRECISION', 7))
+NEARBY_CACHE_TTL = int(os.getenv('NEARBY_CACHE_TTL', 7 * 24 * 3600))  # 7 days
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a location query"""
+    return ' '.join(query.lower().split())
+
+
+def extract_nearby_places(results, limit=5):
+    """Pick named points of interest out of Nominatim reverse geocoding results"""
+    nearby_places = []
+    seen_names = set()
+    for result in results[:10]:
+        if hasattr(result, 'raw') and 'address' in result.raw:
+            address = result.raw['address']
+            place_name = None
+            place_type = None
+
+            if 'mall' in address or 'shopping' in address.get('amenity', '').lower():
+                place_name = address.get('mall', address.get('shop', address.get('amenity')))
+                place_type = "Shopping"
+            elif 'school' in address or 'college' in address or 'university' in address:
+                place_name = address.get('school', address.get('college', address.get('university')))
+                place_type = "Education"
+            elif 'hospital' in address or 'clinic' in address:
+                place_name = address.get('hospital', address.get('clinic'))
+                place_type = "Healthcare"
+            elif 'hotel' in address or 'restaurant' in address:
+                place_name = address.get('hotel', address.get('restaurant'))
+                place_type = "Hospitality"
+            elif 'building' in address:
+                place_name = address.get('building')
+                place_type = "Landmark"
+
+            if place_name and place_name not in seen_names:
+                seen_names.add(place_name)
+                nearby_places.append({
+                    'name': place_name,
+                    'type': place_type,
+                    'lat': result.latitude,
+                    'lon': result.longitude
+                })
+
+    return nearby_places[:limit]
+
+
+class TokenBucket:
+    """Token bucket limiting calls to `rate` per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, consume=True):
+        """Block until a token is available, then consume it unless consume is False"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    if consume:
+                        self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class QueueFull(Exception):
+    """Raised when the Nominatim queue already holds its maximum number of calls"""
+
+
+class RateLimitedQueue:
+    """Single-worker queue that paces outbound calls and coalesces identical keys.
+
+    Every caller gets its own Future and should cancel it when it stops
+    waiting; a call is skipped once all of its Futures are cancelled.
+    """
+
+    def __init__(self, rate=NOMINATIM_RATE, max_pending=NOMINATIM_QUEUE_SIZE):
+        self.bucket = TokenBucket(rate)
+        self.max_pending = max_pending
+        self.coalesced = 0
+        self.rejected = 0
+        self.abandoned = 0
+        self._queue = queue.Queue()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='nominatim-queue', daemon=True)
+        self._worker.start()
+
+    def submit(self, key, fn):
+        """Queue fn under key and return this caller's Future; identical in-flight keys share one call.
+
+        Raises QueueFull when max_pending keys are already queued or running.
+        """
+        future = Future()
+        with self._lock:
+            waiters = self._inflight.get(key)
+            if waiters is not None:
+                self.coalesced += 1
+                waiters.append(future)
+                return future
+            if len(self._inflight) >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f'Nominatim queue is full ({self.max_pending} pending calls)')
+            self._inflight[key] = [future]
+        self._queue.put((key, fn))
+        return future
+
+    def pending(self):
+        """Number of calls waiting for the worker"""
+        return self._queue.qsize()
+
+    def stats(self):
+        """Queue depth and coalesced, rejected and abandoned calls"""
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'max_pending': self.max_pending,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'abandoned': self.abandoned
+            }
+
+    def _run(self):
+        while True:
+            key, fn = self._queue.get()
+            # Callers may give up while the worker waits out the rate limit
+            self.bucket.acquire(consume=False)
+            with self._lock:
+                # Callers that timed out cancelled their Futures; don't spend a token on them
+                waiters = self._inflight[key]
+                if all(future.cancelled() for future in waiters):
+                    del self._inflight[key]
+                    self.abandoned += 1
+                    continue
+
+            try:
+                self.bucket.acquire()
+                result, error = fn(), None
+            except Exception as e:
+                result, error = None, e
+
+            with self._lock:
+                waiters = self._inflight.pop(key)
+            for future in waiters:
+                # False once the caller cancelled; afterwards cancel() can no longer succeed
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+
+def wait_for(future, timeout):
+    """Return a queued call's result, cancelling this caller's Future on timeout"""
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+
+
+class GeocodingService:
+    """Cached, rate-limited forward and reverse geocoding on top of a geopy geolocator"""
+
+    def __init__(self, geolocator, request_queue=None, cache=None, nearby_cache=None):
+        self.geolocator = geolocator
+        self.request_queue = request_queue or RateLimitedQueue()
+        self.cache = cache or PersistentCache(GEOCODE_CACHE_PATH, 'geocode', GEOCODE_CACHE_TTL)
+        self.nearby_cache = nearby_cache or PersistentCache(
+            GEOCODE_CACHE_PATH, 'nearby_places', NEARBY_CACHE_TTL
+        )
+
+    def _lookup(self, key, query):
+        # Another request may have filled the cache while this one was queued
+        found, result = self.cache.get(key, record_stats=False)
+        if found:
+            return result
+
+        location = self.geolocator.geocode(query)
+        if not location:
+            self.cache.set(key, None, GEOCODE_NEGATIVE_TTL)
+            return None
+
+        result = {
+            'latitude': location.latitude,
+            'longitude': location.longitude,
+            'address': location.address,
+            'raw': location.raw
+        }
+        self.cache.set(key, result)
+        return result
+
+    def geocode(self, query, timeout=30):
+        """Return {latitude, longitude, address, raw} for a query, or None if not found.
+
+        Raises concurrent.futures.TimeoutError when the queue is too backed up
+        and QueueFull when it has no room for another call.
+        """
+        key = normalize_query(query)
+        found, result = self.cache.get(key)
+        if found:
+            return result
+
+        future = self.request_queue.submit(('geocode', key), lambda: self._lookup(key, query))
+        # Timed from the caller's side: queue wait plus the upstream call
+        with timed('nominatim_geocode', service='nominatim'):
+            return wait_for(future, timeout)
+
+    def _lookup_nearby(self, cell):
+        found, nearby_places = self.nearby_cache.get(cell, record_stats=False)
+        if found:
+            return nearby_places
+
+        # Look up the cell center so every point in the cell shares one result
+        lat, lon = geohash.decode(cell)
+        results = self.geolocator.reverse(
+            f"{lat},{lon}", exactly_one=False, language='en', addressdetails=True
+        )
+        nearby_places = extract_nearby_places(results or [])
+        self.nearby_cache.set(cell, nearby_places)
+        return nearby_places
+
+    def submit_nearby_places(self, lat, lon, precision=NEARBY_GEOHASH_PRECISION):
+        """Start a nearby places lookup and return its Future without blocking.
+
+        Cached cells return an already completed Future. Wait with wait_for so
+        the lookup is cancelled if the caller gives up.
+        """
+        cell = geohash.encode(lat, lon, precision)
+        found, nearby_places = self.nearby_cache.get(cell)
+        if found:
+            future = Future()
+            future.set_result(nearby_places)
+            return future
+        return self.request_queue.submit(('reverse', cell), lambda: self._lookup_nearby(cell))
+
+    def nearby_places(self, lat, lon, timeout=30, precision=NEARBY_GEOHASH_PRECISION):
+        """Return points of interest near a coordinate, cached per geohash cell"""
+        future = self.submit_nearby_places(lat, lon, precision)
+        if future.done():
+            return future.result()
+        with timed('nominatim_reverse', service='nominatim'):
+            return wait_for(future, timeout)
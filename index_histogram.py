@@ -0,0 +1,180 @@
+"""
+Mineral Index Histograms
+Fixed-bin histograms of an index over the ROI and everything derived from them
+
+One fixed-bin histogram reduction per analysis replaces the separate
+mean/stdDev and coverage reductions. The mean, standard deviation, default
+threshold (mean + 0.5 * stdDev), coverage above any threshold and percentile
+cut-offs are all computed locally from the bin counts, so the histogram is
+cached with the analysis and /api/rethreshold answers without touching the
+compute backend.
+
+Each mineral has a fixed index range split into HISTOGRAM_BINS bins. Values
+outside the range are clamped into the edge bins, so every pixel is counted.
+Backends reduce the index normalized to [0, 1) with the same bin count.
+
+Usage:
+    from index_histogram import IndexHistogram
+
+    histogram = IndexHistogram.from_values('iron', values)
+    histogram.coverage_above(1.6), histogram.percentile(95)
+"""
+
+import math
+import os
+
+import numpy as np
+
+from compute_backend import DEFAULT_INDEX_MEAN, DEFAULT_INDEX_STD
+
+HISTOGRAM_BINS = int(os.getenv('HISTOGRAM_BINS', 500))
+
+# Index range per mineral; band ratios rarely leave it
+HISTOGRAM_RANGES = {
+    'iron': (0.0, 8.0),
+    'aluminum': (0.0, 8.0),
+    'copper': (0.0, 16.0)
+}
+
+# Percentile cut-offs reported next to the default threshold
+REPORTED_PERCENTILES = (50, 75, 90, 95, 99)
+
+
+def default_threshold(mean, std):
+    """The analysis threshold, mean + 0.5 * stdDev of the index over the ROI"""
+    if mean is None:
+        mean, std = DEFAULT_INDEX_MEAN, DEFAULT_INDEX_STD
+    return mean + std * 0.5
+
+
+class IndexHistogram:
+    """Fixed-bin histogram of one mineral index; counts may be pixel-weighted floats"""
+
+    def __init__(self, low, high, counts):
+        self.low = low
+        self.high = high
+        self.counts = np.asarray(counts, dtype=np.float64)
+        # An ROI without valid pixels still gets an empty histogram of the usual shape
+        if not len(self.counts):
+            self.counts = np.zeros(HISTOGRAM_BINS)
+        self.bin_width = (high - low) / len(self.counts)
+
+    @classmethod
+    def from_fixed_histogram(cls, mineral_type, pairs):
+        """From Earth Engine fixedHistogram [[bucket_min, count], ...] of the normalized index"""
+        low, high = HISTOGRAM_RANGES[mineral_type]
+        return cls(low, high, [count for _, count in pairs])
+
+    @classmethod
+    def from_values(cls, mineral_type, values, bins=HISTOGRAM_BINS):
+        """From an array of index values"""
+        low, high = HISTOGRAM_RANGES[mineral_type]
+        width = (high - low) / bins
+        clamped = np.clip(values, low, high - width / 2)
+        counts, _ = np.histogram(clamped, bins=bins, range=(low, high))
+        return cls(low, high, counts)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['min'], data['max'], data['counts'])
+
+    def to_dict(self):
+        counts = [int(c) if float(c).is_integer() else float(c) for c in self.counts]
+        return {'min': self.low, 'max': self.high, 'counts': counts}
+
+    @property
+    def total(self):
+        return float(self.counts.sum())
+
+    def _centers(self):
+        return self.low + (np.arange(len(self.counts)) + 0.5) * self.bin_width
+
+    def mean(self):
+        """Mean of the index, None when no pixel was counted"""
+        if not self.total:
+            return None
+        return float((self._centers() * self.counts).sum() / self.total)
+
+    def std(self):
+        """Population standard deviation of the index, None when no pixel was counted"""
+        if not self.total:
+            return None
+        variance = (((self._centers() - self.mean()) ** 2) * self.counts).sum() / self.total
+        return float(math.sqrt(max(variance, 0.0)))
+
+    def coverage_above(self, threshold):
+        """Percent of pixels above threshold, spreading each bin evenly over its width"""
+        if not self.total:
+            return 0.0
+        position = (threshold - self.low) / self.bin_width
+        position = min(max(position, 0.0), float(len(self.counts)))
+        full_bin = int(position)
+        above = self.counts[full_bin + 1:].sum() if full_bin < len(self.counts) else 0.0
+        if full_bin < len(self.counts):
+            above += self.counts[full_bin] * (1 - (position - full_bin))
+        return float(above / self.total * 100)
+
+    def default_coverage(self):
+        """Percent of pixels above the default threshold"""
+        return self.coverage_above(default_threshold(self.mean(), self.std()))
+
+    def coverage_margin(self, coverage):
+        """95% sampling margin, in percentage points, of a coverage measured from this histogram.
+
+        Treats every counted pixel as an independent sample, so it shrinks as
+        the reduction scale gets finer and the pixel count grows.
+        """
+        if not self.total:
+            return None
+        share = min(max(coverage / 100, 0.0), 1.0)
+        return float(1.96 * math.sqrt(share * (1 - share) / self.total) * 100)
+
+    def percentile(self, pct):
+        """Index value below which pct percent of the pixels fall"""
+        if not self.total:
+            return None
+        target = self.total * min(max(pct, 0.0), 100.0) / 100
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, target))
+        if i >= len(self.counts):
+            return self.high
+        before = cumulative[i - 1] if i else 0.0
+        fraction = (target - before) / self.counts[i] if self.counts[i] else 0.0
+        return float(self.low + (i + fraction) * self.bin_width)
+
+    def percentiles(self, pcts=REPORTED_PERCENTILES):
+        return {str(pct): self.percentile(pct) for pct in pcts}
+
+
+def plan_from_histograms(num_images, histograms, mineral_types, scales, biases=None):
+    """Analysis plan (statistics, thresholds, coverage) from {mineral: IndexHistogram}.
+
+    scales maps each mineral to the reduction scale its histogram was computed
+    at and biases to the estimated smoothing bias of its coverage, in
+    percentage points. coverage_error is the sampling margin plus that bias.
+    """
+    biases = biases or {}
+    statistics = {}
+    thresholds = {}
+    coverage_percent = {}
+    coverage_error = {}
+    for mineral_type in mineral_types:
+        band = f'{mineral_type}_index'
+        histogram = histograms[mineral_type]
+        mean_val, std_val = histogram.mean(), histogram.std()
+        statistics[f'{band}_mean'] = mean_val
+        statistics[f'{band}_stdDev'] = std_val
+        thresholds[mineral_type] = default_threshold(mean_val, std_val)
+        coverage_percent[mineral_type] = histogram.coverage_above(thresholds[mineral_type])
+        margin = histogram.coverage_margin(coverage_percent[mineral_type])
+        coverage_error[mineral_type] = None if margin is None else margin + biases.get(mineral_type, 0.0)
+
+    return {
+        'num_images': num_images,
+        'statistics': statistics,
+        'thresholds': thresholds,
+        'coverage_percent': coverage_percent,
+        'coverage_error': coverage_error,
+        'scale_m': {m: scales[m] for m in mineral_types},
+        'histograms': {m: histograms[m].to_dict() for m in mineral_types}
+    }
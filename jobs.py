@@ -0,0 +1,104 @@
+"""
+Background Analysis Jobs
+Bounded worker pool and in-process job store for long-running analyses
+
+Jobs live in the memory of the process that accepted them, so deployments
+using the job API should run a single worker process with several threads
+(e.g. gunicorn --workers 1 --threads 8).
+
+Usage:
+    from jobs import JobManager
+
+    jobs = JobManager(run_analysis)
+    job = jobs.submit({'latitude': 18.63, 'longitude': 81.30})
+    status = jobs.get(job['job_id'])
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis_cache import TTLCache
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', 100))
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 3600))
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already queued or running"""
+
+
+class JobManager:
+    """Runs a (payload) -> (response, status_code) function on a bounded worker pool"""
+
+    def __init__(self, run_fn, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING,
+                 result_ttl=JOB_RESULT_TTL):
+        self.run_fn = run_fn
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._active = {}
+        self._finished = TTLCache(max_entries=10000, ttl_seconds=result_ttl)
+        self._lock = threading.Lock()
+
+    def submit(self, payload):
+        """Queue a job and return its initial record"""
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'status': 'queued',
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+        with self._lock:
+            if len(self._active) >= self.max_pending:
+                raise JobQueueFull(f'{len(self._active)} jobs already pending')
+            self._active[job_id] = job
+
+        self._executor.submit(self._run, job, payload)
+        return dict(job)
+
+    def _run(self, job, payload):
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        try:
+            response, status_code = self.run_fn(payload)
+        except Exception as e:
+            logging.error(f"Job {job['job_id']} crashed: {e}")
+            response, status_code = {'error': str(e)}, 500
+
+        job['finished_at'] = time.time()
+        job['status_code'] = status_code
+        if status_code < 400:
+            job['status'] = 'completed'
+            job['result'] = response
+        else:
+            job['status'] = 'failed'
+            job['error'] = response.get('error')
+
+        # Finished jobs move to the TTL store so repeated polls stay cheap
+        with self._lock:
+            self._finished.set(job['job_id'], job)
+            self._active.pop(job['job_id'], None)
+
+    def get(self, job_id):
+        """Return a snapshot of the job record, or None if unknown or expired"""
+        with self._lock:
+            job = self._active.get(job_id)
+            if job is not None:
+                return dict(job)
+        return self._finished.get(job_id)
+
+    def stats(self):
+        """Counts of active jobs by status and finished jobs retained"""
+        with self._lock:
+            statuses = [job['status'] for job in self._active.values()]
+        return {
+            'queued': statuses.count('queued'),
+            'running': statuses.count('running'),
+            'finished_retained': len(self._finished)
+        }
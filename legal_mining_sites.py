@@ -2,12 +2,24 @@
 Legal Mining Areas Database
 Contains coordinates of 149 verified legal mining sites worldwide
 
+The sites below seed the database. Set MINE_DB_PATH to a store file built by
+mine_store.py (e.g. imported national cadastres) to serve that instead. Either
+way LEGAL_MINING_AREAS is a columnar MineStore, a read-only mapping of
+name -> (lat, lon, country, type) whose type/country groups and counts are
+precomputed.
+
 Usage:
     from legal_mining_database import LEGAL_MINING_AREAS, get_mines_by_type, get_mine_count
 """
 
+import os
+
+from mine_store import MineStore
+
+MINE_DB_PATH = os.getenv('MINE_DB_PATH')
+
 # --- LEGAL MINING AREAS DATASET ---
-LEGAL_MINING_AREAS = {
+SEED_MINING_AREAS = {
     # ==================== IRON ORE MINES ====================
     # INDIA
     "Bailadila Iron Ore Complex": (18.6297, 81.3025, "India", "Iron Ore"),
@@ -249,6 +261,8 @@ LEGAL_MINING_AREAS = {
     "Çayeli Copper Mine": (41.0833, 40.7333, "Turkey", "Copper"),
 }
 
+LEGAL_MINING_AREAS = MineStore.load(MINE_DB_PATH) if MINE_DB_PATH else MineStore.from_mapping(SEED_MINING_AREAS)
+
 
 def get_mines_by_type(mineral_type):
     """
@@ -258,10 +272,9 @@ def get_mines_by_type(mineral_type):
         mineral_type: One of 'Iron Ore', 'Bauxite/Aluminum', 'Copper'
     
     Returns:
-        Dictionary of mines matching the type
+        Mapping of mines matching the type
     """
-    return {name: coords for name, coords in LEGAL_MINING_AREAS.items() 
-            if coords[3] == mineral_type}
+    return LEGAL_MINING_AREAS.by_type(mineral_type)
 
 
 def get_mine_count():
@@ -271,11 +284,7 @@ def get_mine_count():
     Returns:
         Dictionary with counts: {'Iron Ore': 57, 'Bauxite/Aluminum': 37, 'Copper': 55}
     """
-    counts = {}
-    for mine_data in LEGAL_MINING_AREAS.values():
-        mine_type = mine_data[3]
-        counts[mine_type] = counts.get(mine_type, 0) + 1
-    return counts
+    return LEGAL_MINING_AREAS.counts_by_type()
 
 
 def get_mines_by_country(country):
@@ -286,10 +295,9 @@ def get_mines_by_country(country):
         country: Country name (e.g., 'Australia', 'Chile', 'India')
     
     Returns:
-        Dictionary of mines in that country
+        Mapping of mines in that country
     """
-    return {name: coords for name, coords in LEGAL_MINING_AREAS.items() 
-            if coords[2] == country}
+    return LEGAL_MINING_AREAS.by_country(country)
 
 
 def get_all_countries():
@@ -299,8 +307,7 @@ def get_all_countries():
     Returns:
         Sorted list of country names
     """
-    countries = set(coords[2] for coords in LEGAL_MINING_AREAS.values())
-    return sorted(countries)
+    return LEGAL_MINING_AREAS.sorted_countries()
 
 
 def get_total_count():
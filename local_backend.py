@@ -0,0 +1,319 @@
+"""
+Local Raster Compute Backend
+Offline analysis over memory-mapped Sentinel-2 scenes with NumPy
+
+Mirrors the Earth Engine pipeline (clearest scenes, median composite, band
+ratio indices, fixed-bin index histograms giving the mean + 0.5 * stdDev
+threshold and coverage, coarse-to-fine reduction scales) without any network
+round trips, so analyses keep working when Earth Engine quota or latency is a
+problem.
+
+Archive layout (LOCAL_RASTER_DIR), one directory per scene:
+
+    <scene>/scene.json   {"tile_id": "44QKE", "date": "2024-01-15",
+                          "cloudy_pixel_percentage": 3.2,
+                          "bounds": [west, south, east, north]}
+    <scene>/B2.npy ...   one 2-D array per band (B2, B3, B4, B8, B11, B12), all
+                         resampled to the same north-up grid; 0 means no data
+
+Bands are opened with np.load(mmap_mode='r'), so only the pixels of the
+requested window are read from disk.
+
+Usage:
+    from local_backend import LocalRasterBackend
+
+    backend = LocalRasterBackend('/data/sentinel2')
+    for stage, plan in backend.iter_analysis_stages(18.63, 81.30, 10000, ['iron'], start, end):
+        ...
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import warnings
+
+import numpy as np
+
+from adaptive_scale import reduction_scales, first_round_scales, refine_histograms
+from compute_backend import ComputeBackend, DEFAULT_INDEX_MEAN, DEFAULT_INDEX_STD
+from index_histogram import IndexHistogram, plan_from_histograms
+from metrics import timed
+
+LOCAL_RASTER_DIR = os.getenv('LOCAL_RASTER_DIR', 'sentinel2')
+
+MAX_CLOUD_PERCENT = 20
+MAX_SCENES = 50
+REDUCTION_SCALE_M = 100  # same scale as the Earth Engine reductions
+METERS_PER_DEGREE = 111320.0
+
+# Bands each mineral index reads
+MINERAL_BANDS = {
+    'iron': ['B2', 'B4'],
+    'aluminum': ['B11', 'B12'],
+    'copper': ['B3', 'B4', 'B8']
+}
+
+
+def calculate_mineral_index(bands, mineral_type):
+    """Band ratio index from a dict of composite band arrays; NaN where undefined"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if mineral_type == 'iron':
+            index = bands['B4'] / bands['B2']
+        elif mineral_type == 'aluminum':
+            index = bands['B11'] / bands['B12']
+        elif mineral_type == 'copper':
+            index = (bands['B4'] / bands['B3']) * (bands['B8'] / bands['B4'])
+        else:
+            return None
+    index[~np.isfinite(index)] = np.nan
+    return index
+
+
+class Scene:
+    """One Sentinel-2 scene of the archive with lazily memory-mapped bands"""
+
+    def __init__(self, path, metadata):
+        self.path = path
+        self.tile_id = metadata['tile_id']
+        self.date = metadata['date']
+        self.cloud = float(metadata['cloudy_pixel_percentage'])
+        self.west, self.south, self.east, self.north = metadata['bounds']
+        self._bands = {}
+
+    def band(self, name):
+        """Memory-mapped 2-D array of a band"""
+        array = self._bands.get(name)
+        if array is None:
+            array = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+            self._bands[name] = array
+        return array
+
+    @property
+    def shape(self):
+        return self.band('B4').shape
+
+    def contains(self, lat, lon):
+        return self.south <= lat <= self.north and self.west <= lon <= self.east
+
+    def pixel_size(self):
+        """(degrees per row, degrees per column)"""
+        rows, cols = self.shape
+        return (self.north - self.south) / rows, (self.east - self.west) / cols
+
+
+class LocalRasterBackend(ComputeBackend):
+    """Analysis engine over a local archive of memory-mapped Sentinel-2 scenes"""
+
+    name = 'local'
+    supports_tiles = False
+    supports_scan = False
+
+    def __init__(self, root=LOCAL_RASTER_DIR):
+        self.root = root
+        self._scenes = None
+        self._lock = threading.Lock()
+
+    def scenes(self):
+        """Every scene of the archive, read from scene.json files once"""
+        with self._lock:
+            if self._scenes is None:
+                scenes = []
+                for entry in sorted(os.listdir(self.root)):
+                    path = os.path.join(self.root, entry)
+                    metadata_path = os.path.join(path, 'scene.json')
+                    if not os.path.isfile(metadata_path):
+                        continue
+                    with open(metadata_path) as f:
+                        scenes.append(Scene(path, json.load(f)))
+                self._scenes = scenes
+            return self._scenes
+
+    def select_scenes(self, center_lat, center_lon, start_date, end_date, limit=MAX_SCENES):
+        """Clearest scenes of the tile covering the center within [start_date, end_date).
+
+        Scenes of one tile share a pixel grid, so the composite is built on the
+        grid of the clearest matching tile.
+        """
+        candidates = [
+            scene for scene in self.scenes()
+            if scene.contains(center_lat, center_lon)
+            and start_date <= scene.date < end_date
+            and scene.cloud < MAX_CLOUD_PERCENT
+        ]
+        if not candidates:
+            return []
+
+        candidates.sort(key=lambda scene: scene.cloud)
+        tile_id = candidates[0].tile_id
+        return [scene for scene in candidates if scene.tile_id == tile_id][:limit]
+
+    def _window(self, grid, center_lat, center_lon, radius_m, scale_m):
+        """Row/column index vectors covering the ROI, strided to about scale_m, plus the ROI mask"""
+        lat_step, lon_step = grid.pixel_size()
+        rows, cols = grid.shape
+        stride = max(1, round(scale_m / (lat_step * METERS_PER_DEGREE)))
+
+        radius_lat = radius_m / METERS_PER_DEGREE
+        radius_lon = radius_lat / max(math.cos(math.radians(center_lat)), 0.01)
+        row_start = max(0, int((grid.north - center_lat - radius_lat) / lat_step))
+        row_stop = min(rows, int(math.ceil((grid.north - center_lat + radius_lat) / lat_step)))
+        col_start = max(0, int((center_lon - radius_lon - grid.west) / lon_step))
+        col_stop = min(cols, int(math.ceil((center_lon + radius_lon - grid.west) / lon_step)))
+
+        row_index = np.arange(row_start, row_stop, stride)
+        col_index = np.arange(col_start, col_stop, stride)
+
+        # Circular ROI on pixel centers, equirectangular distance
+        pixel_lats = grid.north - (row_index + 0.5) * lat_step
+        pixel_lons = grid.west + (col_index + 0.5) * lon_step
+        dy = (pixel_lats - center_lat)[:, None] * METERS_PER_DEGREE
+        dx = (pixel_lons - center_lon)[None, :] * METERS_PER_DEGREE * math.cos(math.radians(center_lat))
+        mask = dx ** 2 + dy ** 2 <= radius_m ** 2
+        return row_index, col_index, mask
+
+    @staticmethod
+    def _composite(scenes, band_names, rows, cols):
+        """Per-pixel median of each band across scenes at the given pixel indexes"""
+        composite = {}
+        for name in band_names:
+            stack = np.stack([
+                np.asarray(scene.band(name)[rows, cols], dtype=np.float32) for scene in scenes
+            ])
+            stack[stack == 0] = np.nan
+            # All-NaN pixels (no data in any scene) stay NaN without a warning
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                composite[name] = np.nanmedian(stack, axis=0)
+        return composite
+
+    def compute_plan(self, center_lat, center_lon, radius_m, mineral_types, start_date, end_date):
+        """Evaluate the analysis plan for one ROI, coarse scale first like Earth Engine"""
+        scenes = self.select_scenes(center_lat, center_lon, start_date, end_date)
+        if not scenes:
+            return {'num_images': 0}
+
+        def reduce(reduced_minerals, scale_m):
+            row_index, col_index, mask = self._window(
+                scenes[0], center_lat, center_lon, radius_m, scale_m
+            )
+            band_names = sorted({band for m in reduced_minerals for band in MINERAL_BANDS[m]})
+            rows, cols = np.ix_(row_index, col_index)
+            composite = self._composite(scenes, band_names, rows, cols)
+
+            histograms = {}
+            for mineral_type in reduced_minerals:
+                index = calculate_mineral_index(composite, mineral_type)
+                values = index[mask & np.isfinite(index)]
+                histograms[mineral_type] = IndexHistogram.from_values(mineral_type, values)
+            return histograms
+
+        ladder = reduction_scales(radius_m)
+        levels = [reduce(mineral_types, scale) for scale in first_round_scales(ladder)]
+        histograms, scales, biases = refine_histograms(levels, ladder, reduce)
+        return plan_from_histograms(len(scenes), histograms, mineral_types, scales, biases)
+
+    def iter_analysis_stages(self, center_lat, center_lon, radius_m, mineral_types,
+                             start_date, end_date):
+        """Yield the plan only; the local backend does not render map tiles"""
+        with timed('local_plan', service='local'):
+            plan = self.compute_plan(
+                center_lat, center_lon, radius_m, mineral_types, start_date, end_date
+            )
+        yield 'plan', plan
+
+    def time_series(self, center_lat, center_lon, radius_m, mineral_type, windows):
+        """Baseline and monthly composites on the grid of the baseline's clearest tile"""
+        with timed('local_time_series', service='local'):
+            return self._time_series(center_lat, center_lon, radius_m, mineral_type, windows)
+
+    def _time_series(self, center_lat, center_lon, radius_m, mineral_type, windows):
+        start_date, end_date = windows[0][1], windows[-1][2]
+        months = [{'month': month, 'num_images': 0} for month, _, _ in windows]
+        scenes = self.select_scenes(center_lat, center_lon, start_date, end_date)
+        if not scenes:
+            return {'baseline': {'num_images': 0}, 'months': months}
+
+        grid = scenes[0]
+        row_index, col_index, mask = self._window(
+            grid, center_lat, center_lon, radius_m, REDUCTION_SCALE_M
+        )
+        rows, cols = np.ix_(row_index, col_index)
+
+        def index_values(window_scenes):
+            composite = self._composite(window_scenes, MINERAL_BANDS[mineral_type], rows, cols)
+            index = calculate_mineral_index(composite, mineral_type)
+            return index[mask & np.isfinite(index)]
+
+        values = index_values(scenes)
+        if values.size:
+            mean_val, std_val = float(values.mean()), float(values.std())
+            threshold = mean_val + std_val * 0.5
+        else:
+            mean_val = std_val = None
+            threshold = DEFAULT_INDEX_MEAN + DEFAULT_INDEX_STD * 0.5
+        baseline = {
+            'num_images': len(scenes),
+            'mean': mean_val,
+            'stdDev': std_val,
+            'threshold': threshold,
+            'coverage_percent': float((values > threshold).mean()) * 100 if values.size else None
+        }
+
+        # Months use every clear scene of the same tile, not only the baseline's clearest
+        tile_scenes = self.select_scenes(center_lat, center_lon, start_date, end_date, limit=None)
+        for month, (_, month_start, month_end) in zip(months, windows):
+            month_scenes = [s for s in tile_scenes if month_start <= s.date < month_end]
+            if not month_scenes:
+                continue
+            values = index_values(month_scenes)
+            month.update({
+                'num_images': len(month_scenes),
+                'mean': float(values.mean()) if values.size else None,
+                'coverage_percent': float((values > threshold).mean()) * 100 if values.size else None
+            })
+
+        return {'baseline': baseline, 'months': months}
+
+    def sample_points(self, center_lat, center_lon, radius_m, mineral_type,
+                      start_date, end_date, points):
+        """Index value of the full-resolution pixel under each point"""
+        try:
+            values = [None] * len(points)
+            scenes = self.select_scenes(center_lat, center_lon, start_date, end_date)
+            if not scenes:
+                return values
+
+            grid = scenes[0]
+            lat_step, lon_step = grid.pixel_size()
+            rows, cols = grid.shape
+            # Points outside the clipped ROI are masked, as in Earth Engine
+            cos_lat = math.cos(math.radians(center_lat))
+            inside = [
+                i for i, (lat, lon) in enumerate(points)
+                if grid.contains(lat, lon) and math.hypot(
+                    (lat - center_lat) * METERS_PER_DEGREE,
+                    (lon - center_lon) * METERS_PER_DEGREE * cos_lat
+                ) <= radius_m
+            ]
+            if not inside:
+                return values
+
+            row_index = np.array([
+                min(rows - 1, int((grid.north - points[i][0]) / lat_step)) for i in inside
+            ])
+            col_index = np.array([
+                min(cols - 1, int((points[i][1] - grid.west) / lon_step)) for i in inside
+            ])
+            with timed('local_sample', service='local'):
+                composite = self._composite(scenes, MINERAL_BANDS[mineral_type], row_index, col_index)
+            index = calculate_mineral_index(composite, mineral_type)
+
+            for i, value in zip(inside, index.tolist()):
+                if not math.isnan(value):
+                    values[i] = value
+            return values
+        except Exception as e:
+            logging.error(f"Error sampling local rasters: {e}")
+            return None
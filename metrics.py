@@ -0,0 +1,276 @@
+"""
+Request Metrics
+Stage timers, counters and histograms rendered in the Prometheus text format
+
+Every external call (Earth Engine round trips, Nominatim lookups) runs inside
+timed(), which feeds the process-wide histograms and, when a request is being
+served, that request's stage list for the Server-Timing header. The current
+request travels in a context variable, so calls fanned out to the I/O pool
+are attributed to the request that started them.
+
+Usage:
+    from metrics import timed, registry
+
+    with timed('ee_plan', service='earthengine'):
+        plan = build_analysis_plan(...).getInfo()
+
+    text = registry.render()
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans cached lookups up to slow Earth Engine reductions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._series = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together, plus callbacks for values kept elsewhere"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect_fn):
+        """Add a callable returning extra exposition lines at render time"""
+        self._collectors.append(collect_fn)
+
+    def render(self):
+        """Prometheus text exposition of every metric"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect_fn in self._collectors:
+            lines.extend(collect_fn())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+external_call_seconds = registry.histogram(
+    'spectramining_external_call_seconds',
+    'Latency of external calls by service and stage',
+    ['service', 'stage']
+)
+external_call_errors = registry.counter(
+    'spectramining_external_call_errors_total',
+    'External calls that raised, by service and stage',
+    ['service', 'stage']
+)
+http_request_seconds = registry.histogram(
+    'spectramining_http_request_seconds',
+    'HTTP request latency until the response headers, by endpoint',
+    ['endpoint']
+)
+http_requests = registry.counter(
+    'spectramining_http_requests_total',
+    'HTTP responses by endpoint and status code',
+    ['endpoint', 'status']
+)
+ee_round_trips = registry.histogram(
+    'spectramining_ee_round_trips_per_request',
+    'Earth Engine round trips made while serving one request, by endpoint',
+    ['endpoint'],
+    buckets=ROUND_TRIP_BUCKETS
+)
+
+
+class RequestTimings:
+    """Stage durations and round-trip counts of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []  # (stage, seconds)
+        self.round_trips = {}
+        self.streamed = False
+        # Set once the request is counted in http_requests
+        self.counted = False
+        # Stages fanned out to the I/O pool record from several threads
+        self._lock = threading.Lock()
+
+    def record(self, stage, service, seconds):
+        with self._lock:
+            self.stages.append((stage, seconds))
+            self.round_trips[service] = self.round_trips.get(service, 0) + 1
+
+    def server_timing(self):
+        """Server-Timing header value; repeated stages are summed, in first-seen order"""
+        with self._lock:
+            stages = list(self.stages)
+        totals = {}
+        for stage, seconds in stages:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        entries = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in totals.items()]
+        entries.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}')
+        return ', '.join(entries)
+
+
+_current_request = contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request():
+    """Begin collecting stage timings for the current request"""
+    request_timings = RequestTimings()
+    _current_request.set(request_timings)
+    return request_timings
+
+
+def current_request():
+    """RequestTimings of the request being served, or None outside requests"""
+    return _current_request.get()
+
+
+def end_request():
+    _current_request.set(None)
+
+
+@contextmanager
+def timed(stage, service='earthengine'):
+    """Time an external call; errors are counted and re-raised"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        external_call_errors.inc(service=service, stage=stage)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        external_call_seconds.observe(seconds, service=service, stage=stage)
+        request_timings = _current_request.get()
+        if request_timings is not None:
+            request_timings.record(stage, service, seconds)
+
+
+def cache_metric_lines(cache_stats):
+    """Hit/miss counters and hit ratio gauges for {cache_name: stats()} dictionaries"""
+    lines = [
+        '# HELP spectramining_cache_hits_total Cache lookups that found an entry',
+        '# TYPE spectramining_cache_hits_total counter'
+    ]
+    lines += [f'spectramining_cache_hits_total{{cache="{name}"}} {stats["hits"]}'
+              for name, stats in cache_stats.items()]
+    lines += [
+        '# HELP spectramining_cache_misses_total Cache lookups that found no entry',
+        '# TYPE spectramining_cache_misses_total counter'
+    ]
+    lines += [f'spectramining_cache_misses_total{{cache="{name}"}} {stats["misses"]}'
+              for name, stats in cache_stats.items()]
+    lines += [
+        '# HELP spectramining_cache_hit_ratio Share of cache lookups that were hits',
+        '# TYPE spectramining_cache_hit_ratio gauge'
+    ]
+    lines += [f'spectramining_cache_hit_ratio{{cache="{name}"}} {stats["hit_rate"]}'
+              for name, stats in cache_stats.items()]
+    return lines
+
+
+def single_flight_metric_lines(name, flight_stats):
+    """Executed versus deduplicated counters of a SingleFlight"""
+    return [
+        '# HELP spectramining_singleflight_executions_total Computations actually run',
+        '# TYPE spectramining_singleflight_executions_total counter',
+        f'spectramining_singleflight_executions_total{{flight="{name}"}} {flight_stats["executions"]}',
+        '# HELP spectramining_singleflight_deduplicated_total Requests that joined an in-flight computation',
+        '# TYPE spectramining_singleflight_deduplicated_total counter',
+        f'spectramining_singleflight_deduplicated_total{{flight="{name}"}} {flight_stats["deduplicated"]}',
+        '# HELP spectramining_singleflight_in_flight Computations currently running',
+        '# TYPE spectramining_singleflight_in_flight gauge',
+        f'spectramining_singleflight_in_flight{{flight="{name}"}} {flight_stats["in_flight"]}'
+    ]
@@ -0,0 +1,114 @@
+"""
+Legal Mines Catalog
+Type/country indexes and memoized /api/legal-mines response bodies
+
+The mining database is static for the life of the process. Type and country
+filters use the columnar store's precomputed groups and bounding boxes the
+spatial index. Every body is serialized on first request, memoized in a TTL
+cache and served with a content-derived ETag, so importing the catalog costs
+nothing even for a cadastre-sized database.
+
+Usage:
+    from mine_catalog import mine_catalog
+
+    body, etag = mine_catalog.body(mine_type='Iron Ore', bbox=(5, 65, 35, 100), limit=50)
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from analysis_cache import TTLCache
+from legal_mining_sites import LEGAL_MINING_AREAS
+from mine_index import mine_index
+
+LEGAL_MINES_BODY_CACHE_SIZE = int(os.getenv('LEGAL_MINES_BODY_CACHE_SIZE', 1024))
+LEGAL_MINES_MAX_LIMIT = 1000
+
+
+def serialize(payload):
+    """Compact JSON bytes with sorted keys, matching jsonify's key order"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class MineCatalog:
+    """Read-only views of the mining database keyed by type, country and bounding box"""
+
+    def __init__(self, mines, spatial_index):
+        self.mines = mines
+        self.spatial_index = spatial_index
+
+        # Part of every ETag, so a changed database never matches an old one
+        self.version = mines.fingerprint()[:12]
+
+        self._bodies = TTLCache(max_entries=LEGAL_MINES_BODY_CACHE_SIZE, ttl_seconds=24 * 3600)
+
+    def types(self):
+        return [mine_type for mine_type, count in self.mines.counts_by_type().items() if count]
+
+    def countries(self):
+        return [country for country, count in self.mines.counts_by_country().items() if count]
+
+    def record(self, position):
+        """The /api/legal-mines record of the mine at a store position"""
+        lat, lon, country, mine_type = self.mines.row(position)
+        return {
+            'name': self.mines.name(position),
+            'latitude': lat,
+            'longitude': lon,
+            'country': country,
+            'type': mine_type
+        }
+
+    def select(self, mine_type=None, country=None, bbox=None):
+        """Store positions of mines matching every given filter, in database order"""
+        candidates = None
+        if mine_type:
+            candidates = self.mines.by_type(mine_type).positions
+        if country:
+            country_positions = self.mines.by_country(country).positions
+            # Group positions ascend, so the intersection stays in database order
+            candidates = country_positions if candidates is None else np.intersect1d(
+                candidates, country_positions
+            )
+
+        if bbox is not None:
+            in_box = np.asarray(
+                self.spatial_index.query_bbox_positions(*bbox, mine_type=mine_type or None),
+                dtype=np.int64
+            )
+            if candidates is None:
+                return in_box.tolist()
+            return in_box[np.isin(in_box, candidates)].tolist()
+
+        return list(range(len(self.mines))) if candidates is None else candidates.tolist()
+
+    def _build_body(self, mine_type, country, bbox, offset, limit):
+        positions = self.select(mine_type, country, bbox)
+        payload = {'total': len(positions)}
+
+        if offset or limit is not None:
+            page = positions[offset:offset + limit if limit is not None else None]
+            payload.update({'offset': offset, 'limit': limit, 'count': len(page)})
+            next_offset = offset + len(page)
+            payload['next_offset'] = next_offset if next_offset < len(positions) else None
+            positions = page
+
+        payload['mines'] = [self.record(i) for i in positions]
+        body = serialize(payload)
+        etag = f'{self.version}-{hashlib.sha1(body).hexdigest()[:16]}'
+        return body, etag
+
+    def body(self, mine_type=None, country=None, bbox=None, offset=0, limit=None):
+        """Return (json_bytes, etag) of the /api/legal-mines response for a query"""
+        key = (mine_type or None, country or None, bbox, offset, limit)
+        cached = self._bodies.get(key)
+        if cached is None:
+            cached = self._build_body(*key)
+            self._bodies.set(key, cached)
+        return cached
+
+
+mine_catalog = MineCatalog(LEGAL_MINING_AREAS, mine_index)
@@ -0,0 +1,297 @@
+"""
+Legal Mining Areas Spatial Index
+Grid-bucketed index over LEGAL_MINING_AREAS for radius and k-nearest queries
+
+Mines are partitioned by type and bucketed into fixed lat/lon grid cells once
+at import, straight from the columnar store's coordinate and type arrays: each
+occupied cell holds an array of store positions. Queries visit cells ring by
+ring around the search point, prefilter with a haversine distance (vectorized
+for crowded cells) and run exact geodesic only on the survivors.
+
+Usage:
+    from mine_index import mine_index
+
+    nearby = mine_index.query_radius(18.63, 81.30, 10, 'Iron Ore')
+    closest = mine_index.nearest(18.63, 81.30, k=3)
+"""
+
+import heapq
+import math
+
+import numpy as np
+from geopy.distance import geodesic
+
+from legal_mining_sites import LEGAL_MINING_AREAS
+from mine_store import MineStore
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Haversine (sphere) and geodesic (ellipsoid) distances differ by < 0.6%,
+# so candidates within this relative margin are re-checked exactly
+HAVERSINE_MARGIN = 0.01
+
+# Cells up to this size are scanned with scalar math; larger ones are vectorized
+SMALL_CELL_SIZE = 32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometers on a spherical Earth"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_array(lat, lon, lats, lons):
+    """Great-circle distances in kilometers from one point to arrays of points"""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lons - lon)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+class MineSpatialIndex:
+    """Fixed-grid spatial index of mines, partitioned by mine type"""
+
+    def __init__(self, mines, cell_size_deg=1.0):
+        # Plain {name: (lat, lon, country, type)} mappings are converted once
+        self.mines = mines if isinstance(mines, MineStore) else MineStore.from_mapping(mines)
+        self.cell_size_deg = cell_size_deg
+        self.n_rows = int(math.ceil(180 / cell_size_deg))
+        self.n_cols = int(math.ceil(360 / cell_size_deg))
+        self._lats = np.asarray(self.mines.lats)
+        self._lons = np.asarray(self.mines.lons)
+        self._partitions = {}
+        self._points = {}
+
+        rows = np.minimum(((self._lats + 90) / cell_size_deg).astype(np.int64), self.n_rows - 1)
+        cols = (((self._lons + 180) % 360) / cell_size_deg).astype(np.int64) % self.n_cols
+        n_cells = self.n_rows * self.n_cols
+        keys = self.mines.type_codes.astype(np.int64) * n_cells + rows * self.n_cols + cols
+
+        # A stable sort keeps every cell's positions in database order
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        group_keys, starts = np.unique(sorted_keys, return_index=True)
+        stops = np.append(starts[1:], len(order))
+        for key, start, stop in zip(group_keys.tolist(), starts.tolist(), stops.tolist()):
+            type_code, cell = divmod(key, n_cells)
+            cells = self._partitions.setdefault(self.mines.types[type_code], {})
+            cells[divmod(cell, self.n_cols)] = order[start:stop]
+
+    def __len__(self):
+        return len(self.mines)
+
+    def mine_types(self):
+        """Return the mine types present in the index"""
+        return list(self._partitions)
+
+    def _cell(self, lat, lon):
+        row = min(int((lat + 90) / self.cell_size_deg), self.n_rows - 1)
+        col = int(((lon + 180) % 360) / self.cell_size_deg) % self.n_cols
+        return row, col
+
+    def _ring_cells(self, row, col, ring):
+        """Yield (row, col) cells at Chebyshev distance ring, wrapping longitude"""
+        for r in range(row - ring, row + ring + 1):
+            if r < 0 or r >= self.n_rows:
+                continue
+            if r in (row - ring, row + ring):
+                cols = range(col - ring, col + ring + 1)
+            else:
+                cols = (col - ring, col + ring)
+            for c in cols:
+                yield r, c % self.n_cols
+
+    def _ring_bound_km(self, lat, lon, row, col, ring):
+        """Lower bound on the distance to any point outside the searched rings"""
+        south = (row - ring) * self.cell_size_deg - 90
+        north = (row + ring + 1) * self.cell_size_deg - 90
+        covers_lats = south <= -90 and north >= 90
+        covers_lons = 2 * ring + 1 >= self.n_cols
+        if covers_lats and covers_lons:
+            return float('inf')
+
+        lat_gap = min(
+            lat - south if south > -90 else float('inf'),
+            north - lat if north < 90 else float('inf')
+        )
+        bound = math.radians(lat_gap) * EARTH_RADIUS_KM
+
+        if not covers_lons:
+            west = (col - ring) * self.cell_size_deg - 180
+            east = (col + ring + 1) * self.cell_size_deg - 180
+            lon_gap = min(lon - west, east - lon, 180)
+            # Points in the searched latitude band can be no closer than this
+            max_abs_lat = min(90.0, max(abs(south), abs(north)))
+            half_angle = math.cos(math.radians(max_abs_lat)) * math.sin(math.radians(lon_gap) / 2)
+            bound = min(bound, 2 * EARTH_RADIUS_KM * math.asin(min(1.0, max(0.0, half_angle))))
+
+        return bound
+
+    def _partition_cells(self, mine_type):
+        if mine_type is None:
+            return list(self._partitions.items())
+        cells = self._partitions.get(mine_type)
+        return [(mine_type, cells)] if cells else []
+
+    def _cell_points(self, mine_type, cell, positions):
+        """Small cells as cached (position, lat, lon) tuples; numpy overhead dominates there"""
+        key = (mine_type, cell)
+        points = self._points.get(key)
+        if points is None:
+            points = list(zip(
+                positions.tolist(), self._lats[positions].tolist(), self._lons[positions].tolist()
+            ))
+            self._points[key] = points
+        return points
+
+    def _scan(self, lat, lon, mine_type, done):
+        """Visit rings outward until done(approx_km, bound); returns (approx_km, positions) lists"""
+        partitions = self._partition_cells(mine_type)
+        approx_km = []
+        found = []
+        if not partitions:
+            return approx_km, found
+
+        def visit(type_name, cell, positions):
+            if len(positions) > SMALL_CELL_SIZE:
+                approx_km.extend(
+                    haversine_km_array(lat, lon, self._lats[positions], self._lons[positions]).tolist()
+                )
+                found.extend(positions.tolist())
+                return
+            for position, mine_lat, mine_lon in self._cell_points(type_name, cell, positions):
+                approx_km.append(haversine_km(lat, lon, mine_lat, mine_lon))
+                found.append(position)
+
+        row, col = self._cell(lat, lon)
+        occupied = sum(len(cells) for _, cells in partitions)
+        seen = set()
+        ring = 0
+        while True:
+            if len(seen) > occupied:
+                # Sparse neighbourhood: cheaper to sweep the remaining occupied cells directly
+                for type_name, cells in partitions:
+                    for cell, positions in cells.items():
+                        if cell not in seen:
+                            visit(type_name, cell, positions)
+                return approx_km, found
+
+            for cell in self._ring_cells(row, col, ring):
+                if cell in seen:
+                    continue
+                seen.add(cell)
+                for type_name, cells in partitions:
+                    positions = cells.get(cell)
+                    if positions is not None:
+                        visit(type_name, cell, positions)
+
+            bound = self._ring_bound_km(lat, lon, row, col, ring)
+            if bound == float('inf') or done(approx_km, bound):
+                return approx_km, found
+            ring += 1
+
+    def _to_result(self, position, distance=None):
+        mine_lat, mine_lon, country, mine_type = self.mines.row(position)
+        result = {
+            'name': self.mines.name(position),
+            'latitude': mine_lat,
+            'longitude': mine_lon,
+            'country': country,
+            'type': mine_type
+        }
+        if distance is not None:
+            result['distance'] = distance
+        return result
+
+    def _geodesic_km(self, lat, lon, position):
+        return geodesic((lat, lon), (float(self._lats[position]), float(self._lons[position]))).kilometers
+
+    def _col_range(self, west, east):
+        """Grid columns overlapping [west, east] with west <= east"""
+        col_start = min(int((west + 180) / self.cell_size_deg), self.n_cols - 1)
+        col_stop = min(int((east + 180) / self.cell_size_deg), self.n_cols - 1)
+        return range(col_start, col_stop + 1)
+
+    def query_bbox_positions(self, south, west, north, east, mine_type=None):
+        """Store positions of mines inside a lat/lon box, in database order.
+
+        A box with west > east crosses the antimeridian.
+        """
+        partitions = self._partition_cells(mine_type)
+        row_start = self._cell(max(south, -90), 0)[0]
+        row_stop = self._cell(min(north, 90), 0)[0]
+        lon_ranges = [(west, east)] if west <= east else [(west, 180), (-180, east)]
+
+        found = []
+        for lon_west, lon_east in lon_ranges:
+            for row in range(row_start, row_stop + 1):
+                for col in self._col_range(lon_west, lon_east):
+                    for _, cells in partitions:
+                        positions = cells.get((row, col))
+                        if positions is None:
+                            continue
+                        lats, lons = self._lats[positions], self._lons[positions]
+                        inside = (south <= lats) & (lats <= north) & (lon_west <= lons) & (lons <= lon_east)
+                        found.append(positions[inside])
+
+        # A mine on the antimeridian can match both ranges
+        if not found:
+            return []
+        return np.unique(np.concatenate(found)).tolist()
+
+    def query_bbox(self, south, west, north, east, mine_type=None):
+        """Return mines inside a lat/lon box, in database order.
+
+        A box with west > east crosses the antimeridian.
+        """
+        return [
+            self._to_result(position)
+            for position in self.query_bbox_positions(south, west, north, east, mine_type)
+        ]
+
+    def query_radius(self, lat, lon, radius_km, mine_type=None):
+        """Return mines within radius_km (exact geodesic), in database order"""
+        search_km = radius_km * (1 + HAVERSINE_MARGIN)
+        approx_km, positions = self._scan(lat, lon, mine_type, lambda found, bound: bound >= search_km)
+
+        results = []
+        for position in sorted(p for p, d in zip(positions, approx_km) if d <= search_km):
+            distance = self._geodesic_km(lat, lon, position)
+            if distance <= radius_km:
+                results.append(self._to_result(position, distance))
+        return results
+
+    def nearest(self, lat, lon, k=1, mine_type=None):
+        """Return the k nearest mines (exact geodesic), closest first"""
+        if k <= 0:
+            return []
+
+        def kth_distance(found):
+            if len(found) < k:
+                return float('inf')
+            return heapq.nsmallest(k, found)[-1]
+
+        approx_km, positions = self._scan(
+            lat, lon, mine_type,
+            lambda found, bound: bound >= kth_distance(found) * (1 + HAVERSINE_MARGIN)
+        )
+
+        # Exact geodesic for every candidate that could still rank in the top k
+        cutoff = kth_distance(approx_km) * (1 + HAVERSINE_MARGIN)
+        results = [
+            self._to_result(position, self._geodesic_km(lat, lon, position))
+            for position, distance in zip(positions, approx_km)
+            if distance <= cutoff
+        ]
+        results.sort(key=lambda result: result['distance'])
+        return results[:k]
+
+
+# Built once at import, shared by all requests
+mine_index = MineSpatialIndex(LEGAL_MINING_AREAS)
@@ -0,0 +1,510 @@
+"""
+Columnar Mine Store
+Array-backed mining database with a memory-mapped binary format and cadastre importers
+
+Mines are held column by column: contiguous float64 latitude and longitude
+arrays, uint16 country and type codes interned against small string tables,
+and one UTF-8 blob of names with an offsets array. Positions grouped by type
+and by country are sorted once when a store is built and saved with it, so
+counts and group lookups never rescan the rows. Loading a saved store maps
+the file read-only; rows are only decoded when they are read.
+
+A store is also a read-only mapping of name -> (lat, lon, country, type) in
+database order, the shape of LEGAL_MINING_AREAS, and groups returned by
+by_type() and by_country() are mappings of the same shape.
+
+File layout: MAGIC, a little-endian uint64 header length, a JSON header (row
+count, string tables, array offsets and dtypes), then each array at an
+ARRAY_ALIGNMENT-byte aligned offset.
+
+Usage:
+    from mine_store import MineStore
+
+    store = MineStore.from_csv('cadastre.csv', type_aliases={'Iron': 'Iron Ore'})
+    store.save('mines.db')
+    store = MineStore.load('mines.db')
+    store.counts_by_type(), store.by_country('Chile')
+
+    python mine_store.py import cadastre.csv mines.db --type-field commodity --alias Iron="Iron Ore"
+    python mine_store.py import leases.geojson mines.db --country Australia --include-seed
+    python mine_store.py info mines.db
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import struct
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+MAGIC = b'MINEDB01'
+ARRAY_ALIGNMENT = 8
+
+# Field names tried, in order, when an importer is not told which one to use
+NAME_FIELDS = ('name', 'mine_name', 'lease_name', 'title', 'id')
+LAT_FIELDS = ('latitude', 'lat', 'y')
+LON_FIELDS = ('longitude', 'lon', 'lng', 'long', 'x')
+COUNTRY_FIELDS = ('country', 'country_name', 'nation')
+TYPE_FIELDS = ('type', 'mine_type', 'commodity', 'mineral', 'commodities')
+
+# dtype of every saved array
+ARRAY_DTYPES = {
+    'lats': '<f8',
+    'lons': '<f8',
+    'country_codes': '<u2',
+    'type_codes': '<u2',
+    'name_offsets': '<u8',
+    'names': 'u1',
+    'type_order': '<u4',
+    'type_starts': '<u4',
+    'country_order': '<u4',
+    'country_starts': '<u4'
+}
+
+
+def _intern(values):
+    """(codes, table) with table in first-seen order"""
+    table = {}
+    codes = [table.setdefault(value, len(table)) for value in values]
+    if len(table) > np.iinfo(np.uint16).max + 1:
+        raise ValueError(f'Too many distinct values to intern: {len(table)}')
+    return np.array(codes, dtype=np.uint16), list(table)
+
+
+def _group(codes, n_groups):
+    """Row positions stable-sorted by code, and each code's start offset into them"""
+    order = np.argsort(codes, kind='stable').astype(np.uint32)
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.zeros(n_groups + 1, dtype=np.uint32)
+    np.cumsum(counts, out=starts[1:])
+    return order, starts
+
+
+def _unique_names(names):
+    """Suffix repeated names with ' #<row>' so every name stays a distinct key"""
+    seen = set()
+    unique = []
+    for row, name in enumerate(names):
+        if name in seen:
+            name = f'{name} #{row}'
+        seen.add(name)
+        unique.append(name)
+    return unique
+
+
+def _pick_field(fields, candidates, given=None):
+    if given is not None:
+        if fields and given not in fields:
+            raise ValueError(f'Field not found: {given}')
+        return given
+    lowered = {field.lower(): field for field in fields}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+
+def _geometry_point(geometry):
+    """(lon, lat) of a Point, or the mean vertex of a line or polygon's first ring"""
+    kind = geometry.get('type')
+    coords = geometry.get('coordinates')
+    if kind == 'Point':
+        return coords[0], coords[1]
+    if kind == 'MultiPoint' or kind == 'LineString':
+        ring = coords
+    elif kind == 'Polygon' or kind == 'MultiLineString':
+        ring = coords[0]
+    elif kind == 'MultiPolygon':
+        ring = coords[0][0]
+    else:
+        return None
+    vertices = np.asarray(ring, dtype=np.float64)[:, :2]
+    # A closed ring repeats its first vertex
+    if len(vertices) > 1 and (vertices[0] == vertices[-1]).all():
+        vertices = vertices[:-1]
+    lon, lat = vertices.mean(axis=0)
+    return float(lon), float(lat)
+
+
+class MineGroup(Mapping):
+    """Mines of one type or country, a mapping view into a MineStore"""
+
+    def __init__(self, store, codes, code, positions):
+        self.store = store
+        self._codes = codes
+        self._code = code
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        return (self.store.name(i) for i in self.positions.tolist())
+
+    def __getitem__(self, name):
+        position = self.store.position(name)
+        if position is None or self._codes[position] != self._code:
+            raise KeyError(name)
+        return self.store.row(position)
+
+    def items(self):
+        return [(self.store.name(i), self.store.row(i)) for i in self.positions.tolist()]
+
+    def values(self):
+        return [self.store.row(i) for i in self.positions.tolist()]
+
+    @property
+    def lats(self):
+        return self.store.lats[self.positions]
+
+    @property
+    def lons(self):
+        return self.store.lons[self.positions]
+
+
+class MineStore(Mapping):
+    """Read-only columnar mine database, a mapping of name -> (lat, lon, country, type)"""
+
+    def __init__(self, arrays, countries, types):
+        # Plain ndarray views of memory-mapped columns skip np.memmap's per-access overhead
+        arrays = {name: np.asarray(array) for name, array in arrays.items()}
+        self.lats = arrays['lats']
+        self.lons = arrays['lons']
+        self.country_codes = arrays['country_codes']
+        self.type_codes = arrays['type_codes']
+        self._name_offsets = arrays['name_offsets']
+        self._names = arrays['names']
+        self._arrays = arrays
+        self.countries = countries
+        self.types = types
+        self._country_index = {country: code for code, country in enumerate(countries)}
+        self._type_index = {mine_type: code for code, mine_type in enumerate(types)}
+
+        type_starts = arrays['type_starts'].tolist()
+        country_starts = arrays['country_starts'].tolist()
+        self._type_counts = {t: type_starts[c + 1] - type_starts[c] for c, t in enumerate(types)}
+        self._country_counts = {
+            country: country_starts[c + 1] - country_starts[c] for c, country in enumerate(countries)
+        }
+        self._sorted_countries = sorted(countries)
+        self._groups = {}
+        self._positions = None
+
+    @classmethod
+    def from_columns(cls, names, lats, lons, countries, types):
+        """Build a store from equal-length columns, in database order"""
+        if not len(names) == len(lats) == len(lons) == len(countries) == len(types):
+            raise ValueError('Columns have different lengths')
+        country_codes, country_table = _intern(countries)
+        type_codes, type_table = _intern(types)
+
+        encoded = [name.encode('utf-8') for name in _unique_names(names)]
+        name_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(name) for name in encoded], out=name_offsets[1:])
+
+        type_order, type_starts = _group(type_codes, len(type_table))
+        country_order, country_starts = _group(country_codes, len(country_table))
+        arrays = {
+            'lats': np.asarray(lats, dtype=np.float64),
+            'lons': np.asarray(lons, dtype=np.float64),
+            'country_codes': country_codes,
+            'type_codes': type_codes,
+            'name_offsets': name_offsets,
+            'names': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+            'type_order': type_order,
+            'type_starts': type_starts,
+            'country_order': country_order,
+            'country_starts': country_starts
+        }
+        return cls(arrays, country_table, type_table)
+
+    @classmethod
+    def from_mapping(cls, mines):
+        """Build a store from a {name: (lat, lon, country, type)} mapping"""
+        rows = list(mines.items())
+        return cls.from_columns(
+            [name for name, _ in rows],
+            [row[0] for _, row in rows],
+            [row[1] for _, row in rows],
+            [row[2] for _, row in rows],
+            [row[3] for _, row in rows]
+        )
+
+    @classmethod
+    def from_records(cls, records, name_field=None, lat_field=None, lon_field=None,
+                     country_field=None, type_field=None, country=None, mine_type=None,
+                     type_aliases=None):
+        """Build a store from dict records such as CSV rows or GeoJSON properties.
+
+        Fields are detected from common names unless given. country and
+        mine_type fill rows without one; type_aliases renames types (e.g. a
+        cadastre's 'Fe' to 'Iron Ore'). Rows without coordinates are skipped.
+        """
+        records = list(records)
+        fields = list(records[0]) if records else []
+        name_field = _pick_field(fields, NAME_FIELDS, name_field)
+        lat_field = _pick_field(fields, LAT_FIELDS, lat_field)
+        lon_field = _pick_field(fields, LON_FIELDS, lon_field)
+        country_field = _pick_field(fields, COUNTRY_FIELDS, country_field)
+        type_field = _pick_field(fields, TYPE_FIELDS, type_field)
+        if records and (lat_field is None or lon_field is None):
+            raise ValueError('No latitude/longitude fields found')
+        type_aliases = type_aliases or {}
+
+        columns = ([], [], [], [], [])
+        for row, record in enumerate(records):
+            try:
+                lat = float(record[lat_field])
+                lon = float(record[lon_field])
+            except (TypeError, ValueError):
+                continue
+            name = str(record.get(name_field) or '').strip() if name_field else ''
+            row_country = str(record.get(country_field) or '').strip() if country_field else ''
+            row_type = str(record.get(type_field) or '').strip() if type_field else ''
+            row_type = row_type or mine_type or 'Unknown'
+            for column, value in zip(columns, (
+                name or f'Mine {row + 1}', lat, lon,
+                row_country or country or 'Unknown', type_aliases.get(row_type, row_type)
+            )):
+                column.append(value)
+        return cls.from_columns(*columns)
+
+    @classmethod
+    def from_csv(cls, path, **fields):
+        """Import a CSV file with a header row; see from_records for the options"""
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            return cls.from_records(csv.DictReader(f), **fields)
+
+    @classmethod
+    def from_geojson(cls, path, **fields):
+        """Import a GeoJSON FeatureCollection; polygons are placed at their mean vertex.
+
+        Coordinates always come from the geometry, so lat_field/lon_field are ignored.
+        """
+        with open(path, encoding='utf-8') as f:
+            collection = json.load(f)
+
+        records = []
+        for feature in collection.get('features', []):
+            point = _geometry_point(feature.get('geometry') or {})
+            if point is None:
+                continue
+            record = dict(feature.get('properties') or {})
+            record['_lon'], record['_lat'] = point
+            records.append(record)
+        fields.update(lat_field='_lat', lon_field='_lon')
+        return cls.from_records(records, **fields)
+
+    def save(self, path):
+        """Write the store in the binary format read by load()"""
+        header = {'count': len(self), 'countries': self.countries, 'types': self.types, 'arrays': {}}
+        # Offsets depend on the header length, so lay the arrays out until it stops changing
+        header_len = 0
+        while True:
+            offset = len(MAGIC) + 8 + header_len
+            for name, dtype in ARRAY_DTYPES.items():
+                offset += -offset % ARRAY_ALIGNMENT
+                nbytes = self._arrays[name].size * np.dtype(dtype).itemsize
+                header['arrays'][name] = {'offset': offset, 'dtype': dtype, 'length': int(self._arrays[name].size)}
+                offset += nbytes
+            encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+            if len(encoded) == header_len:
+                break
+            header_len = len(encoded)
+
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', header_len))
+            f.write(encoded)
+            for name, dtype in ARRAY_DTYPES.items():
+                f.write(b'\0' * (header['arrays'][name]['offset'] - f.tell()))
+                f.write(np.ascontiguousarray(self._arrays[name], dtype=dtype).tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a store written by save()"""
+        raw = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(raw[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f'Not a mine store: {path}')
+        header_start = len(MAGIC) + 8
+        (header_len,) = struct.unpack('<Q', bytes(raw[len(MAGIC):header_start]))
+        header = json.loads(bytes(raw[header_start:header_start + header_len]).decode('utf-8'))
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            start = spec['offset']
+            arrays[name] = raw[start:start + spec['length'] * dtype.itemsize].view(dtype)
+        return cls(arrays, header['countries'], header['types'])
+
+    def fingerprint(self):
+        """SHA-1 hex digest of the store's contents"""
+        digest = hashlib.sha1(json.dumps([self.countries, self.types]).encode('utf-8'))
+        for name in ARRAY_DTYPES:
+            digest.update(np.ascontiguousarray(self._arrays[name]).tobytes())
+        return digest.hexdigest()
+
+    def __len__(self):
+        return len(self.lats)
+
+    def __iter__(self):
+        return (self.name(i) for i in range(len(self)))
+
+    def __getitem__(self, name):
+        position = self.position(name)
+        if position is None:
+            raise KeyError(name)
+        return self.row(position)
+
+    def __contains__(self, name):
+        return self.position(name) is not None
+
+    def items(self):
+        return list(zip(self, self.values()))
+
+    def values(self):
+        countries, types = self.countries, self.types
+        return [
+            (lat, lon, countries[country], types[mine_type])
+            for lat, lon, country, mine_type in zip(
+                self.lats.tolist(), self.lons.tolist(),
+                self.country_codes.tolist(), self.type_codes.tolist()
+            )
+        ]
+
+    def name(self, position):
+        start, end = self._name_offsets[position:position + 2]
+        return bytes(self._names[start:end]).decode('utf-8')
+
+    def row(self, position):
+        """(lat, lon, country, type) of the mine at a database position"""
+        return (
+            float(self.lats[position]),
+            float(self.lons[position]),
+            self.countries[self.country_codes[position]],
+            self.types[self.type_codes[position]]
+        )
+
+    def position(self, name):
+        """Database position of a mine name, None if absent; the name index is built on first use"""
+        if self._positions is None:
+            self._positions = {self.name(i): i for i in range(len(self))}
+        return self._positions.get(name)
+
+    def _group(self, kind, value):
+        key = (kind, value)
+        group = self._groups.get(key)
+        if group is None:
+            index, codes = (
+                (self._type_index, self.type_codes) if kind == 'type'
+                else (self._country_index, self.country_codes)
+            )
+            code = index.get(value)
+            if code is None:
+                positions = np.zeros(0, dtype=np.uint32)
+            else:
+                starts = self._arrays[f'{kind}_starts']
+                positions = self._arrays[f'{kind}_order'][starts[code]:starts[code + 1]]
+            group = self._groups[key] = MineGroup(self, codes, code, positions)
+        return group
+
+    def by_type(self, mine_type):
+        """Mines of one type, in database order"""
+        return self._group('type', mine_type)
+
+    def by_country(self, country):
+        """Mines in one country, in database order"""
+        return self._group('country', country)
+
+    def counts_by_type(self):
+        return dict(self._type_counts)
+
+    def counts_by_country(self):
+        return dict(self._country_counts)
+
+    def sorted_countries(self):
+        return list(self._sorted_countries)
+
+
+def parse_aliases(pairs):
+    """{'Fe': 'Iron Ore'} from ['Fe=Iron Ore']"""
+    aliases = {}
+    for pair in pairs or []:
+        source, sep, target = pair.partition('=')
+        if not sep:
+            raise ValueError(f'Alias must look like FROM=TO: {pair}')
+        aliases[source.strip()] = target.strip()
+    return aliases
+
+
+def import_file(path, **fields):
+    """Import a .csv or .geojson/.json cadastre file"""
+    if path.lower().endswith(('.geojson', '.json')):
+        return MineStore.from_geojson(path, **fields)
+    return MineStore.from_csv(path, **fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and inspect columnar mine stores')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importer = commands.add_parser('import', help='import CSV/GeoJSON cadastres into a store file')
+    importer.add_argument('sources', nargs='+', help='.csv, .geojson or .json files')
+    importer.add_argument('output', help='store file to write')
+    importer.add_argument('--name-field')
+    importer.add_argument('--lat-field')
+    importer.add_argument('--lon-field')
+    importer.add_argument('--country-field')
+    importer.add_argument('--type-field')
+    importer.add_argument('--country', help='country of rows without one')
+    importer.add_argument('--type', dest='mine_type', help='mine type of rows without one')
+    importer.add_argument('--alias', action='append', help='rename a type, e.g. Fe="Iron Ore"')
+    importer.add_argument('--include-seed', action='store_true',
+                          help='start from the built-in legal mining sites')
+
+    info = commands.add_parser('info', help='print counts of a store file')
+    info.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        store = MineStore.load(args.path)
+        print(f'{len(store)} mines, {len(store.countries)} countries')
+        for mine_type, count in sorted(store.counts_by_type().items(), key=lambda item: -item[1]):
+            print(f'   {mine_type}: {count}')
+        return 0
+
+    fields = {
+        'name_field': args.name_field,
+        'lat_field': args.lat_field,
+        'lon_field': args.lon_field,
+        'country_field': args.country_field,
+        'type_field': args.type_field,
+        'country': args.country,
+        'mine_type': args.mine_type,
+        'type_aliases': parse_aliases(args.alias)
+    }
+    mines = {}
+    if args.include_seed:
+        from legal_mining_sites import SEED_MINING_AREAS
+        mines.update(SEED_MINING_AREAS)
+    for source in args.sources:
+        imported = import_file(source, **fields)
+        duplicates = 0
+        for name, row in imported.items():
+            if name in mines:
+                duplicates += 1
+                name = f'{name} #{len(mines)}'
+            mines[name] = row
+        print(f'{source}: {len(imported)} mines' + (f', {duplicates} renamed' if duplicates else ''))
+
+    store = MineStore.from_mapping(mines)
+    store.save(args.output)
+    print(f'Wrote {len(store)} mines to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
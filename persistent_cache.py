@@ -0,0 +1,130 @@
+"""
+Persistent Cache
+SQLite-backed TTL + LRU cache of JSON values shared by worker processes and kept across restarts
+
+Expired rows are purged every PERSISTENT_CACHE_PURGE_INTERVAL seconds while the
+cache is written to. With max_entries set, the same purge evicts the least
+recently read rows past the cap, and it also runs once writes since the last
+purge reach a tenth of the cap, so the table overshoots the cap by at most
+about 10%.
+
+Usage:
+    from persistent_cache import PersistentCache
+
+    cache = PersistentCache('analysis_store.sqlite3', 'analysis', ttl_seconds=7200, max_entries=5000)
+    cache.set('key', {'value': 1})
+    found, value = cache.get('key')
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+PURGE_INTERVAL_S = float(os.getenv('PERSISTENT_CACHE_PURGE_INTERVAL', 300))
+
+
+class PersistentCache:
+    """SQLite-backed key/value cache of JSON values with per-entry TTL and an optional LRU row cap"""
+
+    def __init__(self, path, table, ttl_seconds, max_entries=None, purge_interval_s=PURGE_INTERVAL_S):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.purge_interval_s = purge_interval_s
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes_since_purge = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self._lock, self._conn:
+            # WAL lets several worker processes share the file
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {table} '
+                '(key TEXT PRIMARY KEY, value TEXT, expires_at REAL, accessed_at REAL)'
+            )
+            # Tables created before the LRU cap have no access time
+            columns = [row[1] for row in self._conn.execute(f'PRAGMA table_info({table})')]
+            if 'accessed_at' not in columns:
+                self._conn.execute(f'ALTER TABLE {table} ADD COLUMN accessed_at REAL DEFAULT 0')
+            self._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)'
+            )
+        self.purge()
+
+    def get(self, key, record_stats=True):
+        """Return (found, value); expired entries count as missing"""
+        with self._lock:
+            now = time.time()
+            row = self._conn.execute(
+                f'SELECT value, expires_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            found = row is not None and row[1] > now
+            if found and self.max_entries:
+                with self._conn:
+                    self._conn.execute(
+                        f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key)
+                    )
+            if record_stats:
+                if found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            return (True, json.loads(row[0])) if found else (False, None)
+
+    def set(self, key, value, ttl_seconds=None):
+        """Store a JSON-serializable value under key, purging when one is due"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock, self._conn:
+            now = time.time()
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self._writes_since_purge += 1
+            due = now - self._last_purge >= self.purge_interval_s or (
+                self.max_entries and self._writes_since_purge >= max(1, self.max_entries // 10)
+            )
+        if due:
+            self.purge()
+
+    def purge(self):
+        """Delete expired rows, then the least recently read rows past max_entries.
+
+        Returns the number of rows removed.
+        """
+        with self._lock, self._conn:
+            now = time.time()
+            removed = self._conn.execute(
+                f'DELETE FROM {self.table} WHERE expires_at <= ?', (now,)
+            ).rowcount
+            if self.max_entries:
+                (count,) = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()
+                if count > self.max_entries:
+                    evicted = self._conn.execute(
+                        f'DELETE FROM {self.table} WHERE key IN ('
+                        f'SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)',
+                        (count - self.max_entries,)
+                    ).rowcount
+                    self.evictions += evicted
+                    removed += evicted
+            self._last_purge = now
+            self._writes_since_purge = 0
+            return removed
+
+    def stats(self):
+        """Return hit/miss counters and evictions"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'max_entries': self.max_entries,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,28 @@
+"""
+Test Setup
+Runs the app against the in-process fake Earth Engine and Nominatim services
+
+The fakes from benchmarks/fake_services.py must replace `ee` and geopy's
+Nominatim before anything imports the app, so they are installed here, with
+no injected latency or errors.
+
+Usage:
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+os.environ.setdefault('BASEMAP_PREWARM', '0')
+
+from fake_services import LatencyProfile, create_app  # noqa: E402
+
+flask_app = create_app(LatencyProfile(0, 0), LatencyProfile(0, 0))
+
+
+@pytest.fixture
+def client():
+    return flask_app.test_client()
@@ -0,0 +1,31 @@
+import pytest
+
+CENTER = {'center_latitude': 18.63, 'center_longitude': 81.30}
+
+
+def test_point_analysis_rejects_unknown_mineral(client):
+    response = client.post('/api/point-analysis', json=dict(
+        CENTER, latitude=18.631, longitude=81.301, mineral_type='unobtainium'
+    ))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unsupported mineral type: unobtainium'
+
+
+def test_batch_point_analysis_rejects_unknown_mineral(client):
+    response = client.post('/api/point-analysis/batch', json=dict(
+        CENTER, points=[[18.631, 81.301]], mineral_type='unobtainium'
+    ))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unsupported mineral type: unobtainium'
+
+
+@pytest.mark.parametrize('path, extra', [
+    ('/api/point-analysis', {'latitude': 18.631, 'longitude': 81.301}),
+    ('/api/point-analysis/batch', {'points': [[18.631, 81.301]]})
+])
+def test_point_analysis_accepts_known_mineral(client, path, extra):
+    response = client.post(path, json=dict(CENTER, mineral_type='copper', **extra))
+
+    assert response.status_code == 200
@@ -0,0 +1,34 @@
+import ee
+
+from ee_backend import build_scan_plan, parse_scan_rows
+
+CELLS = [{'south': 0, 'west': lon, 'north': 1, 'east': lon + 1} for lon in range(3)]
+
+
+class MaskedMiddleImage:
+    """Index image whose middle cell is fully masked, so its mean is null"""
+
+    def select(self, band):
+        return self
+
+    def rename(self, name):
+        return self
+
+    def gt(self, threshold):
+        return self
+
+    def reduceRegions(self, collection, reducer, **kwargs):
+        def reduce(feature):
+            cell_id = feature.properties['cell_id']
+            if cell_id == 1:
+                return feature.set('mean_index', None).set('coverage', None)
+            return feature.set('mean_index', 1.5 + cell_id).set('coverage', 0.1 * cell_id)
+
+        return collection.map(reduce)
+
+
+def test_masked_cell_keeps_later_cells_aligned(monkeypatch):
+    monkeypatch.setattr(ee.Image, 'cat', staticmethod(lambda images: images[0]))
+    rows = build_scan_plan(MaskedMiddleImage(), 1.0, CELLS, 'iron', 500).getInfo()
+
+    assert parse_scan_rows(rows, len(CELLS)) == [(1.5, 0.0), (None, None), (3.5, 20.0)]
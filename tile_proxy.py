@@ -0,0 +1,232 @@
+"""
+Tile Proxy
+Caching proxy for Earth Engine XYZ map tiles
+
+Each tile layer (an analysis layer or the basemap) gets a stable layer key
+derived from what it shows rather than from its short-lived map ID. The
+registry maps layer keys to the current Earth Engine URL template, tiles are
+fetched through a pooled HTTP session and kept in a size-bounded on-disk LRU
+cache, so popular areas render from disk and keep rendering after the map ID
+has expired.
+
+Usage:
+    from tile_proxy import TileProxy, DiskTileCache, layer_key
+
+    proxy = TileProxy(layer_registry, DiskTileCache('tile_cache'))
+    key = layer_key(['analysis', cache_key, 'true_color'])
+    proxy.register(key, tile['url'])
+    body, content_type, cache_hit = proxy.get_tile(key, 12, 2961, 1834)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from concurrency import SingleFlight
+from metrics import timed
+
+TILE_CACHE_DIR = os.getenv('TILE_CACHE_DIR', 'tile_cache')
+TILE_CACHE_MAX_BYTES = int(os.getenv('TILE_CACHE_MAX_MB', 512)) * 1024 * 1024
+TILE_FETCH_TIMEOUT_S = float(os.getenv('TILE_FETCH_TIMEOUT', 10))
+TILE_POOL_SIZE = int(os.getenv('TILE_POOL_SIZE', 16))
+MAX_ZOOM = 22
+
+# Keys made by layer_key(); anything else never names a cached layer
+LAYER_KEY_PATTERN = re.compile(r'[0-9a-f]{24}')
+
+# Eviction trims the cache to this share of its budget so it does not run on every write
+EVICTION_TARGET = 0.9
+
+
+class TileNotFound(Exception):
+    """Unknown layer key or tile coordinates outside the layer"""
+
+
+class TileUpstreamError(Exception):
+    """Earth Engine failed to render a tile"""
+
+
+def layer_key(parts):
+    """Stable URL-safe key for a tile layer described by JSON-serializable parts"""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:24]
+
+
+def is_layer_key(key):
+    """True if key has the shape of a layer_key(), so it is safe to use as a path segment"""
+    return isinstance(key, str) and LAYER_KEY_PATTERN.fullmatch(key) is not None
+
+
+def tile_content_type(body):
+    """Content type of a tile from its magic bytes"""
+    if body.startswith(b'\x89PNG'):
+        return 'image/png'
+    if body.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    return 'application/octet-stream'
+
+
+def create_session(pool_size=TILE_POOL_SIZE):
+    """HTTP session with a connection pool sized for concurrent tile fetches"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class DiskTileCache:
+    """Size-bounded LRU cache of tile files; recency is the file's modification time"""
+
+    def __init__(self, directory=TILE_CACHE_DIR, max_bytes=TILE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._files())
+
+    def _path(self, key, z, x, y):
+        if not is_layer_key(key):
+            raise ValueError(f'Invalid tile layer key: {key!r}')
+        return os.path.join(self.directory, key, str(z), str(x), str(y))
+
+    def _files(self):
+        """(path, mtime, size) of every cached tile"""
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # evicted by another worker
+                yield path, stat.st_mtime, stat.st_size
+
+    def get(self, key, z, x, y):
+        """Return the cached tile bytes or None, marking the tile recently used"""
+        path = self._path(key, z, x, y)
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return body
+
+    def set(self, key, z, x, y, body):
+        """Store a tile atomically, evicting least recently used tiles when over budget"""
+        path = self._path(key, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(body)
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used tiles until the cache is under its target size"""
+        with self._lock:
+            # Rescan: other workers write to the same directory
+            files = sorted(self._files(), key=lambda item: item[1])
+            size = sum(file_size for _, _, file_size in files)
+            target = self.max_bytes * EVICTION_TARGET
+            for path, _, file_size in files:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass
+                size -= file_size
+            self._size = size
+
+    def stats(self):
+        """Hit/miss counters, evictions and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+class TileProxy:
+    """Resolves layer keys to Earth Engine URL templates and serves tiles through the disk cache"""
+
+    def __init__(self, layer_registry, tile_cache, session=None, timeout=TILE_FETCH_TIMEOUT_S):
+        self.layer_registry = layer_registry
+        self.tile_cache = tile_cache
+        self.session = session or create_session()
+        self.timeout = timeout
+        self._fetches = SingleFlight()
+
+    def register(self, key, url_format):
+        """Point a layer key at the current Earth Engine tile URL template"""
+        self.layer_registry.set(key, url_format)
+
+    def _fetch(self, key, z, x, y):
+        found, url_format = self.layer_registry.get(key, record_stats=False)
+        if not found:
+            raise TileNotFound(f'Unknown or expired tile layer {key}')
+
+        with timed('ee_tile_fetch'):
+            response = self.session.get(
+                url_format.format(z=z, x=x, y=y), timeout=self.timeout
+            )
+        if response.status_code == 404:
+            raise TileNotFound(f'No tile {z}/{x}/{y} in layer {key}')
+        if response.status_code != 200:
+            raise TileUpstreamError(f'Earth Engine returned {response.status_code} for {z}/{x}/{y}')
+
+        self.tile_cache.set(key, z, x, y, response.content)
+        return response.content
+
+    def get_tile(self, key, z, x, y):
+        """Return (body, content_type, cache_hit) for a tile.
+
+        Raises TileNotFound or TileUpstreamError.
+        """
+        if not is_layer_key(key):
+            raise TileNotFound(f'Unknown tile layer {key}')
+        if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise TileNotFound(f'Tile {z}/{x}/{y} is outside the map')
+
+        body = self.tile_cache.get(key, z, x, y)
+        if body is not None:
+            return body, tile_content_type(body), True
+
+        try:
+            # Neighbouring map clients often ask for the same tile at once
+            body, _ = self._fetches.do((key, z, x, y), lambda: self._fetch(key, z, x, y))
+        except requests.RequestException as e:
+            logging.error(f"Tile fetch failed for {key}/{z}/{x}/{y}: {e}")
+            raise TileUpstreamError(str(e))
+        return body, tile_content_type(body), False
@@ -0,0 +1,68 @@
+"""
+Mineral Index Time Series
+Monthly windows and change detection for the /api/time-series mode
+
+A backend reduces one composite per calendar month plus a baseline composite
+over the whole series window, all in a single evaluation. Monthly coverage
+is measured against the baseline threshold, so months are comparable; a
+month is flagged as changed when its coverage moves more than
+CHANGE_THRESHOLD_POINTS percentage points away from the baseline coverage.
+
+Usage:
+    from time_series import monthly_windows, flag_changes
+
+    windows = monthly_windows('2026-10-18', 12)
+    series = flag_changes(backend.time_series(18.63, 81.30, 10000, 'iron', windows))
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+TIMESERIES_DEFAULT_MONTHS = 12
+TIMESERIES_MAX_MONTHS = int(os.getenv('TIMESERIES_MAX_MONTHS', 36))
+CHANGE_THRESHOLD_POINTS = float(os.getenv('CHANGE_THRESHOLD_POINTS', 5))
+
+
+def monthly_windows(end_date, months):
+    """[(month, start_date, end_date)] for the last months calendar months before end_date, oldest first.
+
+    end_date is exclusive, like the analysis window, so the newest month is the
+    one holding the last complete day and ends at end_date. Every window is
+    non-empty, and exactly months windows are returned.
+    """
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    last_day = end - timedelta(days=1)
+    year, month = last_day.year, last_day.month
+    windows = []
+    for _ in range(months):
+        start = date(year, month, 1)
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        windows.append((start.strftime('%Y-%m'), start.isoformat(), min(next_month, end).isoformat()))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    windows.reverse()
+    return windows
+
+
+def flag_changes(series, change_points=CHANGE_THRESHOLD_POINTS):
+    """Add coverage_delta and change to every month of a backend time series"""
+    baseline_coverage = series['baseline'].get('coverage_percent')
+    changed_months = []
+    for month in series['months']:
+        coverage = month.get('coverage_percent')
+        if coverage is None or baseline_coverage is None:
+            month['coverage_delta'] = None
+            month['change'] = None
+            continue
+        month['coverage_delta'] = coverage - baseline_coverage
+        if month['coverage_delta'] > change_points:
+            month['change'] = 'increase'
+        elif month['coverage_delta'] < -change_points:
+            month['change'] = 'decrease'
+        else:
+            month['change'] = None
+        if month['change']:
+            changed_months.append(month['month'])
+
+    series['changed_months'] = changed_months
+    series['change_threshold_points'] = change_points
+    return series
@@ -0,0 +1,132 @@
+"""
+Analysis Cache Warmer
+Runs the full analysis for known legal mining sites and stores the results
+
+Results go to the persistent analysis store (ANALYSIS_STORE_PATH) shared by
+every API worker, so analyses at the well-known sites are served hot after a
+deploy or cold start. Run it with the same environment as the API (Earth
+Engine credentials, ANALYSIS_STORE_PATH) and again before ANALYSIS_CACHE_TTL
+runs out, e.g. from a cron job. Sites are warmed at their database
+coordinates, which is where the map markers place them.
+
+Usage:
+    python warm_cache.py                                  # every site, its own mineral
+    python warm_cache.py --type "Iron Ore" --workers 2
+    python warm_cache.py --country India --mineral all
+    python warm_cache.py --country Chile --dry-run
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# The warmer never serves the basemap, skip its background refresh
+os.environ.setdefault('BASEMAP_PREWARM', '0')
+
+import app  # noqa: E402
+from analysis_cache import snap_coordinates  # noqa: E402
+from classification import MINERAL_MINE_TYPES  # noqa: E402
+from legal_mining_sites import LEGAL_MINING_AREAS, get_mines_by_type, get_mines_by_country  # noqa: E402
+
+WARM_WORKERS = int(os.getenv('WARM_WORKERS', 4))
+
+# Mine type -> the mineral an analysis at that site most likely asks for
+SITE_MINERALS = {mine_type: mineral for mineral, mine_type in MINERAL_MINE_TYPES.items()}
+
+
+def select_sites(mine_type=None, country=None):
+    """Mines to warm, filtered by type and/or country, in database order"""
+    sites = LEGAL_MINING_AREAS
+    if mine_type:
+        sites = get_mines_by_type(mine_type)
+    if country:
+        by_country = get_mines_by_country(country)
+        sites = {name: site for name, site in sites.items() if name in by_country}
+    return sites
+
+
+def warm_site(name, lat, lon, mineral_type, start_date, end_date):
+    """Analyze one site through the API's cache path; returns a status record"""
+    started = time.perf_counter()
+    record = {'name': name, 'mineral_type': mineral_type}
+    try:
+        mineral_types = app.parse_mineral_types(mineral_type)
+        center_lat, center_lon = snap_coordinates(lat, lon, app.ROI_SNAP_DECIMALS)
+        analysis, reused = app.get_cached_analysis(
+            center_lat, center_lon, mineral_types, start_date, end_date
+        )
+        if analysis is None:
+            record['status'] = 'no_imagery'
+        elif reused:
+            record['status'] = 'already_warm'
+        elif app.is_complete_analysis(analysis):
+            record['status'] = 'warmed'
+        else:
+            # Incomplete results are never stored, a later run retries them
+            record['status'] = 'incomplete'
+    except Exception as e:
+        logging.error(f"Warming {name} failed: {e}")
+        record['status'] = 'failed'
+        record['error'] = str(e)
+
+    record['seconds'] = round(time.perf_counter() - started, 2)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Warm the analysis store for legal mining sites')
+    parser.add_argument('--type', dest='mine_type', help="mine type, e.g. 'Iron Ore', 'Copper'")
+    parser.add_argument('--country', help="country, e.g. 'India'")
+    parser.add_argument('--mineral', default='site',
+                        help="mineral_type to analyze: 'site' (the mine's own mineral, default), "
+                             "a mineral, 'all' or a comma separated list")
+    parser.add_argument('--workers', type=int, default=WARM_WORKERS,
+                        help='analyses running at once (default %(default)s)')
+    parser.add_argument('--dry-run', action='store_true', help='list the sites without analyzing')
+    args = parser.parse_args()
+
+    if args.mineral != 'site' and app.parse_mineral_types(args.mineral) is None:
+        parser.error(f'Unsupported mineral type: {args.mineral}')
+
+    sites = select_sites(args.mine_type, args.country)
+    if not sites:
+        print('No sites match the filters')
+        return 1
+
+    jobs = [
+        (name, lat, lon, SITE_MINERALS.get(mine_type, 'iron') if args.mineral == 'site' else args.mineral)
+        for name, (lat, lon, _, mine_type) in sites.items()
+    ]
+    if args.dry_run:
+        for name, lat, lon, mineral_type in jobs:
+            print(f'{name:<45} {lat:>9.4f} {lon:>10.4f}  {mineral_type}')
+        print(f'{len(jobs)} sites')
+        return 0
+
+    # One window for the whole run so every site lands under today's cache key
+    start_date, end_date = app.get_analysis_window()
+    print(f'Warming {len(jobs)} sites ({start_date} to {end_date}) with {args.workers} workers')
+
+    counts = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [
+            executor.submit(warm_site, name, lat, lon, mineral_type, start_date, end_date)
+            for name, lat, lon, mineral_type in jobs
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+            print(f"[{done}/{len(jobs)}] {record['status']:<12} {record['seconds']:>7.2f}s  "
+                  f"{record['name']} ({record['mineral_type']})", flush=True)
+
+    summary = ', '.join(f'{status}: {count}' for status, count in sorted(counts.items()))
+    print(f'Done in {time.perf_counter() - started:.1f}s - {summary}')
+    return 1 if counts.get('failed') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())